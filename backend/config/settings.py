@@ -183,3 +183,88 @@ CORS_ALLOWED_ORIGINS = config(
     default='http://localhost:5173,http://127.0.0.1:5173',
     cast=Csv(),
 )
+
+# ---------------------------------------------------------------------------
+# Roster
+# ---------------------------------------------------------------------------
+# Weekly hours the auto-roster solver aims to give each LPO
+ROSTER_TARGET_WEEKLY_HOURS = config('ROSTER_TARGET_WEEKLY_HOURS', default=38, cast=int)
+# Labour compliance rules (roster.compliance); ROSTER_COMPLIANCE_ENFORCE=False
+# reports violations without blocking saves
+ROSTER_MIN_REST_HOURS = config('ROSTER_MIN_REST_HOURS', default=10, cast=int)
+ROSTER_MAX_CONSECUTIVE_DAYS = config('ROSTER_MAX_CONSECUTIVE_DAYS', default=6, cast=int)
+ROSTER_MAX_WEEKLY_HOURS = config('ROSTER_MAX_WEEKLY_HOURS', default=48, cast=int)
+ROSTER_COMPLIANCE_ENFORCE = config('ROSTER_COMPLIANCE_ENFORCE', default=True, cast=bool)
+# Candidates offered an open shift (e.g. after an approved drop) at a time
+ROSTER_OPEN_SHIFT_OFFERS = config('ROSTER_OPEN_SHIFT_OFFERS', default=3, cast=int)
+# Leave accrual (roster.leave) per balance-tracked leave type, either
+# 'worked:<hours per worked hour>' or 'fixed:<hours per month>'
+ROSTER_LEAVE_ACCRUAL = {
+    'annual': config('ROSTER_ANNUAL_LEAVE_ACCRUAL', default='worked:0.0769'),
+    'sick': config('ROSTER_SICK_LEAVE_ACCRUAL', default='worked:0.0385'),
+}
+# Hours deducted from a balance per weekday of approved leave
+ROSTER_LEAVE_DAY_HOURS = config('ROSTER_LEAVE_DAY_HOURS', default='7.6')
+# Delta sync (roster.sync): tombstones are kept this long; clients further
+# behind, or with more changes than ROSTER_SYNC_MAX_CHANGES, reload instead
+ROSTER_SYNC_RETENTION_DAYS = config('ROSTER_SYNC_RETENTION_DAYS', default=30, cast=int)
+ROSTER_SYNC_MAX_CHANGES = config('ROSTER_SYNC_MAX_CHANGES', default=2000, cast=int)
+# iCalendar feeds (roster.ical) cover this many days back and ahead
+ROSTER_ICAL_PAST_DAYS = config('ROSTER_ICAL_PAST_DAYS', default=30, cast=int)
+ROSTER_ICAL_FUTURE_DAYS = config('ROSTER_ICAL_FUTURE_DAYS', default=120, cast=int)
+# Payroll rate rules (roster.payroll): penalty multipliers by weekday and
+# time of day (the highest applying one wins), weekly overtime after
+# ROSTER_PAY_OVERTIME_AFTER_HOURS, and the decimal rounding mode for pay
+ROSTER_PAYROLL_RULES = {
+    'saturday': config('ROSTER_PAY_SATURDAY_MULTIPLIER', default='1.5'),
+    'sunday': config('ROSTER_PAY_SUNDAY_MULTIPLIER', default='2.0'),
+    'night': config('ROSTER_PAY_NIGHT_MULTIPLIER', default='1.15'),
+    'night_start': config('ROSTER_PAY_NIGHT_START', default='22:00'),
+    'night_end': config('ROSTER_PAY_NIGHT_END', default='06:00'),
+    'overtime': config('ROSTER_PAY_OVERTIME_MULTIPLIER', default='1.5'),
+    'overtime_after_hours': config('ROSTER_PAY_OVERTIME_AFTER_HOURS', default='38'),
+    'rounding': config('ROSTER_PAY_ROUNDING', default='ROUND_HALF_UP'),
+}
+# Recurring shifts are materialised as real shifts this many days ahead
+ROSTER_RECURRENCE_HORIZON_DAYS = config('ROSTER_RECURRENCE_HORIZON_DAYS', default=28, cast=int)
+
+# Notifications — 'in_app' is always written; any other channel listed here
+# is queued in the outbox and sent by `manage.py dispatch_notifications`
+ROSTER_NOTIFICATION_CHANNELS = config('ROSTER_NOTIFICATION_CHANNELS', default='in_app', cast=Csv())
+ROSTER_NOTIFICATION_BACKENDS = {
+    'email': config('ROSTER_EMAIL_BACKEND', default='roster.delivery.EmailBackend'),
+    'whatsapp': config('ROSTER_WHATSAPP_BACKEND', default='roster.delivery.ConsoleBackend'),
+}
+ROSTER_NOTIFICATION_FILE_PATH = config('ROSTER_NOTIFICATION_FILE_PATH', default=str(BASE_DIR / 'notifications.log'))
+ROSTER_NOTIFICATION_MAX_ATTEMPTS = config('ROSTER_NOTIFICATION_MAX_ATTEMPTS', default=5, cast=int)
+ROSTER_NOTIFICATION_RETRY_SECONDS = config('ROSTER_NOTIFICATION_RETRY_SECONDS', default=30, cast=int)
+ROSTER_WHATSAPP_API_URL = config('ROSTER_WHATSAPP_API_URL', default='')
+ROSTER_WHATSAPP_API_TOKEN = config('ROSTER_WHATSAPP_API_TOKEN', default='')
+# Repeats of these types (same user + shift) within the window update the
+# existing notification instead of adding a new one
+ROSTER_NOTIFICATION_COALESCE_SECONDS = {
+    'shift_updated': config('ROSTER_COALESCE_SHIFT_UPDATED_SECONDS', default=600, cast=int),
+}
+# How long before a shift starts `send_shift_reminders` reminds the guard
+ROSTER_REMINDER_LEAD_MINUTES = config('ROSTER_REMINDER_LEAD_MINUTES', default='1440,120', cast=Csv(int))
+# Read/delivered notifications older than this are moved to the archive
+ROSTER_NOTIFICATION_RETENTION_DAYS = config('ROSTER_NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+
+# ---------------------------------------------------------------------------
+# Email
+# ---------------------------------------------------------------------------
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='roster@localhost')
+
+# Live notification stream (SSE) — use roster.events.PostgresBackend when
+# more than one process serves requests or sends notifications
+ROSTER_EVENT_BACKEND = config('ROSTER_EVENT_BACKEND', default='roster.events.LocalBackend')
+ROSTER_EVENT_KEEPALIVE_SECONDS = config('ROSTER_EVENT_KEEPALIVE_SECONDS', default=20, cast=int)
+# How long a stream ticket (swapped for the access token, see roster.events)
+# stays valid for opening the stream
+ROSTER_STREAM_TICKET_SECONDS = config('ROSTER_STREAM_TICKET_SECONDS', default=60, cast=int)
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
-    ShiftTemplate, RosterShift, Availability,
-    PTORequest, DropRequest, Notification,
+    ShiftTemplate, RosterShift, RecurringShift, RosterDraft, DraftShift,
+    Availability, PTORequest, DropRequest, OpenShift, ShiftOffer,
+    LeaveLedgerEntry, LeaveBalance, CalendarFeed, PayPeriod, PayrollLine, Notification,
 )
 
 
@@ -32,6 +33,27 @@ class RosterShiftAdmin(admin.ModelAdmin):
         return f'${obj.total_pay:.2f}'
 
 
+@admin.register(RecurringShift)
+class RecurringShiftAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'branch', 'interval_weeks', 'start_date', 'end_date', 'materialized_until', 'is_active')
+    list_filter = ('is_active', 'branch')
+    search_fields = ('user__first_name', 'user__last_name', 'branch__name')
+
+
+class DraftShiftInline(admin.TabularInline):
+    model = DraftShift
+    fk_name = 'draft'
+    extra = 0
+    raw_id_fields = ('source_shift',)
+
+
+@admin.register(RosterDraft)
+class RosterDraftAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'branch', 'date_from', 'date_to', 'status', 'created_by', 'published_at')
+    list_filter = ('status', 'branch')
+    inlines = [DraftShiftInline]
+
+
 @admin.register(Availability)
 class AvailabilityAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'preset', 'start_time', 'end_time', 'is_available', 'notes')
@@ -55,8 +77,68 @@ class DropRequestAdmin(admin.ModelAdmin):
     search_fields = ('requested_by__first_name', 'requested_by__last_name')
 
 
+class ShiftOfferInline(admin.TabularInline):
+    model = ShiftOffer
+    extra = 0
+    readonly_fields = ('user', 'rank', 'score', 'status', 'created_at', 'responded_at')
+
+
+@admin.register(OpenShift)
+class OpenShiftAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'branch', 'date', 'status', 'filled_by', 'filled_at')
+    list_filter = ('status', 'branch')
+    inlines = [ShiftOfferInline]
+
+
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'leave_type', 'kind', 'hours', 'period_start', 'pto_request', 'created_at')
+    list_filter = ('leave_type', 'kind')
+    search_fields = ('user__first_name', 'user__last_name', 'note')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'leave_type', 'hours', 'updated_at')
+    list_filter = ('leave_type',)
+    search_fields = ('user__first_name', 'user__last_name')
+    # Moved only through the ledger (roster.leave)
+    readonly_fields = ('user', 'leave_type', 'hours', 'updated_at')
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ('user', 'changed_at', 'created_at')
+    search_fields = ('user__first_name', 'user__last_name')
+    readonly_fields = ('token', 'changed_at', 'created_at')
+
+
+class PayrollLineInline(admin.TabularInline):
+    model = PayrollLine
+    extra = 0
+    can_delete = False
+    fields = ('user', 'shift_count', 'total_hours', 'overtime_hours', 'gross_pay')
+    readonly_fields = fields
+
+
+@admin.register(PayPeriod)
+class PayPeriodAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'total_hours', 'gross_pay', 'computed_at', 'finalised_at')
+    list_filter = ('status', 'source')
+    # Computed and frozen only through roster.payroll
+    readonly_fields = (
+        'status', 'rules', 'fingerprint', 'total_hours', 'gross_pay', 'computed_at',
+        'finalised_by', 'finalised_at', 'created_by', 'created_at',
+    )
+    inlines = [PayrollLineInline]
+
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('user', 'notification_type', 'channel', 'title', 'is_read', 'sent_at')
-    list_filter = ('notification_type', 'channel', 'is_read')
+    list_display = (
+        'user', 'notification_type', 'channel', 'title', 'is_read', 'sent_at',
+        'delivery_status', 'attempts', 'latency_ms',
+    )
+    list_filter = ('notification_type', 'channel', 'is_read', 'delivery_status')
     search_fields = ('user__first_name', 'user__last_name', 'title')
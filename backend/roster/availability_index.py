@@ -0,0 +1,222 @@
+"""
+Bitset availability index — "who can work this shift" in one pass.
+
+Each user/date is a 96-slot bitmap (15 minutes per slot). A shift or query
+window is converted to a 192-bit mask spanning the date and the next day,
+so overnight windows (e.g. ``night_only`` 18:00–06:00) need no special
+casing: a candidate is free when ``free_window & mask == mask``.
+
+The bitmaps are persisted in ``AvailabilityBitmap`` and rebuilt for the
+affected (user, date) pairs whenever Availability, approved PTO or an
+active shift changes (see ``roster.signals``); bulk code paths that bypass
+signals call :func:`rebuild` directly.
+"""
+
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max
+
+from profiles.models import Profile
+
+from .models import (
+    ACTIVE_STATUSES, Availability, AvailabilityBitmap, PTORequest, RosterShift,
+    availability_window, shift_window,
+)
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+_BYTES = SLOTS_PER_DAY // 8
+
+
+# ---------------------------------------------------------------------------
+# Bit helpers
+# ---------------------------------------------------------------------------
+
+def _mask(first, last):
+    return ((1 << last) - 1) ^ ((1 << first) - 1) if last > first else 0
+
+
+def covered_mask(start, end):
+    """192-bit mask of slots lying entirely inside start–end (availability)."""
+    s, e = availability_window(start, end)
+    return _mask(-(-s // SLOT_MINUTES), e // SLOT_MINUTES)
+
+
+def touched_mask(start, end):
+    """192-bit mask of every slot start–end touches (shifts, queries)."""
+    s, e = shift_window(start, end)
+    return _mask(s // SLOT_MINUTES, -(-e // SLOT_MINUTES))
+
+
+def to_bytes(bits):
+    return (bits & FULL_DAY).to_bytes(_BYTES, 'big')
+
+
+def from_bytes(data):
+    return int.from_bytes(data, 'big')
+
+
+# ---------------------------------------------------------------------------
+# Maintenance
+# ---------------------------------------------------------------------------
+
+def rebuild(user_ids, dates):
+    """Recompute bitmaps for every (user, date) pair in the given sets."""
+    user_ids, dates = set(user_ids), set(dates)
+    if not user_ids or not dates:
+        return
+    lo, hi = min(dates), max(dates)
+
+    # Day bits plus the overnight carry from the previous date
+    avail, carry = {}, {}
+    for a in Availability.objects.filter(
+        user_id__in=user_ids, date__gte=lo - timedelta(days=1), date__lte=hi,
+    ):
+        bits = covered_mask(a.start_time, a.end_time) if a.is_available else 0
+        avail[(a.user_id, a.date)] = bits & FULL_DAY
+        carry[(a.user_id, a.date + timedelta(days=1))] = bits >> SLOTS_PER_DAY
+
+    booked = {}
+    for s in RosterShift.objects.filter(
+        user_id__in=user_ids, date__gte=lo - timedelta(days=1), date__lte=hi,
+        status__in=ACTIVE_STATUSES,
+    ).only('user_id', 'date', 'start_time', 'end_time'):
+        bits = touched_mask(s.start_time, s.end_time)
+        for key, part in (((s.user_id, s.date), bits & FULL_DAY),
+                          ((s.user_id, s.date + timedelta(days=1)), bits >> SLOTS_PER_DAY)):
+            booked[key] = booked.get(key, 0) | part
+
+    on_leave = set()
+    for pto in PTORequest.objects.filter(
+        user_id__in=user_ids, status='approved', start_date__lte=hi, end_date__gte=lo,
+    ).only('user_id', 'start_date', 'end_date'):
+        d = max(pto.start_date, lo)
+        while d <= min(pto.end_date, hi):
+            on_leave.add((pto.user_id, d))
+            d += timedelta(days=1)
+
+    rows = []
+    for user_id in user_ids:
+        for d in dates:
+            key = (user_id, d)
+            declared = key in avail
+            leave = key in on_leave
+            busy = booked.get(key, 0)
+            if not (declared or leave or busy):
+                continue  # no row → undeclared and free all day
+            free = (avail[key] | carry.get(key, 0)) if declared else FULL_DAY
+            free = 0 if leave else free & ~busy
+            rows.append(AvailabilityBitmap(
+                user_id=user_id, date=d,
+                free=to_bytes(free), booked=to_bytes(busy),
+                declared=declared, on_leave=leave,
+            ))
+
+    with transaction.atomic():
+        AvailabilityBitmap.objects.filter(user_id__in=user_ids, date__in=dates).delete()
+        AvailabilityBitmap.objects.bulk_create(rows)
+
+
+def rebuild_range(date_from, date_to, user_ids=None):
+    """Rebuild every LPO (or the given users) over a date range."""
+    if user_ids is None:
+        user_ids = Profile.objects.filter(role='LPO').values_list('user_id', flat=True)
+    dates = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), 200):
+        rebuild(user_ids[i:i + 200], dates)
+
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+# Per-process caches: day bitmaps are validated against a cheap
+# (row count, latest update) fingerprint on every query; the LPO directory
+# changes rarely and is cleared on Profile changes or after a short TTL.
+_DAY_CACHE_SIZE = 62
+_DIRECTORY_TTL = 60
+_day_cache = {}
+_directory_cache = {'loaded_at': None, 'users': None}
+
+
+def _day_bitmaps(d):
+    fingerprint = tuple(AvailabilityBitmap.objects.filter(date=d).aggregate(
+        rows=Count('id'), latest=Max('updated_at'),
+    ).values())
+    cached = _day_cache.get(d)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+
+    bitmaps = {
+        user_id: (from_bytes(free), from_bytes(booked), declared)
+        for user_id, free, booked, declared in AvailabilityBitmap.objects.filter(
+            date=d,
+        ).values_list('user_id', 'free', 'booked', 'declared')
+    }
+    if len(_day_cache) >= _DAY_CACHE_SIZE:
+        _day_cache.pop(next(iter(_day_cache)))
+    _day_cache[d] = (fingerprint, bitmaps)
+    return bitmaps
+
+
+def _directory():
+    """[(user_id, display name)] of active LPOs."""
+    loaded_at = _directory_cache['loaded_at']
+    if loaded_at is None or time.monotonic() - loaded_at > _DIRECTORY_TTL:
+        _directory_cache['users'] = [
+            (user_id, f'{first} {last}'.strip() or username)
+            for user_id, first, last, username in Profile.objects.filter(
+                role='LPO', status='Active',
+            ).order_by().values_list('user_id', 'user__first_name', 'user__last_name', 'user__username')
+        ]
+        _directory_cache['loaded_at'] = time.monotonic()
+    return _directory_cache['users']
+
+
+def lpo_directory():
+    """[(user_id, display name)] of active LPOs (cached, unordered)."""
+    return list(_directory())
+
+
+def clear_directory_cache():
+    _directory_cache['loaded_at'] = None
+
+
+def available_users(date, start_time, end_time, branch_id=None):
+    """
+    Return active LPOs free for the whole window, best candidates first:
+    declared availability, then preferred branch, then least booked that day.
+    """
+    need = touched_mask(start_time, end_time)
+    need_today, need_tomorrow = need & FULL_DAY, need >> SLOTS_PER_DAY
+
+    today = _day_bitmaps(date)
+    tomorrow = _day_bitmaps(date + timedelta(days=1)) if need_tomorrow else {}
+
+    preferred = set()
+    if branch_id:
+        preferred = set(Profile.preferred_branches.through.objects.filter(
+            branch_id=branch_id,
+        ).values_list('profile__user_id', flat=True))
+
+    results = []
+    for user_id, name in _directory():
+        free, booked, declared = today.get(user_id, (FULL_DAY, 0, False))
+        if free & need_today != need_today:
+            continue
+        if need_tomorrow and tomorrow.get(user_id, (FULL_DAY,))[0] & need_tomorrow != need_tomorrow:
+            continue
+        results.append({
+            'user_id': user_id,
+            'user_name': name,
+            'declared': declared,
+            'preferred_branch': user_id in preferred,
+            'booked_minutes': bin(booked).count('1') * SLOT_MINUTES,
+        })
+
+    results.sort(key=lambda r: (not r['declared'], not r['preferred_branch'], r['booked_minutes']))
+    return results
@@ -0,0 +1,88 @@
+"""
+Weekly LPO availability matrix — columnar, cached per week.
+
+The matrix for a week is stored as one list per field (``id``, ``preset``,
+``start_time`` …), each ``len(users) * 7`` long and indexed
+``user_index * 7 + weekday``; empty cells are ``None``. Built matrices are
+kept per process and tagged with an ETag made of the week's
+``AvailabilityWeek.version`` and the LPO directory, so an unchanged week is
+served from memory (or as a 304) after one primary-key lookup.
+
+Every Availability write bumps the version of just the weeks it touches:
+row saves/deletes through ``roster.signals``, bulk paths by calling
+:func:`touch` directly.
+"""
+
+import hashlib
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from . import availability_index
+from .models import Availability, AvailabilityWeek, week_of
+
+FIELDS = ('id', 'preset', 'start_time', 'end_time', 'is_available', 'notes')
+
+_CACHE_SIZE = 26
+_cache = {}  # week_start → (etag, matrix)
+
+
+def touch(dates):
+    """Invalidate the cached matrix of every week containing one of *dates*."""
+    weeks = {week_of(d) for d in dates if d}
+    if not weeks:
+        return
+    AvailabilityWeek.objects.bulk_create(
+        [AvailabilityWeek(week_start=w) for w in weeks], ignore_conflicts=True,
+    )
+    AvailabilityWeek.objects.filter(week_start__in=weeks).update(
+        version=F('version') + 1, updated_at=timezone.now(),
+    )
+
+
+def _users():
+    """Active LPOs as [(user_id, name)], ordered by name."""
+    return sorted(availability_index.lpo_directory(), key=lambda u: (u[1].lower(), u[0]))
+
+
+def etag(week_start, users=None):
+    users = _users() if users is None else users
+    version = AvailabilityWeek.objects.filter(
+        week_start=week_start,
+    ).values_list('version', flat=True).first() or 0
+    directory = hashlib.md5(repr(users).encode()).hexdigest()[:12]
+    return f'"{week_start}-{version}-{directory}"'
+
+
+def matrix(week_start):
+    """Return ``(etag, matrix)`` for the week containing *week_start*."""
+    # touch() bumps the Monday-keyed version, so the cache must be keyed the same way
+    week_start = week_of(week_start)
+    users = _users()
+    tag = etag(week_start, users)
+    cached = _cache.get(week_start)
+    if cached and cached[0] == tag:
+        return cached
+
+    dates = [week_start + timedelta(days=i) for i in range(7)]
+    index = {user_id: i for i, (user_id, _) in enumerate(users)}
+    columns = {f: [None] * (len(users) * 7) for f in FIELDS}
+    for *values, user_id, d in Availability.objects.filter(
+        date__gte=dates[0], date__lte=dates[-1], user_id__in=index,
+    ).values_list(*FIELDS, 'user_id', 'date'):
+        pos = index[user_id] * 7 + (d - week_start).days
+        for f, value in zip(FIELDS, values):
+            columns[f][pos] = value
+
+    result = (tag, {
+        'week_start': str(dates[0]),
+        'week_end': str(dates[-1]),
+        'dates': [str(d) for d in dates],
+        'users': [{'user_id': user_id, 'user_name': name} for user_id, name in users],
+        'columns': columns,
+    })
+    if week_start not in _cache and len(_cache) >= _CACHE_SIZE:
+        _cache.pop(next(iter(_cache)))
+    _cache[week_start] = result
+    return result
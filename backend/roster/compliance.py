@@ -0,0 +1,227 @@
+"""
+Labour compliance — rest, consecutive days and weekly hours per guard.
+
+Each user's active shifts form a timeline sorted by start time. Three
+sliding-window rules run over it:
+
+* ``min_rest`` — at least ``ROSTER_MIN_REST_HOURS`` between the end of one
+  shift and the start of the next;
+* ``max_consecutive_days`` — no run of worked days longer than
+  ``ROSTER_MAX_CONSECUTIVE_DAYS`` (a shift counts for the day it starts);
+* ``max_weekly_hours`` — net hours in any 7-day window stay within
+  ``ROSTER_MAX_WEEKLY_HOURS``.
+
+:func:`evaluate` reports every violation in a date range in one pass (one
+query). Edits only re-check the window around them: :class:`Checker` loads
+the users' timelines once and tests a proposed shift against just its
+neighbours, the run of days it joins and the seven 7-day windows it falls
+in — cheap enough to run per item in bulk paths, adding each accepted
+shift to the timeline as it goes.
+"""
+
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import ACTIVE_STATUSES, RosterShift, shift_window
+
+# start/end are absolute minutes (date ordinal × 1440 + minute of day)
+Entry = namedtuple('Entry', ['start', 'end', 'date', 'hours', 'ref'])
+
+
+def _key(entry):
+    return entry.start, entry.end
+
+
+def _pad():
+    """How far a shift's influence reaches either side of its date."""
+    return timedelta(days=max(settings.ROSTER_MAX_CONSECUTIVE_DAYS, 7))
+
+
+def to_entry(shift, ref=None):
+    """Timeline entry for a saved or unsaved shift."""
+    s, e = shift_window(shift.start_time, shift.end_time)
+    base = shift.date.toordinal() * 24 * 60
+    hours = Decimal(e - s - (shift.break_duration_minutes or 0)) / 60
+    return Entry(base + s, base + e, shift.date, hours, shift.pk if ref is None else ref)
+
+
+def _violation(user_id, rule, d, ref, message):
+    return {'user': user_id, 'rule': rule, 'date': d, 'shift': ref, 'message': message}
+
+
+def _load(user_ids, date_from, date_to, exclude_ids=()):
+    """``{user_id: [Entry]}`` sorted by start, for active shifts in the range."""
+    qs = RosterShift.objects.filter(
+        date__gte=date_from, date__lte=date_to, status__in=ACTIVE_STATUSES,
+    ).exclude(pk__in=exclude_ids).only('user_id', 'date', 'start_time', 'end_time', 'break_duration_minutes')
+    if user_ids is not None:
+        qs = qs.filter(user_id__in=user_ids)
+    timelines = {}
+    for s in qs:
+        timelines.setdefault(s.user_id, []).append(to_entry(s))
+    for entries in timelines.values():
+        entries.sort(key=_key)
+    return timelines
+
+
+# ---------------------------------------------------------------------------
+# Whole-range evaluation
+# ---------------------------------------------------------------------------
+
+def _rest(user_id, entries, date_from, date_to):
+    min_rest = settings.ROSTER_MIN_REST_HOURS * 60
+    for prev, nxt in zip(entries, entries[1:]):
+        gap = nxt.start - prev.end
+        if gap < min_rest and date_from <= nxt.date <= date_to:
+            yield _violation(
+                user_id, 'min_rest', nxt.date, nxt.ref,
+                f'Only {max(gap, 0) / 60:.1f}h rest before the shift on {nxt.date} '
+                f'(minimum {settings.ROSTER_MIN_REST_HOURS}h).',
+            )
+
+
+def _consecutive(user_id, entries, date_from, date_to):
+    limit = settings.ROSTER_MAX_CONSECUTIVE_DAYS
+    first_shift = {}
+    for e in entries:
+        first_shift.setdefault(e.date, e.ref)
+    days = sorted(first_shift)
+    run_start = 0
+    for i in range(1, len(days) + 1):
+        if i < len(days) and days[i] - days[i - 1] == timedelta(days=1):
+            continue
+        run = days[run_start:i]
+        if len(run) > limit and run[limit] <= date_to and run[-1] >= date_from:
+            yield _violation(
+                user_id, 'max_consecutive_days', run[limit], first_shift[run[limit]],
+                f'{len(run)} consecutive days worked from {run[0]} to {run[-1]} (maximum {limit}).',
+            )
+        run_start = i
+
+
+def _weekly(user_id, entries, date_from, date_to):
+    limit = settings.ROSTER_MAX_WEEKLY_HOURS
+    daily, last_shift = {}, {}
+    for e in entries:
+        daily[e.date] = daily.get(e.date, 0) + e.hours
+        last_shift[e.date] = e.ref
+    days = sorted(daily)
+
+    # Two pointers over worked days; overlapping over-limit windows merge into one
+    windows, lo, total = [], 0, 0
+    for d in days:
+        total += daily[d]
+        while days[lo] <= d - timedelta(days=7):
+            total -= daily[days[lo]]
+            lo += 1
+        if total <= limit:
+            continue
+        if windows and days[lo] <= windows[-1]['end']:
+            windows[-1]['end'], windows[-1]['peak'] = d, max(windows[-1]['peak'], total)
+        else:
+            windows.append({'start': d - timedelta(days=6), 'end': d, 'peak': total, 'first': d})
+
+    for w in windows:
+        if w['end'] >= date_from and w['start'] <= date_to:
+            yield _violation(
+                user_id, 'max_weekly_hours', w['first'], last_shift[w['first']],
+                f'{w["peak"]:.1f}h in a 7-day window between {w["start"]} and {w["end"]} '
+                f'(maximum {limit}h).',
+            )
+
+
+def evaluate(date_from, date_to, user_ids=None):
+    """Every violation touching date_from–date_to, sorted by user and date."""
+    pad = _pad()
+    violations = []
+    for user_id, entries in _load(user_ids, date_from - pad, date_to + pad).items():
+        for rule in (_rest, _consecutive, _weekly):
+            violations += rule(user_id, entries, date_from, date_to)
+    violations.sort(key=lambda v: (v['user'], v['date']))
+    return violations
+
+
+# ---------------------------------------------------------------------------
+# Incremental checks
+# ---------------------------------------------------------------------------
+
+class Checker:
+    """
+    Test proposed shifts against the timelines of *user_ids* around
+    date_from–date_to. Shifts in *exclude_ids* (e.g. the one being edited)
+    are left out.
+    """
+
+    def __init__(self, user_ids, date_from, date_to, exclude_ids=()):
+        pad = _pad()
+        self.timelines = _load(user_ids, date_from - pad, date_to + pad, exclude_ids)
+
+    def check(self, user_id, entry):
+        """Violations the proposed *entry* would take part in."""
+        timeline = self.timelines.get(user_id, [])
+        found = []
+
+        # Rest: only the neighbours either side can be too close
+        min_rest = settings.ROSTER_MIN_REST_HOURS * 60
+        i = bisect_left(timeline, _key(entry), key=_key)
+        prev = timeline[i - 1] if i else None
+        nxt = timeline[i] if i < len(timeline) else None
+        if prev and entry.start - prev.end < min_rest:
+            found.append(_violation(
+                user_id, 'min_rest', entry.date, entry.ref,
+                f'Only {max(entry.start - prev.end, 0) / 60:.1f}h rest after the shift on {prev.date} '
+                f'(minimum {settings.ROSTER_MIN_REST_HOURS}h).',
+            ))
+        if nxt and nxt.start - entry.end < min_rest:
+            found.append(_violation(
+                user_id, 'min_rest', nxt.date, entry.ref,
+                f'Only {max(nxt.start - entry.end, 0) / 60:.1f}h rest before the shift on {nxt.date} '
+                f'(minimum {settings.ROSTER_MIN_REST_HOURS}h).',
+            ))
+
+        # Consecutive days: the run this date joins
+        limit = settings.ROSTER_MAX_CONSECUTIVE_DAYS
+        worked = {e.date for e in timeline}
+        if entry.date not in worked:
+            first = last = entry.date
+            while first - timedelta(days=1) in worked:
+                first -= timedelta(days=1)
+            while last + timedelta(days=1) in worked:
+                last += timedelta(days=1)
+            if (last - first).days + 1 > limit:
+                found.append(_violation(
+                    user_id, 'max_consecutive_days', entry.date, entry.ref,
+                    f'{(last - first).days + 1} consecutive days worked from {first} to {last} (maximum {limit}).',
+                ))
+
+        # Weekly hours: the seven 7-day windows containing this date
+        daily = {}
+        for e in timeline:
+            if abs((e.date - entry.date).days) <= 6:
+                daily[e.date] = daily.get(e.date, 0) + e.hours
+        daily[entry.date] = daily.get(entry.date, 0) + entry.hours
+        for back in range(6, -1, -1):
+            start = entry.date - timedelta(days=back)
+            total = sum(daily.get(start + timedelta(days=k), 0) for k in range(7))
+            if total > settings.ROSTER_MAX_WEEKLY_HOURS:
+                found.append(_violation(
+                    user_id, 'max_weekly_hours', entry.date, entry.ref,
+                    f'{total:.1f}h in the 7 days from {start} (maximum {settings.ROSTER_MAX_WEEKLY_HOURS}h).',
+                ))
+                break
+        return found
+
+    def add(self, user_id, entry):
+        insort(self.timelines.setdefault(user_id, []), entry, key=_key)
+
+
+def check_shift(shift):
+    """Violations a single new or edited shift would cause."""
+    if shift.status not in ACTIVE_STATUSES:
+        return []
+    checker = Checker([shift.user_id], shift.date, shift.date, exclude_ids=[shift.pk] if shift.pk else ())
+    return checker.check(shift.user_id, to_entry(shift))
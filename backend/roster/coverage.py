@@ -0,0 +1,117 @@
+"""
+Branch coverage — guards on shift per branch and hour over a date range.
+
+Every shift adds a +1 at its start minute and a −1 at its end minute to its
+branch's difference array for the range; a single running sum then gives
+the headcount at every minute. Overnight shifts simply run on into the next
+day, and shifts that start the day before the range are loaded for their
+carry-over past midnight. Breaks are not subtracted — their position within
+a shift is not recorded.
+
+Each hour is reported as the lowest and highest headcount during it, so a
+half-hour hole still shows as ``min == 0``. The matrix is flat and
+row-major: ``min[day * 24 + hour]``.
+
+Results are kept per process, keyed by range and branches, and tagged with
+a fingerprint of the matching shifts (count, id sum, latest update) and the
+branch names, so an unchanged roster is served after two small queries.
+"""
+
+import hashlib
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db.models import Count, Max, Sum
+
+from branches.models import Branch
+
+from .models import RosterShift, shift_window
+
+# Shifts that put a guard on site (completed ones still count for past days)
+COVERAGE_STATUSES = ('scheduled', 'confirmed', 'completed')
+
+_DAY = 24 * 60
+_CACHE_SIZE = 32
+_cache = {}  # (date_from, date_to, branch ids) → (etag, result)
+
+
+def _shifts(date_from, date_to, branch_ids):
+    return RosterShift.objects.filter(
+        date__gte=date_from - timedelta(days=1), date__lte=date_to,
+        status__in=COVERAGE_STATUSES, branch_id__in=branch_ids,
+    )
+
+
+def _branches(branch_ids=None):
+    qs = Branch.objects.order_by('company__name', 'name')
+    if branch_ids:
+        qs = qs.filter(pk__in=branch_ids)
+    return list(qs.values_list('pk', 'name'))
+
+
+def etag(date_from, date_to, branches):
+    stats = _shifts(date_from, date_to, [pk for pk, _ in branches]).aggregate(
+        n=Count('id'), ids=Sum('id'), last=Max('updated_at'),
+    )
+    fingerprint = hashlib.md5(repr((branches, stats)).encode()).hexdigest()[:16]
+    return f'"{date_from}-{date_to}-{fingerprint}"'
+
+
+def sweep(shifts, date_from, days):
+    """``{branch_id: [headcount per minute]}`` for ``(branch_id, date, start, end)`` rows."""
+    size = days * _DAY
+    diff = {}
+    for branch_id, d, start, end in shifts:
+        s, e = shift_window(start, end)
+        offset = (d - date_from).days * _DAY
+        lo, hi = max(offset + s, 0), min(offset + e, size)
+        if lo >= hi:
+            continue
+        counts = diff.setdefault(branch_id, [0] * (size + 1))
+        counts[lo] += 1
+        counts[hi] -= 1
+    return {branch_id: list(accumulate(counts[:size])) for branch_id, counts in diff.items()}
+
+
+def matrix(date_from, date_to, branch_ids=None):
+    """Return ``(etag, coverage)`` for date_from–date_to, all branches unless given."""
+    branches = _branches(branch_ids)
+    key = (date_from, date_to, tuple(pk for pk, _ in branches))
+    tag = etag(date_from, date_to, branches)
+    cached = _cache.get(key)
+    if cached and cached[0] == tag:
+        return cached
+
+    days = (date_to - date_from).days + 1
+    per_minute = sweep(
+        _shifts(date_from, date_to, key[2]).values_list('branch_id', 'date', 'start_time', 'end_time'),
+        date_from, days,
+    )
+    empty = [0] * (days * 24)
+    rows = []
+    for branch_id, name in branches:
+        counts = per_minute.get(branch_id)
+        if counts is None:
+            lows = highs = empty
+        else:
+            hours = [counts[i:i + 60] for i in range(0, len(counts), 60)]
+            lows, highs = list(map(min, hours)), list(map(max, hours))
+        rows.append({
+            'branch_id': branch_id,
+            'branch_name': name,
+            'min': lows,
+            'max': highs,
+            'uncovered_hours': lows.count(0),
+        })
+
+    result = (tag, {
+        'date_from': str(date_from),
+        'date_to': str(date_to),
+        'dates': [str(date_from + timedelta(days=i)) for i in range(days)],
+        'hours_per_day': 24,
+        'branches': rows,
+    })
+    if key not in _cache and len(_cache) >= _CACHE_SIZE:
+        _cache.pop(next(iter(_cache)))
+    _cache[key] = result
+    return result
@@ -0,0 +1,221 @@
+"""
+Outbox delivery — sends queued email/WhatsApp notifications.
+
+The ``dispatch_notifications`` command calls :func:`dispatch_batch` in a loop.
+Each batch is claimed with ``SELECT … FOR UPDATE SKIP LOCKED`` so several
+workers can run side by side, handed to the channel backends on a thread
+pool, and the outcome written back with one ``bulk_update``. Claimed rows
+get a lease (``next_attempt_at``); if a worker dies mid-batch they become
+claimable again once it expires. Failures are retried with exponential
+backoff until ``ROSTER_NOTIFICATION_MAX_ATTEMPTS``.
+
+Backends are configured per channel in ``ROSTER_NOTIFICATION_BACKENDS`` and
+only need a ``send_messages(messages)`` method returning one error string
+(or ``None`` on success) per message.
+"""
+
+import json
+import logging
+import threading
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# What a backend receives — plain data, so worker threads never touch the ORM
+Message = namedtuple('Message', ['id', 'channel', 'to', 'title', 'body'])
+
+_LEASE = timedelta(minutes=5)
+_MAX_BACKOFF = timedelta(hours=1)
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class ConsoleBackend:
+    """Log each message instead of sending it (local development)."""
+
+    def send_messages(self, messages):
+        for m in messages:
+            logger.info('[%s] to=%s %s — %s', m.channel, m.to, m.title, m.body)
+        return [None] * len(messages)
+
+
+class FileBackend:
+    """Append each message as a JSON line to ``ROSTER_NOTIFICATION_FILE_PATH``."""
+
+    _lock = threading.Lock()
+
+    def send_messages(self, messages):
+        lines = ''.join(json.dumps(m._asdict()) + '\n' for m in messages)
+        with self._lock, open(settings.ROSTER_NOTIFICATION_FILE_PATH, 'a', encoding='utf-8') as fh:
+            fh.write(lines)
+        return [None] * len(messages)
+
+
+class EmailBackend:
+    """Send through Django's configured email backend over one connection."""
+
+    def send_messages(self, messages):
+        results = []
+        with get_connection() as connection:
+            for m in messages:
+                try:
+                    EmailMessage(m.title, m.body, to=[m.to], connection=connection).send()
+                    results.append(None)
+                except Exception as exc:
+                    results.append(str(exc) or exc.__class__.__name__)
+        return results
+
+
+class WhatsAppBackend:
+    """Send text messages through the WhatsApp Cloud API."""
+
+    def send_messages(self, messages):
+        results = []
+        for m in messages:
+            payload = json.dumps({
+                'messaging_product': 'whatsapp',
+                'to': m.to,
+                'type': 'text',
+                'text': {'body': f'{m.title}\n{m.body}'},
+            }).encode()
+            req = urllib.request.Request(
+                settings.ROSTER_WHATSAPP_API_URL,
+                data=payload,
+                headers={
+                    'Authorization': f'Bearer {settings.ROSTER_WHATSAPP_API_TOKEN}',
+                    'Content-Type': 'application/json',
+                },
+            )
+            try:
+                with urllib.request.urlopen(req, timeout=10):
+                    pass
+                results.append(None)
+            except Exception as exc:
+                results.append(str(exc) or exc.__class__.__name__)
+        return results
+
+
+_backends = {}
+
+
+def get_backend(channel):
+    if channel not in _backends:
+        _backends[channel] = import_string(settings.ROSTER_NOTIFICATION_BACKENDS[channel])()
+    return _backends[channel]
+
+
+# ---------------------------------------------------------------------------
+# Dispatch
+# ---------------------------------------------------------------------------
+
+def _claim(batch_size):
+    """Lock, lease and return up to *batch_size* due outbox rows."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.filter(
+                delivery_status__in=('pending', 'sending'), next_attempt_at__lte=now,
+            ).order_by('next_attempt_at').select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            Notification.objects.filter(pk__in=ids).update(
+                delivery_status='sending', attempts=F('attempts') + 1, next_attempt_at=now + _LEASE,
+            )
+    return list(Notification.objects.filter(pk__in=ids).select_related('user', 'user__profile'))
+
+
+def _address(notification):
+    if notification.channel == 'email':
+        return notification.user.email
+    profile = getattr(notification.user, 'profile', None)
+    return profile.phone if profile else ''
+
+
+def _backoff(attempts):
+    delay = timedelta(seconds=settings.ROSTER_NOTIFICATION_RETRY_SECONDS * 2 ** (attempts - 1))
+    return min(delay, _MAX_BACKOFF)
+
+
+def dispatch_batch(executor, batch_size=200, chunk_size=50):
+    """Deliver one batch of due notifications. Returns the number processed."""
+    rows = _claim(batch_size)
+    if not rows:
+        return 0
+
+    errors = {}
+    permanent = set()  # failures a retry cannot fix
+    by_channel = {}
+    for n in rows:
+        to = _address(n)
+        if not to:
+            errors[n.pk] = f'No {n.get_channel_display()} address for user'
+            permanent.add(n.pk)
+            continue
+        by_channel.setdefault(n.channel, []).append(
+            Message(n.pk, n.channel, to, n.title, n.message)
+        )
+
+    futures = []
+    for channel, messages in by_channel.items():
+        try:
+            backend = get_backend(channel)
+        except Exception as exc:
+            errors.update((m.id, f'Backend unavailable: {exc}') for m in messages)
+            permanent.update(m.id for m in messages)
+            continue
+        for i in range(0, len(messages), chunk_size):
+            chunk = messages[i:i + chunk_size]
+            futures.append((chunk, executor.submit(backend.send_messages, chunk)))
+
+    finished = {}
+    for chunk, future in futures:
+        try:
+            results = future.result()
+        except Exception as exc:
+            results = [str(exc) or exc.__class__.__name__] * len(chunk)
+        now = timezone.now()
+        for m, error in zip(chunk, results):
+            if error:
+                errors[m.id] = error
+            else:
+                finished[m.id] = now
+
+    max_attempts = settings.ROSTER_NOTIFICATION_MAX_ATTEMPTS
+    for n in rows:
+        if n.pk in finished:
+            n.delivery_status = 'delivered'
+            n.delivered_at = finished[n.pk]
+            n.latency_ms = int((n.delivered_at - n.sent_at).total_seconds() * 1000)
+            n.next_attempt_at = None
+            n.last_error = ''
+        else:
+            n.last_error = errors.get(n.pk, 'No result from backend')[:1000]
+            if n.attempts >= max_attempts or n.pk in permanent:
+                n.delivery_status = 'failed'
+                n.next_attempt_at = None
+            else:
+                n.delivery_status = 'pending'
+                n.next_attempt_at = timezone.now() + _backoff(n.attempts)
+
+    Notification.objects.bulk_update(
+        rows, ['delivery_status', 'delivered_at', 'latency_ms', 'next_attempt_at', 'last_error'],
+    )
+    return len(rows)
+
+
+def make_executor(workers):
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='notify')
@@ -0,0 +1,252 @@
+"""
+Draft rosters — stage edits, then publish the diff in one transaction.
+
+``open_draft`` snapshots the published shifts in a date range (optionally
+one branch) into ``DraftShift`` rows with one bulk insert. Managers edit the
+draft freely: nothing touches ``RosterShift``, the availability index or
+notifications until ``publish``.
+
+``publish`` compares every draft row with the shift it was copied from and
+applies, per user, the creates (rows without a source), updates (rows whose
+fields differ) and cancellations (removed rows) with one bulk statement
+each. Each affected user then gets a single ``roster_published``
+notification summarising their changes, instead of one per edit.
+
+Publishing is refused (``ValidationError``) when a source shift changed
+after the snapshot, unless ``force`` is set, when the result would give
+someone overlapping shifts, or when a created or changed shift would break a
+labour compliance rule (with ``ROSTER_COMPLIANCE_ENFORCE`` on).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import compliance, signals, sync
+from .models import ACTIVE_STATUSES, DraftShift, RosterDraft, RosterShift, shift_window
+from .notifications import build_notifications, send_notifications
+
+# Fields a draft row carries over to its shift
+SHIFT_FIELDS = (
+    'user_id', 'branch_id', 'template_id', 'date', 'start_time', 'end_time',
+    'break_duration_minutes', 'hourly_rate', 'notes',
+)
+
+
+def _published(draft):
+    qs = RosterShift.objects.filter(
+        date__gte=draft.date_from, date__lte=draft.date_to, status__in=ACTIVE_STATUSES,
+    )
+    if draft.branch_id:
+        qs = qs.filter(branch_id=draft.branch_id)
+    return qs
+
+
+def open_draft(draft):
+    """Copy the published shifts in the draft's scope into it. Returns the row count."""
+    rows = [
+        DraftShift(
+            draft=draft, source_shift=s, source_updated_at=s.updated_at,
+            **{f: getattr(s, f) for f in SHIFT_FIELDS},
+        )
+        for s in _published(draft)
+    ]
+    DraftShift.objects.bulk_create(rows)
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Diff
+# ---------------------------------------------------------------------------
+
+def diff(draft, rows=None, sources=None):
+    """
+    Compare the draft with the published roster. Returns
+    ``{user_id: {'created': [row], 'updated': [(row, shift)], 'cancelled': [shift]}}``
+    for users with at least one change, plus the list of stale rows (their
+    source shift changed or was cancelled since the snapshot).
+    """
+    if rows is None:
+        rows = list(draft.shifts.all())
+    if sources is None:
+        sources = RosterShift.objects.in_bulk([r.source_shift_id for r in rows if r.source_shift_id])
+
+    changes, stale = {}, []
+
+    def bucket(user_id):
+        return changes.setdefault(user_id, {'created': [], 'updated': [], 'cancelled': []})
+
+    for row in rows:
+        shift = sources.get(row.source_shift_id)
+        if row.source_shift_id is None:
+            if not row.is_removed:
+                bucket(row.user_id)['created'].append(row)
+            continue
+        if shift is None or shift.status not in ACTIVE_STATUSES or shift.updated_at != row.source_updated_at:
+            stale.append(row)
+            continue
+        if row.is_removed:
+            bucket(shift.user_id)['cancelled'].append(shift)
+        elif any(getattr(row, f) != getattr(shift, f) for f in SHIFT_FIELDS):
+            bucket(row.user_id)['updated'].append((row, shift))
+            if row.user_id != shift.user_id:
+                # Reassigned: the previous holder loses the shift
+                bucket(shift.user_id)['cancelled'].append(shift)
+    return changes, stale
+
+
+def _overlaps(draft, rows):
+    """Describe overlapping shifts the published draft would produce."""
+    live = [r for r in rows if not r.is_removed]
+    user_ids = {r.user_id for r in live}
+    if not user_ids:
+        return []
+    replaced = {r.source_shift_id for r in rows if r.source_shift_id}
+
+    intervals = {}
+
+    def book(user_id, d, start, end, label):
+        s, e = shift_window(start, end)
+        offset = (d - draft.date_from).days * 24 * 60
+        intervals.setdefault(user_id, []).append((offset + s, offset + e, label))
+
+    # Published shifts the draft does not cover (other branches, neighbouring days)
+    for s in RosterShift.objects.filter(
+        user_id__in=user_ids, status__in=ACTIVE_STATUSES,
+        date__gte=draft.date_from - timedelta(days=1), date__lte=draft.date_to + timedelta(days=1),
+    ).exclude(pk__in=replaced).select_related('branch'):
+        book(s.user_id, s.date, s.start_time, s.end_time, f'{s.date} {s.start_time:%H:%M} at {s.branch.name}')
+    for r in live:
+        book(r.user_id, r.date, r.start_time, r.end_time, f'{r.date} {r.start_time:%H:%M} (draft)')
+
+    conflicts = []
+    for user_id, spans in intervals.items():
+        spans.sort()
+        for (s1, e1, a), (s2, e2, b) in zip(spans, spans[1:]):
+            if s2 < e1:
+                conflicts.append(f'User {user_id}: {a} overlaps {b}')
+    return conflicts
+
+
+def _violations(draft, changes):
+    """Compliance breaches the created and changed rows would cause, when enforced."""
+    changed = [
+        row
+        for change in changes.values()
+        for row in change['created'] + [row for row, _ in change['updated']]
+    ]
+    if not changed or not settings.ROSTER_COMPLIANCE_ENFORCE:
+        return []
+    # The shifts being replaced or cancelled leave the timeline
+    replaced = {
+        shift.pk
+        for change in changes.values()
+        for shift in change['cancelled'] + [shift for _, shift in change['updated']]
+    }
+    checker = compliance.Checker({r.user_id for r in changed}, draft.date_from, draft.date_to, exclude_ids=replaced)
+    found = []
+    for row in sorted(changed, key=lambda r: (r.date, r.start_time)):
+        entry = compliance.to_entry(row)
+        found += [f'User {row.user_id}: {v["message"]}' for v in checker.check(row.user_id, entry)]
+        checker.add(row.user_id, entry)
+    return found
+
+
+# ---------------------------------------------------------------------------
+# Publish
+# ---------------------------------------------------------------------------
+
+def _summary(draft, change):
+    parts = []
+    for key, label in (('created', 'new'), ('updated', 'changed'), ('cancelled', 'cancelled')):
+        if change[key]:
+            parts.append(f'{len(change[key])} {label}')
+    return (
+        f'The roster for {draft.date_from} to {draft.date_to} has been published: '
+        f'{", ".join(parts)} shift(s). Check your calendar for details.'
+    )
+
+
+def publish(draft, user, force=False):
+    """
+    Apply the draft to the roster and notify each affected user once.
+    Returns ``{'created', 'updated', 'cancelled', 'users', 'skipped_stale'}``.
+    """
+    with transaction.atomic():
+        draft = RosterDraft.objects.select_for_update().get(pk=draft.pk)
+        if draft.status != 'open':
+            raise ValidationError(f'Draft is already {draft.status}.')
+
+        rows = list(draft.shifts.all())
+        sources = RosterShift.objects.select_for_update().in_bulk(
+            [r.source_shift_id for r in rows if r.source_shift_id]
+        )
+        changes, stale = diff(draft, rows, sources)
+        if stale and not force:
+            raise ValidationError([
+                f'Shift {r.source_shift_id or "(deleted)"} on {r.date} changed after the draft was opened.'
+                for r in stale
+            ])
+        stale_ids = {r.pk for r in stale}
+        conflicts = _overlaps(draft, [r for r in rows if r.pk not in stale_ids]) or _violations(draft, changes)
+        if conflicts:
+            raise ValidationError(conflicts)
+
+        now = timezone.now()
+        created, updated, moved, cancel_ids = [], [], [], set()
+
+        # Every (user, date) touched, before and after the change
+        touched = set()
+        for change in changes.values():
+            touched.update((row.user_id, row.date) for row in change['created'])
+            for row, shift in change['updated']:
+                touched.update({(row.user_id, row.date), (shift.user_id, shift.date)})
+            touched.update((shift.user_id, shift.date) for shift in change['cancelled'])
+
+        for change in changes.values():
+            created += [
+                RosterShift(created_by=user, **{f: getattr(row, f) for f in SHIFT_FIELDS})
+                for row in change['created']
+            ]
+            for row, shift in change['updated']:
+                if row.user_id != shift.user_id:
+                    moved.append((shift.pk, shift.user_id))
+                for f in SHIFT_FIELDS:
+                    setattr(shift, f, getattr(row, f))
+                shift.updated_at = now
+                updated.append(shift)
+            cancel_ids.update(s.pk for s in change['cancelled'])
+        # A reassigned shift moves to its new holder rather than being cancelled
+        cancel_ids -= {s.pk for s in updated}
+
+        RosterShift.objects.bulk_create(created)
+        RosterShift.objects.bulk_update(updated, [*SHIFT_FIELDS, 'updated_at'])
+        if cancel_ids:
+            RosterShift.objects.filter(pk__in=cancel_ids).update(
+                status='cancelled', notes=f'Cancelled: roster published ({draft})', updated_at=now,
+            )
+        signals.refresh_shifts(touched)
+        # Delta-sync clients of the previous holders drop the moved rows
+        sync.record('shift', moved)
+
+        draft.status = 'published'
+        draft.published_by = user
+        draft.published_at = now
+        draft.save(update_fields=['status', 'published_by', 'published_at', 'updated_at'])
+
+        send_notifications([
+            n
+            for user_id, change in changes.items()
+            for n in build_notifications(user_id, 'roster_published', 'Roster Published', _summary(draft, change))
+        ])
+
+    return {
+        'created': len(created),
+        'updated': len(updated),
+        'cancelled': len(cancel_ids),
+        'users': len(changes),
+        'skipped_stale': len(stale),
+    }
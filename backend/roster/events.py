@@ -0,0 +1,189 @@
+"""
+Live notification events for the SSE stream.
+
+Connected clients subscribe to the in-process :data:`broker`, which hands
+events to each connection's asyncio queue. Publishing goes through the
+backend named in ``ROSTER_EVENT_BACKEND`` so events reach streams held by
+other processes:
+
+* ``LocalBackend`` — delivers straight to this process's broker (single
+  ASGI process, development).
+* ``PostgresBackend`` — ``pg_notify`` on publish; every process with open
+  streams runs one ``LISTEN`` thread that feeds its broker. Works across
+  ASGI workers, WSGI workers and management commands.
+
+Events are published after the surrounding transaction commits, so a client
+never hears about a row it cannot read yet.
+
+EventSource can't send an Authorization header, so streams are opened with a
+:class:`StreamTicket` in the URL rather than the access token itself.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import Token
+
+logger = logging.getLogger(__name__)
+
+_CHANNEL = 'roster_events'
+_QUEUE_SIZE = 100
+
+
+# ---------------------------------------------------------------------------
+# In-process broker
+# ---------------------------------------------------------------------------
+
+class Broker:
+    """Fan events out to the asyncio queues of this process's open streams."""
+
+    def __init__(self):
+        self._subscribers = {}  # user_id → {(loop, queue)}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+        get_backend().listen()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def deliver(self, user_id, event, data):
+        """Queue an event for every stream of *user_id*. Safe from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_put, queue, (event, data))
+
+
+def _put(queue, item):
+    if queue.full():
+        queue.get_nowait()  # slow reader — drop the oldest event
+    queue.put_nowait(item)
+
+
+broker = Broker()
+
+
+# ---------------------------------------------------------------------------
+# Cross-process backends
+# ---------------------------------------------------------------------------
+
+class LocalBackend:
+    """Deliver to this process only."""
+
+    def publish(self, events):
+        for user_id, event, data in events:
+            broker.deliver(user_id, event, data)
+
+    def listen(self):
+        pass
+
+
+class PostgresBackend:
+    """Relay events between processes with Postgres LISTEN/NOTIFY."""
+
+    # NOTIFY payloads are capped at 8000 bytes
+    _MAX_PAYLOAD = 7900
+
+    def __init__(self):
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, events):
+        payloads = []
+        for user_id, event, data in events:
+            payload = json.dumps([user_id, event, data], cls=DjangoJSONEncoder)
+            if len(payload.encode()) > self._MAX_PAYLOAD:
+                logger.warning('Dropping oversized %s event for user %s', event, user_id)
+                continue
+            payloads.append(payload)
+        if payloads:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload',
+                    [_CHANNEL, payloads],
+                )
+
+    def listen(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._run, name='roster-events', daemon=True)
+                self._listener.start()
+
+    def _run(self):
+        while True:
+            try:
+                conn = connections['default']
+                conn.ensure_connection()
+                raw = conn.connection
+                raw.execute(f'LISTEN {_CHANNEL}')
+                for notify in raw.notifies():
+                    user_id, event, data = json.loads(notify.payload)
+                    broker.deliver(user_id, event, data)
+            except Exception:
+                logger.exception('Event listener lost its connection; reconnecting')
+                connections['default'].close()
+                time.sleep(2)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.ROSTER_EVENT_BACKEND)()
+    return _backend
+
+
+def publish(events):
+    """Publish ``[(user_id, event, data)]`` once the current transaction commits."""
+    events = list(events)
+    if events:
+        transaction.on_commit(lambda: get_backend().publish(events))
+
+
+def format_event(event, data, event_id=None):
+    """Encode one Server-Sent Events frame."""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event}', f'data: {json.dumps(data, cls=DjangoJSONEncoder)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+# ---------------------------------------------------------------------------
+# Stream tickets
+# ---------------------------------------------------------------------------
+
+class StreamTicket(Token):
+    """
+    Short-lived JWT that only opens the notification stream.
+
+    Its own ``token_type`` keeps it from authenticating API requests, and it
+    expires after ``ROSTER_STREAM_TICKET_SECONDS``, so one leaked from a URL
+    or access log is of little use. ``session_exp`` carries the expiry of the
+    access token it was issued against; the stream closes at that point.
+    """
+    token_type = 'stream'
+    lifetime = timedelta(seconds=settings.ROSTER_STREAM_TICKET_SECONDS)
+
+    @classmethod
+    def for_access_token(cls, user, access_token):
+        ticket = cls.for_user(user)
+        ticket['session_exp'] = access_token['exp']
+        return ticket
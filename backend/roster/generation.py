@@ -0,0 +1,113 @@
+"""
+Template-driven roster generation — expand templates over a date range.
+
+Each rule names a ``ShiftTemplate``, a weekday mask and a list of users;
+every user gets the template's shift on every matching date, with the
+template's branch, times, break and rate copied onto the row. Conflicts are
+checked in memory against one load of the users' active shifts and approved
+leave (plus the rows generated so far), along with the labour compliance
+rules (``roster.compliance``), then everything is written with a single
+``bulk_create``.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from . import compliance, signals
+from .models import ACTIVE_STATUSES, PTORequest, RosterShift, shift_window
+
+_BATCH = 1000
+
+
+def expand(rules, date_from, date_to):
+    """
+    Unsaved ``RosterShift`` rows for ``rules`` — ``[(template, weekday mask,
+    [user_id])]`` — between date_from and date_to, in date order.
+    """
+    rows = []
+    d = date_from
+    while d <= date_to:
+        for template, weekdays, user_ids in rules:
+            if not weekdays & (1 << d.weekday()):
+                continue
+            rows += [
+                RosterShift(
+                    user_id=user_id, branch_id=template.branch_id, template=template, date=d,
+                    start_time=template.start_time, end_time=template.end_time,
+                    break_duration_minutes=template.break_duration_minutes,
+                    hourly_rate=template.hourly_rate,
+                )
+                for user_id in user_ids
+            ]
+        d += timedelta(days=1)
+    return rows
+
+
+def find_conflicts(rows, date_from, date_to):
+    """
+    Split *rows* into ``(clear, conflicts)``. A row conflicts when its user is
+    on approved leave that day, or it overlaps an active shift or an earlier
+    row of the batch (overnight shifts included), or breaks a compliance rule
+    when ``ROSTER_COMPLIANCE_ENFORCE`` is on. ``conflicts`` is a list of
+    ``(row, reason)``.
+    """
+    user_ids = {r.user_id for r in rows}
+    busy = {}
+
+    def book(user_id, d, start, end):
+        s, e = shift_window(start, end)
+        offset = (d - date_from).days * 24 * 60
+        busy.setdefault(user_id, []).append((offset + s, offset + e))
+
+    def overlaps(user_id, d, start, end):
+        s, e = shift_window(start, end)
+        offset = (d - date_from).days * 24 * 60
+        return any(bs < offset + e and offset + s < be for bs, be in busy.get(user_id, ()))
+
+    for s in RosterShift.objects.filter(
+        user_id__in=user_ids, date__gte=date_from - timedelta(days=1), date__lte=date_to + timedelta(days=1),
+        status__in=ACTIVE_STATUSES,
+    ).only('user_id', 'date', 'start_time', 'end_time'):
+        book(s.user_id, s.date, s.start_time, s.end_time)
+
+    on_leave = set()
+    for pto in PTORequest.objects.filter(
+        user_id__in=user_ids, status='approved', start_date__lte=date_to, end_date__gte=date_from,
+    ).only('user_id', 'start_date', 'end_date'):
+        d = max(pto.start_date, date_from)
+        while d <= min(pto.end_date, date_to):
+            on_leave.add((pto.user_id, d))
+            d += timedelta(days=1)
+
+    checker = compliance.Checker(user_ids, date_from, date_to) if settings.ROSTER_COMPLIANCE_ENFORCE else None
+
+    clear, conflicts = [], []
+    for r in rows:
+        if (r.user_id, r.date) in on_leave:
+            conflicts.append((r, 'on approved leave'))
+            continue
+        if overlaps(r.user_id, r.date, r.start_time, r.end_time):
+            conflicts.append((r, 'overlaps another shift'))
+            continue
+        if checker:
+            entry = compliance.to_entry(r, ref=len(clear))
+            violations = checker.check(r.user_id, entry)
+            if violations:
+                conflicts.append((r, violations[0]['message']))
+                continue
+            checker.add(r.user_id, entry)
+        book(r.user_id, r.date, r.start_time, r.end_time)
+        clear.append(r)
+    return clear, conflicts
+
+
+def create(rows, created_by):
+    """Insert *rows* in bulk and refresh the availability index."""
+    for r in rows:
+        r.created_by = created_by
+    with transaction.atomic():
+        RosterShift.objects.bulk_create(rows, batch_size=_BATCH)
+        signals.refresh_shifts((r.user_id, r.date) for r in rows)
+    return rows
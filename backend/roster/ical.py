@@ -0,0 +1,143 @@
+"""
+iCalendar roster feeds — one secret ``.ics`` URL per user.
+
+Calendar apps poll feeds aggressively, so a poll is answered from the
+user's ``CalendarFeed`` row alone. :func:`touch` moves its ``changed_at``
+whenever one of their shifts is written (``roster.signals`` and every bulk
+path that writes shifts); that stamp, with today's date since the feed's
+window slides daily, gives the ETag and Last-Modified. Unchanged feeds get
+a 304 without a shift query; a changed feed is rendered once per process
+and kept until its stamp moves again.
+
+The feed covers ``ROSTER_ICAL_PAST_DAYS`` back to ``ROSTER_ICAL_FUTURE_DAYS``
+ahead. Cancelled shifts stay in it as ``STATUS:CANCELLED`` so calendars
+remove them. Shift times are local (``TIME_ZONE``) and written as UTC.
+"""
+
+import secrets
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CalendarFeed, RosterShift
+
+_CACHE_SIZE = 256
+_cache = {}  # user_id → (etag, body)
+
+
+def feed_for(user):
+    """The user's feed, created on first use."""
+    feed, _ = CalendarFeed.objects.get_or_create(user=user, defaults={'token': secrets.token_urlsafe(32)})
+    return feed
+
+
+def rotate(user):
+    """Replace the user's feed token; the old URL stops working."""
+    feed = feed_for(user)
+    feed.token = secrets.token_urlsafe(32)
+    feed.save(update_fields=['token'])
+    return feed
+
+
+def touch(user_ids):
+    """Mark the feeds of *user_ids* as changed (users without a feed are skipped)."""
+    user_ids = {u for u in user_ids if u}
+    if user_ids:
+        CalendarFeed.objects.filter(user_id__in=user_ids).update(changed_at=timezone.now())
+
+
+def validators(feed):
+    """``(etag, last_modified)`` for *feed*; last_modified is a datetime."""
+    today = timezone.localdate()
+    midnight = datetime.combine(today, datetime.min.time(), tzinfo=ZoneInfo(settings.TIME_ZONE))
+    last_modified = max(feed.changed_at, midnight).replace(microsecond=0)
+    return f'"{feed.user_id}-{feed.changed_at.timestamp():.6f}-{today}"', last_modified
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces (RFC 5545 §3.1)."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line
+    parts, start = [], 0
+    while start < len(raw):
+        end = min(start + (75 if not parts else 74), len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        parts.append(raw[start:end].decode())
+        start = end
+    return '\r\n '.join(parts)
+
+
+def _utc(d, t, tz):
+    return datetime.combine(d, t, tzinfo=tz).astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(shift, tz):
+    end_date = shift.date if shift.end_time > shift.start_time else shift.date + timedelta(days=1)
+    summary = f'{shift.template.name} shift' if shift.template_id else 'Shift'
+    details = [f'Break: {shift.break_duration_minutes} min'] if shift.break_duration_minutes else []
+    if shift.notes:
+        details.append(shift.notes)
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:roster-shift-{shift.pk}',
+        f'DTSTAMP:{shift.updated_at.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}',
+        f'DTSTART:{_utc(shift.date, shift.start_time, tz)}',
+        f'DTEND:{_utc(end_date, shift.end_time, tz)}',
+        f'SEQUENCE:{int(shift.updated_at.timestamp())}',
+        f'SUMMARY:{_escape(f"{summary} — {shift.branch.name}")}',
+        f'LOCATION:{_escape(shift.branch.address)}',
+        f'STATUS:{"CANCELLED" if shift.status == "cancelled" else "CONFIRMED"}',
+    ]
+    if details:
+        lines.append(f'DESCRIPTION:{_escape(chr(10).join(details))}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def render(feed, etag):
+    """The feed body (bytes) for the state *etag* describes."""
+    cached = _cache.get(feed.user_id)
+    if cached and cached[0] == etag:
+        return cached[1]
+
+    today = timezone.localdate()
+    tz = ZoneInfo(settings.TIME_ZONE)
+    shifts = RosterShift.objects.filter(
+        user_id=feed.user_id,
+        date__gte=today - timedelta(days=settings.ROSTER_ICAL_PAST_DAYS),
+        date__lte=today + timedelta(days=settings.ROSTER_ICAL_FUTURE_DAYS),
+    ).exclude(status='no_show').select_related('branch__address', 'template').order_by('date', 'start_time')
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Roster//Shift Feed//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:My Shifts',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H',
+    ]
+    for shift in shifts:
+        lines += _event(shift, tz)
+    lines.append('END:VCALENDAR')
+    body = ('\r\n'.join(_fold(line) for line in lines) + '\r\n').encode()
+
+    if feed.user_id not in _cache and len(_cache) >= _CACHE_SIZE:
+        _cache.pop(next(iter(_cache)))
+    _cache[feed.user_id] = (etag, body)
+    return body
@@ -0,0 +1,306 @@
+"""
+Leave balances — a ledger of accruals and leave taken, with cached totals.
+
+Every movement is a ``LeaveLedgerEntry``. ``LeaveBalance`` holds the running
+total per user and leave type and is moved by atomic ``F()`` updates as
+entries are posted, so reading a balance is one row lookup, however long
+the history.
+
+* :func:`accrue` posts a month's entitlement — hours worked on completed
+  shifts times the type's rate, or a fixed amount — once per user, leave
+  type and month.
+* :func:`sync_pto` (:func:`sync_ptos` for many) keeps the hours deducted
+  for a leave request equal to its weekdays × ``ROSTER_LEAVE_DAY_HOURS``
+  while approved and zero otherwise, posting only the difference.
+* :func:`recompute` re-derives past accruals and deductions from their
+  sources, posts any differences as adjustments and rebuilds the cached
+  totals from the ledger.
+"""
+
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import LeaveBalance, LeaveLedgerEntry, PTORequest, RosterShift
+
+# Balance each leave type draws on; personal/carer's leave comes out of sick leave
+BALANCE_TYPES = {'annual': 'annual', 'sick': 'sick', 'personal': 'sick'}
+
+_CENT = Decimal('0.01')
+_BATCH = 500
+
+
+def _hours(value):
+    return Decimal(value).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def accrual_rules():
+    """``{leave_type: (mode, rate)}`` parsed from ``ROSTER_LEAVE_ACCRUAL``."""
+    rules = {}
+    for leave_type, spec in settings.ROSTER_LEAVE_ACCRUAL.items():
+        mode, _, rate = spec.partition(':')
+        if mode not in ('worked', 'fixed') or not rate:
+            raise ImproperlyConfigured(
+                f'ROSTER_LEAVE_ACCRUAL[{leave_type!r}] must be "worked:<rate>" or "fixed:<hours>".'
+            )
+        rules[leave_type] = (mode, Decimal(rate))
+    return rules
+
+
+def month_start(d):
+    return d.replace(day=1)
+
+
+def next_month(d):
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def leave_hours(start_date, end_date):
+    """Hours a leave request takes: its weekdays × ``ROSTER_LEAVE_DAY_HOURS``."""
+    days = sum(
+        1 for i in range((end_date - start_date).days + 1)
+        if (start_date + timedelta(days=i)).weekday() < 5
+    )
+    return _hours(days * Decimal(settings.ROSTER_LEAVE_DAY_HOURS))
+
+
+# ---------------------------------------------------------------------------
+# Posting
+# ---------------------------------------------------------------------------
+
+def _move_balances(deltas):
+    """Apply ``{(user_id, leave_type): hours}`` to the cached balances."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    LeaveBalance.objects.bulk_create(
+        [LeaveBalance(user_id=user_id, leave_type=leave_type) for user_id, leave_type in deltas],
+        ignore_conflicts=True,
+    )
+    keys = list(deltas)
+    now = timezone.now()
+    for i in range(0, len(keys), _BATCH):
+        chunk = keys[i:i + _BATCH]
+        match = Q()
+        for user_id, leave_type in chunk:
+            match |= Q(user_id=user_id, leave_type=leave_type)
+        LeaveBalance.objects.filter(match).update(
+            hours=F('hours') + Case(
+                *[When(user_id=u, leave_type=t, then=Value(deltas[(u, t)])) for u, t in chunk],
+                default=Value(Decimal(0)),
+            ),
+            updated_at=now,
+        )
+
+
+def post(entries):
+    """Insert ledger *entries* (zero-hour ones are dropped) and move the balances."""
+    entries = [e for e in entries if e.hours]
+    if not entries:
+        return []
+    with transaction.atomic():
+        LeaveLedgerEntry.objects.bulk_create(entries, batch_size=_BATCH)
+        deltas = {}
+        for e in entries:
+            deltas[(e.user_id, e.leave_type)] = deltas.get((e.user_id, e.leave_type), 0) + e.hours
+        _move_balances(deltas)
+    return entries
+
+
+def balances(user_ids):
+    """``{user_id: {leave_type: hours}}`` from the cached balances."""
+    result = {user_id: {} for user_id in user_ids}
+    for user_id, leave_type, hours in LeaveBalance.objects.filter(
+        user_id__in=result,
+    ).values_list('user_id', 'leave_type', 'hours'):
+        result[user_id][leave_type] = hours
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Accrual
+# ---------------------------------------------------------------------------
+
+def _expected(period_start, user_ids=None):
+    """``{(user_id, leave_type): hours}`` the month starting *period_start* earns."""
+    rules = accrual_rules()
+    expected = {}
+
+    if any(mode == 'worked' for mode, _ in rules.values()):
+        worked = RosterShift.objects.filter(
+            status='completed', date__gte=period_start, date__lt=next_month(period_start),
+        )
+        if user_ids is not None:
+            worked = worked.filter(user_id__in=user_ids)
+        for user_id, hours in worked.values('user_id').annotate(
+            hours=Sum('total_hours'),
+        ).order_by().values_list('user_id', 'hours'):
+            for leave_type, (mode, rate) in rules.items():
+                if mode == 'worked':
+                    expected[(user_id, leave_type)] = _hours((hours or 0) * rate)
+
+    if any(mode == 'fixed' for mode, _ in rules.values()):
+        staff = User.objects.filter(profile__role='LPO', profile__status='Active')
+        if user_ids is not None:
+            staff = staff.filter(pk__in=user_ids)
+        for user_id in staff.values_list('pk', flat=True):
+            for leave_type, (mode, rate) in rules.items():
+                if mode == 'fixed':
+                    expected[(user_id, leave_type)] = _hours(rate)
+
+    return {key: hours for key, hours in expected.items() if hours}
+
+
+def accrue(period_start, user_ids=None, created_by=None):
+    """Post the month's accruals that are not posted yet. Returns the new entries."""
+    period_start = month_start(period_start)
+    with transaction.atomic():
+        posted = set(LeaveLedgerEntry.objects.filter(
+            kind='accrual', period_start=period_start,
+        ).values_list('user_id', 'leave_type'))
+        return post([
+            LeaveLedgerEntry(
+                user_id=user_id, leave_type=leave_type, kind='accrual', hours=hours,
+                period_start=period_start, note=f'Accrued for {period_start:%B %Y}', created_by=created_by,
+            )
+            for (user_id, leave_type), hours in _expected(period_start, user_ids).items()
+            if (user_id, leave_type) not in posted
+        ])
+
+
+# ---------------------------------------------------------------------------
+# Leave taken
+# ---------------------------------------------------------------------------
+
+def _pto_entries(pto, taken, created_by=None):
+    """Entries moving *pto*'s deductions from *taken* (``{leave_type: hours}``) to its target."""
+    target = {}
+    balance_type = BALANCE_TYPES.get(pto.leave_type)
+    if pto.status == 'approved' and balance_type:
+        target[balance_type] = -leave_hours(pto.start_date, pto.end_date)
+
+    entries = []
+    for leave_type in set(target) | set(taken):
+        delta = target.get(leave_type, 0) - taken.get(leave_type, 0)
+        if delta:
+            entries.append(LeaveLedgerEntry(
+                user_id=pto.user_id, leave_type=leave_type, kind='leave', hours=delta, pto_request=pto,
+                note=f'{pto.get_leave_type_display()} {pto.start_date} to {pto.end_date}'
+                     f'{"" if delta < 0 else " (returned)"}',
+                created_by=created_by,
+            ))
+    return entries
+
+
+def _taken(pto_ids):
+    """``{pto_id: {leave_type: hours}}`` already deducted for the given requests."""
+    taken = {}
+    for pto_id, leave_type, hours in LeaveLedgerEntry.objects.filter(
+        pto_request_id__in=pto_ids, kind='leave',
+    ).values('pto_request_id', 'leave_type').annotate(
+        hours=Sum('hours'),
+    ).order_by().values_list('pto_request_id', 'leave_type', 'hours'):
+        taken.setdefault(pto_id, {})[leave_type] = hours
+    return taken
+
+
+def sync_pto(pto, created_by=None):
+    """
+    Bring the hours deducted for *pto* in line with its current status,
+    dates and type. Returns the entries posted (none when already in step).
+    """
+    return sync_ptos([pto], created_by)
+
+
+def sync_ptos(ptos, created_by=None):
+    """:func:`sync_pto` for many requests, with one lookup and one posting."""
+    with transaction.atomic():
+        taken = _taken([p.pk for p in ptos])
+        return post([e for p in ptos for e in _pto_entries(p, taken.get(p.pk, {}), created_by)])
+
+
+# ---------------------------------------------------------------------------
+# Recompute
+# ---------------------------------------------------------------------------
+
+def recompute(user_ids=None, created_by=None):
+    """
+    Re-derive every posted month's accrual and every leave request's
+    deduction from the roster and PTO records, post the differences as
+    adjustments, then rebuild the cached balances from the ledger.
+    Returns ``(entries posted, balances repaired)``.
+    """
+    rules = accrual_rules()
+    ledger = LeaveLedgerEntry.objects.all()
+    ptos = PTORequest.objects.filter(Q(status='approved') | Q(leave_entries__isnull=False)).distinct()
+    if user_ids is not None:
+        ledger = ledger.filter(user_id__in=user_ids)
+        ptos = ptos.filter(user_id__in=user_ids)
+
+    with transaction.atomic():
+        entries = []
+
+        # Accruals: compare each posted month with what its shifts earn now
+        months = ledger.filter(kind='accrual').values_list('period_start', flat=True).distinct().order_by()
+        for period_start in sorted(months):
+            posted = {
+                (user_id, leave_type): hours
+                for user_id, leave_type, hours in ledger.filter(
+                    kind__in=('accrual', 'adjustment'), period_start=period_start, pto_request__isnull=True,
+                ).values('user_id', 'leave_type').annotate(
+                    hours=Sum('hours'),
+                ).order_by().values_list('user_id', 'leave_type', 'hours')
+            }
+            expected = _expected(period_start, user_ids)
+            # Fixed accruals of people who have since left stay as posted
+            keys = set(expected) | {
+                key for key in posted if rules.get(key[1], ('worked',))[0] == 'worked'
+            }
+            for user_id, leave_type in keys:
+                delta = expected.get((user_id, leave_type), 0) - posted.get((user_id, leave_type), 0)
+                if delta:
+                    entries.append(LeaveLedgerEntry(
+                        user_id=user_id, leave_type=leave_type, kind='adjustment', hours=delta,
+                        period_start=period_start, note=f'Recomputed accrual for {period_start:%B %Y}',
+                        created_by=created_by,
+                    ))
+
+        # Leave taken: every approved request, and every request with deductions
+        ptos = list(ptos)
+        taken = _taken([p.pk for p in ptos])
+        for pto in ptos:
+            entries += _pto_entries(pto, taken.get(pto.pk, {}), created_by)
+        post(entries)
+
+        # Cached balances: rebuild from the ledger under lock
+        locked = LeaveBalance.objects.select_for_update()
+        if user_ids is not None:
+            locked = locked.filter(user_id__in=user_ids)
+        cached = {(b.user_id, b.leave_type): b for b in locked}
+        actual = {
+            (user_id, leave_type): hours
+            for user_id, leave_type, hours in ledger.values('user_id', 'leave_type').annotate(
+                hours=Sum('hours'),
+            ).order_by().values_list('user_id', 'leave_type', 'hours')
+        }
+        now = timezone.now()
+        drifted, missing = [], []
+        for key in set(cached) | set(actual):
+            hours = actual.get(key, Decimal(0))
+            balance = cached.get(key)
+            if balance is None:
+                missing.append(LeaveBalance(user_id=key[0], leave_type=key[1], hours=hours))
+            elif balance.hours != hours:
+                balance.hours = hours
+                balance.updated_at = now
+                drifted.append(balance)
+        LeaveBalance.objects.bulk_create(missing, batch_size=_BATCH)
+        LeaveBalance.objects.bulk_update(drifted, ['hours', 'updated_at'], batch_size=_BATCH)
+
+    return len(entries), len(drifted) + len(missing)
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from roster import leave
+
+
+def _month(value):
+    try:
+        return date.fromisoformat(f'{value}-01')
+    except ValueError:
+        raise CommandError(f'Months must be YYYY-MM, got {value!r}.')
+
+
+class Command(BaseCommand):
+    help = (
+        'Post leave accruals for completed months (default: last month). Months '
+        'already accrued are skipped, so re-running is safe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='YYYY-MM to accrue (default: last month)')
+        parser.add_argument('--from-month', help='YYYY-MM to catch up from, through --month')
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Limit to user id(s)')
+
+    def handle(self, *args, **options):
+        this_month = leave.month_start(timezone.localdate())
+        last = _month(options['month']) if options['month'] else leave.month_start(this_month - timedelta(days=1))
+        first = _month(options['from_month']) if options['from_month'] else last
+        if last >= this_month:
+            raise CommandError('Only completed months can be accrued.')
+        if first > last:
+            raise CommandError('--from-month must be on or before --month.')
+
+        period, posted = first, 0
+        while period <= last:
+            posted += len(leave.accrue(period, user_ids=options['users']))
+            period = leave.next_month(period)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Accrued leave for {first:%Y-%m} → {last:%Y-%m}: {posted} entr{"y" if posted == 1 else "ies"} posted.'
+        ))
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from roster.models import Notification, NotificationArchive
+
+ARCHIVE_FIELDS = [
+    'id', 'user_id', 'notification_type', 'channel', 'title', 'message',
+    'related_shift_id', 'repeat_count', 'sent_at', 'delivery_status', 'delivered_at',
+]
+
+
+class Command(BaseCommand):
+    help = 'Move old read/delivered notifications to NotificationArchive in bounded chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive rows older than this (default: ROSTER_NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--max-chunks', type=int, default=None, help='Stop after this many chunks')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.ROSTER_NOTIFICATION_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        # Only rows nobody is waiting on: read in-app rows and finished deliveries
+        archivable = Notification.objects.filter(
+            Q(channel='in_app', is_read=True)
+            | (~Q(channel='in_app') & Q(delivery_status__in=('delivered', 'failed'))),
+            sent_at__lt=cutoff,
+        )
+
+        moved = chunks = 0
+        while options['max_chunks'] is None or chunks < options['max_chunks']:
+            count = self._archive_chunk(archivable, options['chunk_size'])
+            if not count:
+                break
+            moved += count
+            chunks += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} notification(s) older than {days} days.'))
+
+    def _archive_chunk(self, archivable, size):
+        with transaction.atomic():
+            rows = list(
+                archivable.order_by('sent_at').select_for_update(skip_locked=True).values(*ARCHIVE_FIELDS)[:size]
+            )
+            if not rows:
+                return 0
+            ids = [row.pop('id') for row in rows]
+            NotificationArchive.objects.bulk_create(
+                [NotificationArchive(original_id=pk, **row) for pk, row in zip(ids, rows)],
+                ignore_conflicts=True,
+            )
+            Notification.objects.filter(pk__in=ids).delete()
+        return len(ids)
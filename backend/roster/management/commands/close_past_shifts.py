@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from attendance.models import Attendance
+from roster.models import RosterShift
+
+ACTIVE_STATUSES = ('scheduled', 'confirmed')
+
+
+class Command(BaseCommand):
+    help = (
+        'Move past scheduled/confirmed shifts to completed (or no_show when '
+        '--use-attendance finds no clock-in), in chunked set-based updates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-days', type=int, default=1,
+                            help='Leave shifts dated within this many days before today alone (default: 1)')
+        parser.add_argument('--use-attendance', action='store_true',
+                            help='Mark shifts without an approved clock-in that day as no_show')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() - timedelta(days=options['grace_days'])
+        past = RosterShift.objects.filter(date__lt=cutoff, status__in=ACTIVE_STATUSES)
+        clocked_in = Exists(Attendance.objects.filter(
+            user=OuterRef('user'),
+            type='clock_in',
+            status='approved',
+            created_at__date=OuterRef('date'),
+        ))
+
+        completed = no_show = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    past.order_by('pk').select_for_update(skip_locked=True).values_list('pk', flat=True)[:options['chunk_size']]
+                )
+                if not ids:
+                    break
+                chunk = RosterShift.objects.filter(pk__in=ids)
+                now = timezone.now()
+                if options['use_attendance']:
+                    completed += chunk.filter(clocked_in).update(status='completed', updated_at=now)
+                    no_show += chunk.filter(status__in=ACTIVE_STATUSES).update(status='no_show', updated_at=now)
+                else:
+                    completed += chunk.update(status='completed', updated_at=now)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Closed shifts before {cutoff}: {completed} completed, {no_show} no-show.'
+        ))
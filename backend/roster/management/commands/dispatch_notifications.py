@@ -0,0 +1,39 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from roster import delivery
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued email/WhatsApp notifications from the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=4, help='Delivery threads')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        total = 0
+        with delivery.make_executor(options['workers']) as executor:
+            while self.running:
+                close_old_connections()
+                processed = delivery.dispatch_batch(executor, batch_size=options['batch_size'])
+                total += processed
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} notification(s).'))
+
+    def _stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from roster import recurrence
+
+
+class Command(BaseCommand):
+    help = 'Create concrete shifts from recurring patterns up to the rolling horizon (run daily).'
+
+    def handle(self, *args, **options):
+        created, skipped = recurrence.materialize()
+        self.stdout.write(self.style.SUCCESS(
+            f'Materialised {created} shift(s) up to {recurrence.horizon_end()}; '
+            f'skipped {skipped} conflicting occurrence(s).'
+        ))
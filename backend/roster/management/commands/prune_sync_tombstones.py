@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from roster.models import SyncTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete delta-sync tombstones older than ROSTER_SYNC_RETENTION_DAYS, in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        days = settings.ROSTER_SYNC_RETENTION_DAYS
+        # Clients older than this get reset by roster.sync, so nothing reads these
+        old = SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days))
+
+        pruned = 0
+        while True:
+            ids = list(old.order_by('deleted_at').values_list('pk', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            pruned += SyncTombstone.objects.filter(pk__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} sync tombstone(s) older than {days} days.'))
@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from roster import availability_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user availability bitmaps for a date range.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='YYYY-MM-DD (default: today)')
+        parser.add_argument('--date-to', help='YYYY-MM-DD (default: date-from + 60 days)')
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Limit to user id(s)')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else date.today()
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else date_from + timedelta(days=60)
+        except ValueError:
+            raise CommandError('Dates must be YYYY-MM-DD.')
+        if date_to < date_from:
+            raise CommandError('--date-to must be on or after --date-from.')
+
+        availability_index.rebuild_range(date_from, date_to, user_ids=options['users'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt availability index {date_from} → {date_to}.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from roster import leave
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-derive accrued and taken leave from shifts and PTO requests, post '
+        'corrections as adjustments, and rebuild cached leave balances from the ledger.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Limit to user id(s)')
+
+    def handle(self, *args, **options):
+        posted, repaired = leave.recompute(user_ids=options['users'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Posted {posted} correction(s), repaired {repaired} balance(s).'
+        ))
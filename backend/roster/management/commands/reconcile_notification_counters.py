@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from roster.models import Notification, NotificationCounter
+
+
+class Command(BaseCommand):
+    help = 'Recount unread in-app notifications and repair drifted per-user counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Limit to user id(s)')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        unread = Notification.objects.filter(channel='in_app', is_read=False)
+        counters = NotificationCounter.objects.all()
+        if options['users']:
+            unread = unread.filter(user_id__in=options['users'])
+            counters = counters.filter(user_id__in=options['users'])
+
+        user_ids = sorted(
+            set(unread.values_list('user_id', flat=True).distinct().order_by())
+            | set(counters.values_list('user_id', flat=True))
+        )
+        repaired = 0
+        size = options['chunk_size']
+        for i in range(0, len(user_ids), size):
+            repaired += self._reconcile(user_ids[i:i + size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(user_ids)} user(s), repaired {repaired} counter(s).'
+        ))
+
+    def _reconcile(self, user_ids):
+        with transaction.atomic():
+            # Lock the counters first: concurrent F() adjustments wait, and any
+            # insert they belong to is either counted below or not yet visible
+            NotificationCounter.objects.bulk_create(
+                [NotificationCounter(user_id=user_id) for user_id in user_ids], ignore_conflicts=True,
+            )
+            counters = {
+                c.user_id: c
+                for c in NotificationCounter.objects.select_for_update().filter(user_id__in=user_ids)
+            }
+            actual = dict(
+                Notification.objects.filter(user_id__in=user_ids, channel='in_app', is_read=False)
+                .values('user_id').annotate(n=Count('id')).order_by().values_list('user_id', 'n')
+            )
+            drifted = []
+            now = timezone.now()
+            for user_id, counter in counters.items():
+                if counter.unread != actual.get(user_id, 0):
+                    counter.unread = actual.get(user_id, 0)
+                    counter.updated_at = now
+                    drifted.append(counter)
+            NotificationCounter.objects.bulk_update(drifted, ['unread', 'updated_at'])
+        return len(drifted)
@@ -0,0 +1,31 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from roster.reminders import send_due_reminders
+
+
+class Command(BaseCommand):
+    help = 'Send reminders for upcoming shifts (run from cron, or with --loop as a worker).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, one tick per interval')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between ticks with --loop')
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        while True:
+            close_old_connections()
+            sent = send_due_reminders()
+            self.stdout.write(f'Sent {sent} shift reminder(s).')
+            if not options['loop'] or not self.running:
+                break
+            time.sleep(options['interval'])
+
+    def _stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,257 @@
+"""
+Open-shift marketplace — offer uncovered shifts to ranked replacements.
+
+An approved drop request turns the dropped shift into an ``OpenShift``.
+:func:`rank` scores every eligible LPO for a batch of open shifts with a
+fixed number of queries, however many candidates there are:
+
+* availability, existing shifts and approved leave come from the bitmap
+  index (``availability_index.available_users``);
+* weekly hours for every candidate come from one aggregate query;
+* the labour compliance rules run in memory over one timeline load.
+
+Candidates are ordered by cost — declared availability, preferred branch,
+then how far the shift would push them past ``ROSTER_TARGET_WEEKLY_HOURS``.
+The best ``ROSTER_OPEN_SHIFT_OFFERS`` get a ``ShiftOffer``; the first to
+accept is assigned under a row lock on the open shift, so a shift can only
+be filled once. Declines move the offer on to the next candidates.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import availability_index, compliance
+from .models import ACTIVE_STATUSES, OpenShift, RosterShift, ShiftOffer, week_of
+from .notifications import build_notifications, send_notifications
+
+# Cost weights (lower is better)
+_UNDECLARED_PENALTY = 10
+_NOT_PREFERRED_PENALTY = 5
+_FAIRNESS_WEIGHT = 20
+_OVERTIME_WEIGHT = 50
+
+
+def _open_shift(shift, drop_request=None):
+    return OpenShift(
+        source_shift=shift, drop_request=drop_request,
+        branch=shift.branch, template_id=shift.template_id, date=shift.date,
+        start_time=shift.start_time, end_time=shift.end_time,
+        break_duration_minutes=shift.break_duration_minutes, hourly_rate=shift.hourly_rate,
+        notes=shift.notes,
+    )
+
+
+def open_from_shift(shift, drop_request=None):
+    """Create an open shift with the same slot as *shift*."""
+    open_shift = _open_shift(shift, drop_request)
+    open_shift.save()
+    return open_shift
+
+
+def open_from_shifts(pairs):
+    """Create one open shift per ``(shift, drop_request)`` in a single insert."""
+    return OpenShift.objects.bulk_create([_open_shift(shift, drop) for shift, drop in pairs])
+
+
+# ---------------------------------------------------------------------------
+# Ranking
+# ---------------------------------------------------------------------------
+
+def rank(open_shifts):
+    """``{open_shift.pk: [candidate dict]}`` best first, for each open shift."""
+    open_shifts = list(open_shifts)
+    if not open_shifts:
+        return {}
+
+    free = {
+        o.pk: availability_index.available_users(o.date, o.start_time, o.end_time, branch_id=o.branch_id)
+        for o in open_shifts
+    }
+    excluded = {
+        o.pk: {o.source_shift.user_id} if o.source_shift_id else set()
+        for o in open_shifts
+    }
+    user_ids = {c['user_id'] for candidates in free.values() for c in candidates}
+    if not user_ids:
+        return {o.pk: [] for o in open_shifts}
+
+    # Net hours already rostered per (user, week), one query for every week involved
+    weeks = {week_of(o.date) for o in open_shifts}
+    week_hours = {}
+    for row in RosterShift.objects.filter(
+        user_id__in=user_ids, status__in=ACTIVE_STATUSES,
+        date__gte=min(weeks), date__lt=max(weeks) + timedelta(days=7),
+    ).values('user_id', 'date').annotate(hours=Sum('total_hours')):
+        key = (row['user_id'], week_of(row['date']))
+        week_hours[key] = week_hours.get(key, 0) + float(row['hours'] or 0)
+
+    checker = compliance.Checker(
+        user_ids, min(o.date for o in open_shifts), max(o.date for o in open_shifts),
+    ) if settings.ROSTER_COMPLIANCE_ENFORCE else None
+
+    target = settings.ROSTER_TARGET_WEEKLY_HOURS
+    ranked = {}
+    for o in open_shifts:
+        entry = compliance.to_entry(o, ref=o.pk)
+        shift_hours = float(entry.hours)
+        candidates = []
+        for c in free[o.pk]:
+            if c['user_id'] in excluded[o.pk]:
+                continue
+            if checker and checker.check(c['user_id'], entry):
+                continue
+            hours = week_hours.get((c['user_id'], week_of(o.date)), 0)
+            over = max(0.0, hours + shift_hours - target)
+            score = (
+                (0 if c['declared'] else _UNDECLARED_PENALTY)
+                + (0 if c['preferred_branch'] else _NOT_PREFERRED_PENALTY)
+                + _FAIRNESS_WEIGHT * hours / target
+                + _OVERTIME_WEIGHT * over / target
+            )
+            candidates.append({**c, 'week_hours': round(hours, 2), 'score': round(score, 2)})
+        candidates.sort(key=lambda c: (c['score'], c['user_id']))
+        ranked[o.pk] = candidates
+    return ranked
+
+
+# ---------------------------------------------------------------------------
+# Offers
+# ---------------------------------------------------------------------------
+
+def send_offers(open_shift, limit=None):
+    """
+    Offer *open_shift* to the next best candidates who have not had an offer
+    yet. Returns the new offers.
+    """
+    with transaction.atomic():
+        open_shift = OpenShift.objects.select_for_update(of=('self',)).select_related(
+            'branch', 'source_shift',
+        ).get(pk=open_shift.pk)
+        if open_shift.status != 'open':
+            return []
+        return _offer([open_shift], limit)
+
+
+def send_first_offers(open_shifts, limit=None):
+    """
+    Make the first round of offers for newly created *open_shifts*, ranking
+    them together. Returns the new offers.
+    """
+    with transaction.atomic():
+        return _offer(open_shifts, limit)
+
+
+def _offer(open_shifts, limit=None):
+    """Offer each open shift (already locked or new) to its next best candidates."""
+    limit = limit or settings.ROSTER_OPEN_SHIFT_OFFERS
+    offered = {}
+    for open_shift_id, user_id, offer_rank in ShiftOffer.objects.filter(
+        open_shift__in=open_shifts,
+    ).values_list('open_shift_id', 'user_id', 'rank'):
+        offered.setdefault(open_shift_id, {})[user_id] = offer_rank
+
+    ranked = rank(open_shifts)
+    new = []
+    for open_shift in open_shifts:
+        taken = offered.get(open_shift.pk, {})
+        next_rank = max(taken.values(), default=0) + 1
+        candidates = [c for c in ranked[open_shift.pk] if c['user_id'] not in taken][:limit]
+        new += [
+            ShiftOffer(open_shift=open_shift, user_id=c['user_id'], rank=next_rank + i, score=c['score'])
+            for i, c in enumerate(candidates)
+        ]
+
+    offers = ShiftOffer.objects.bulk_create(new)
+    send_notifications([
+        n
+        for offer in offers
+        for n in build_notifications(
+            offer.user_id, 'shift_offer',
+            'Open Shift Available',
+            f'A shift on {offer.open_shift.date} at {offer.open_shift.branch.name} '
+            f'({offer.open_shift.start_time:%H:%M}–{offer.open_shift.end_time:%H:%M}) is available. '
+            f'Accept it in the app — first come, first served.',
+        )
+    ])
+    return offers
+
+
+def decline(open_shift, user):
+    """Record *user* declining; offers go out to the next candidates if none are left."""
+    with transaction.atomic():
+        updated = ShiftOffer.objects.filter(
+            open_shift=open_shift, user=user, status='pending',
+        ).update(status='declined', responded_at=timezone.now())
+        if not updated:
+            raise ValidationError('You have no pending offer for this shift.')
+        if not open_shift.offers.filter(status='pending').exists():
+            send_offers(open_shift)
+
+
+def fill(open_shift, user, assigned_by, require_offer=True):
+    """
+    Assign *open_shift* to *user* (the first accepted offer wins). Raises
+    ``ValidationError`` if the shift is gone, the user has no pending offer
+    (when required), or the shift would clash with their roster.
+    """
+    with transaction.atomic():
+        open_shift = OpenShift.objects.select_for_update(of=('self',)).select_related('branch').get(pk=open_shift.pk)
+        if open_shift.status != 'open':
+            raise ValidationError('This shift is no longer available.')
+        offer = ShiftOffer.objects.select_for_update().filter(open_shift=open_shift, user=user).first()
+        if require_offer and (offer is None or offer.status != 'pending'):
+            raise ValidationError('You have no pending offer for this shift.')
+
+        shift = RosterShift(
+            user=user, branch=open_shift.branch, template_id=open_shift.template_id,
+            date=open_shift.date, start_time=open_shift.start_time, end_time=open_shift.end_time,
+            break_duration_minutes=open_shift.break_duration_minutes, hourly_rate=open_shift.hourly_rate,
+            notes=open_shift.notes, created_by=assigned_by,
+        )
+        shift.clean()
+        violations = compliance.check_shift(shift)
+        if violations and settings.ROSTER_COMPLIANCE_ENFORCE:
+            raise ValidationError([v['message'] for v in violations])
+        shift.save()
+
+        now = timezone.now()
+        open_shift.status = 'filled'
+        open_shift.filled_by = user
+        open_shift.filled_shift = shift
+        open_shift.filled_at = now
+        open_shift.save(update_fields=['status', 'filled_by', 'filled_shift', 'filled_at'])
+        if offer:
+            offer.status = 'accepted' if offer.status == 'pending' else offer.status
+            offer.responded_at = now
+            offer.save(update_fields=['status', 'responded_at'])
+        ShiftOffer.objects.filter(open_shift=open_shift, status='pending').exclude(user=user).update(
+            status='expired', responded_at=now,
+        )
+
+        admin_ids = User.objects.filter(profile__role='Admin').exclude(pk=user.pk).values_list('pk', flat=True)
+        send_notifications(
+            build_notifications(
+                user.pk, 'shift_assigned',
+                'New Shift Assigned',
+                f'You have been assigned a shift on {shift.date} '
+                f'at {open_shift.branch.name} ({shift.start_time:%H:%M}–{shift.end_time:%H:%M}).',
+                shift.pk,
+            ) + [
+                n
+                for admin_id in admin_ids
+                for n in build_notifications(
+                    admin_id, 'shift_assigned',
+                    'Open Shift Filled',
+                    f'{user.get_full_name() or user.username} took the open shift on {shift.date} '
+                    f'at {open_shift.branch.name}.',
+                    shift.pk,
+                )
+            ]
+        )
+    return shift
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:49
+
+import django.db.models.expressions
+import django.db.models.functions.datetime
+import django.db.models.functions.math
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        ('roster', '0004_alter_availability_preset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rostershift',
+            name='gross_hours',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(models.Case(models.When(end_time__gt=models.F('start_time'), then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time')))), default=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time'))), '+', models.Value(1440)), output_field=models.IntegerField()), '/', models.Value(Decimal('60.0'))), 2, output_field=models.DecimalField(decimal_places=2, max_digits=6)), output_field=models.DecimalField(decimal_places=2, max_digits=6)),
+        ),
+        migrations.AddField(
+            model_name='rostershift',
+            name='total_hours',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.Case(models.When(end_time__gt=models.F('start_time'), then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time')))), default=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time'))), '+', models.Value(1440)), output_field=models.IntegerField()), '-', models.F('break_duration_minutes')), '/', models.Value(Decimal('60.0'))), 2, output_field=models.DecimalField(decimal_places=2, max_digits=6)), output_field=models.DecimalField(decimal_places=2, max_digits=6)),
+        ),
+        migrations.AddField(
+            model_name='rostershift',
+            name='total_pay',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.Case(models.When(end_time__gt=models.F('start_time'), then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time')))), default=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time'))), '+', models.Value(1440)), output_field=models.IntegerField()), '-', models.F('break_duration_minutes')), '*', models.F('hourly_rate')), '/', models.Value(60)), 2, output_field=models.DecimalField(decimal_places=2, max_digits=12)), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.AddField(
+            model_name='shifttemplate',
+            name='duration_hours',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(models.Case(models.When(end_time__gt=models.F('start_time'), then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time')))), default=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time'))), '+', models.Value(1440)), output_field=models.IntegerField()), '/', models.Value(Decimal('60.0'))), 2, output_field=models.DecimalField(decimal_places=2, max_digits=6)), output_field=models.DecimalField(decimal_places=2, max_digits=6)),
+        ),
+        migrations.AddField(
+            model_name='shifttemplate',
+            name='net_hours',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.Case(models.When(end_time__gt=models.F('start_time'), then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time')))), default=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('end_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('end_time')), '-', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.ExtractHour('start_time'), '*', models.Value(60)), '+', django.db.models.functions.datetime.ExtractMinute('start_time'))), '+', models.Value(1440)), output_field=models.IntegerField()), '-', models.F('break_duration_minutes')), '/', models.Value(Decimal('60.0'))), 2, output_field=models.DecimalField(decimal_places=2, max_digits=6)), output_field=models.DecimalField(decimal_places=2, max_digits=6)),
+        ),
+        migrations.AddIndex(
+            model_name='rostershift',
+            index=models.Index(fields=['total_hours'], name='roster_rost_total_h_95a1cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rostershift',
+            index=models.Index(fields=['date', 'total_pay'], name='roster_rost_date_f923c7_idx'),
+        ),
+    ]
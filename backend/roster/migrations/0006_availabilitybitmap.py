@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-19 04:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0005_shift_generated_hours_and_pay'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('free', models.BinaryField(help_text='Bitmap of slots the user can still be rostered for', max_length=12)),
+                ('booked', models.BinaryField(help_text='Bitmap of slots covered by active shifts', max_length=12)),
+                ('declared', models.BooleanField(default=False, help_text='True when an Availability row exists for the date')),
+                ('on_leave', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_bitmaps', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='roster_avai_date_aa182a_idx')],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
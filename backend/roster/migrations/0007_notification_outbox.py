@@ -0,0 +1,58 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_delivered(apps, schema_editor):
+    """Rows written before the outbox existed were shown in-app already."""
+    Notification = apps.get_model('roster', 'Notification')
+    Notification.objects.update(
+        delivery_status='delivered', delivered_at=models.F('sent_at'), latency_ms=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0006_availabilitybitmap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='delivery_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='last_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='latency_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['delivery_status', 'next_attempt_at'], name='roster_noti_deliver_732225_idx'),
+        ),
+        migrations.RunPython(mark_existing_delivered, migrations.RunPython.noop),
+    ]
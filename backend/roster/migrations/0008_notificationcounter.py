@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    Notification = apps.get_model('roster', 'Notification')
+    NotificationCounter = apps.get_model('roster', 'NotificationCounter')
+    NotificationCounter.objects.bulk_create([
+        NotificationCounter(user_id=row['user_id'], unread=row['unread'])
+        for row in Notification.objects.filter(channel='in_app', is_read=False)
+        .values('user_id').annotate(unread=models.Count('id')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0007_notification_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0008_notificationcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('user_id', models.IntegerField(db_index=True)),
+                ('notification_type', models.CharField(choices=[('shift_assigned', 'Shift Assigned'), ('shift_updated', 'Shift Updated'), ('shift_cancelled', 'Shift Cancelled'), ('drop_request', 'Drop Request'), ('drop_approved', 'Drop Approved'), ('drop_rejected', 'Drop Rejected'), ('pto_request', 'PTO Request'), ('pto_approved', 'PTO Approved'), ('pto_rejected', 'PTO Rejected'), ('reminder', 'Shift Reminder'), ('conflict', 'Schedule Conflict')], max_length=30)),
+                ('channel', models.CharField(choices=[('in_app', 'In-App'), ('email', 'Email'), ('whatsapp', 'WhatsApp')], max_length=20)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('related_shift_id', models.IntegerField(blank=True, null=True)),
+                ('repeat_count', models.PositiveIntegerField(default=1)),
+                ('sent_at', models.DateTimeField()),
+                ('delivery_status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('delivered', 'Delivered'), ('failed', 'Failed')], max_length=20)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-sent_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='repeat_count',
+            field=models.PositiveIntegerField(default=1, help_text='Repeats coalesced into this row'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-sent_at'], name='roster_noti_user_id_883a72_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['sent_at'], name='roster_noti_sent_at_b41925_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationarchive',
+            index=models.Index(fields=['sent_at'], name='roster_noti_sent_at_bd113b_idx'),
+        ),
+    ]
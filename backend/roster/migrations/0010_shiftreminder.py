@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0009_notification_coalescing_and_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lead_minutes', models.PositiveIntegerField()),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('shift', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='roster.rostershift')),
+            ],
+            options={
+                'unique_together': {('shift', 'lead_minutes')},
+            },
+        ),
+    ]
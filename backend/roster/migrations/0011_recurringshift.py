@@ -0,0 +1,56 @@
+# Generated by Django 6.0.2 on 2026-10-19 17:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        ('roster', '0010_shiftreminder'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringShift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('break_duration_minutes', models.PositiveIntegerField(default=0, help_text='Unpaid break in minutes')),
+                ('hourly_rate', models.DecimalField(decimal_places=2, default=0, help_text='Hourly rate ($)', max_digits=8)),
+                ('weekdays', models.PositiveSmallIntegerField(help_text='Bitmask of weekdays: Monday = 1, Tuesday = 2 … Sunday = 64')),
+                ('interval_weeks', models.PositiveSmallIntegerField(default=1, help_text='Repeat every N weeks')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, help_text='Last date of the pattern (blank = no end)', null=True)),
+                ('materialized_until', models.DateField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('notes', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_shifts', to='branches.branch')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_recurring_shifts', to=settings.AUTH_USER_MODEL)),
+                ('template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_shifts', to='roster.shifttemplate')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_shifts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'start_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='rostershift',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, help_text='Pattern this shift was materialised from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shifts', to='roster.recurringshift'),
+        ),
+        migrations.AddConstraint(
+            model_name='rostershift',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurrence__isnull', False)), fields=('recurrence', 'date'), name='roster_shift_unique_recurrence_date'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringshift',
+            index=models.Index(fields=['is_active', 'materialized_until'], name='roster_recu_is_acti_95e875_idx'),
+        ),
+    ]
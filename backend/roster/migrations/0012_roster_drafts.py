@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-19 18:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        ('roster', '0011_recurringshift'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('shift_assigned', 'Shift Assigned'), ('shift_updated', 'Shift Updated'), ('shift_cancelled', 'Shift Cancelled'), ('drop_request', 'Drop Request'), ('drop_approved', 'Drop Approved'), ('drop_rejected', 'Drop Rejected'), ('pto_request', 'PTO Request'), ('pto_approved', 'PTO Approved'), ('pto_rejected', 'PTO Rejected'), ('reminder', 'Shift Reminder'), ('conflict', 'Schedule Conflict'), ('roster_published', 'Roster Published')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='notificationarchive',
+            name='notification_type',
+            field=models.CharField(choices=[('shift_assigned', 'Shift Assigned'), ('shift_updated', 'Shift Updated'), ('shift_cancelled', 'Shift Cancelled'), ('drop_request', 'Drop Request'), ('drop_approved', 'Drop Approved'), ('drop_rejected', 'Drop Rejected'), ('pto_request', 'PTO Request'), ('pto_approved', 'PTO Approved'), ('pto_rejected', 'PTO Rejected'), ('reminder', 'Shift Reminder'), ('conflict', 'Schedule Conflict'), ('roster_published', 'Roster Published')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='RosterDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, default='', max_length=255)),
+                ('date_from', models.DateField()),
+                ('date_to', models.DateField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('published', 'Published'), ('discarded', 'Discarded')], default='open', max_length=20)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='roster_drafts', to='branches.branch')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='roster_drafts', to=settings.AUTH_USER_MODEL)),
+                ('published_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='published_roster_drafts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DraftShift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_updated_at', models.DateTimeField(blank=True, help_text='source_shift.updated_at when snapshotted', null=True)),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('break_duration_minutes', models.PositiveIntegerField(default=0, help_text='Unpaid break in minutes')),
+                ('hourly_rate', models.DecimalField(decimal_places=2, default=0, help_text='Hourly rate ($)', max_digits=8)),
+                ('notes', models.TextField(blank=True, default='')),
+                ('is_removed', models.BooleanField(default=False)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draft_shifts', to='branches.branch')),
+                ('source_shift', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='draft_copies', to='roster.rostershift')),
+                ('template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='draft_shifts', to='roster.shifttemplate')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draft_shifts', to=settings.AUTH_USER_MODEL)),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shifts', to='roster.rosterdraft')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='rosterdraft',
+            index=models.Index(fields=['status', 'date_from'], name='roster_rost_status_69bd5b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draftshift',
+            index=models.Index(fields=['draft', 'date'], name='roster_draf_draft_i_bb087f_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0012_roster_drafts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityWeek',
+            fields=[
+                ('week_start', models.DateField(help_text='Monday of the week', primary_key=True, serialize=False)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 6.0.2 on 2026-10-19 20:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        ('roster', '0013_availabilityweek'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('shift_assigned', 'Shift Assigned'), ('shift_updated', 'Shift Updated'), ('shift_cancelled', 'Shift Cancelled'), ('drop_request', 'Drop Request'), ('drop_approved', 'Drop Approved'), ('drop_rejected', 'Drop Rejected'), ('pto_request', 'PTO Request'), ('pto_approved', 'PTO Approved'), ('pto_rejected', 'PTO Rejected'), ('reminder', 'Shift Reminder'), ('conflict', 'Schedule Conflict'), ('roster_published', 'Roster Published'), ('shift_offer', 'Shift Offer')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='notificationarchive',
+            name='notification_type',
+            field=models.CharField(choices=[('shift_assigned', 'Shift Assigned'), ('shift_updated', 'Shift Updated'), ('shift_cancelled', 'Shift Cancelled'), ('drop_request', 'Drop Request'), ('drop_approved', 'Drop Approved'), ('drop_rejected', 'Drop Rejected'), ('pto_request', 'PTO Request'), ('pto_approved', 'PTO Approved'), ('pto_rejected', 'PTO Rejected'), ('reminder', 'Shift Reminder'), ('conflict', 'Schedule Conflict'), ('roster_published', 'Roster Published'), ('shift_offer', 'Shift Offer')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='OpenShift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('break_duration_minutes', models.PositiveIntegerField(default=0, help_text='Unpaid break in minutes')),
+                ('hourly_rate', models.DecimalField(decimal_places=2, default=0, help_text='Hourly rate ($)', max_digits=8)),
+                ('notes', models.TextField(blank=True, default='')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('filled', 'Filled'), ('cancelled', 'Cancelled')], default='open', max_length=20)),
+                ('filled_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='open_shifts', to='branches.branch')),
+                ('drop_request', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='open_shift', to='roster.droprequest')),
+                ('filled_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='filled_open_shifts', to=settings.AUTH_USER_MODEL)),
+                ('filled_shift', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='filled_from', to='roster.rostershift')),
+                ('source_shift', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='open_shifts', to='roster.rostershift')),
+                ('template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='open_shifts', to='roster.shifttemplate')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShiftOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(help_text='1 = best candidate')),
+                ('score', models.FloatField(default=0, help_text='Ranking cost — lower is better')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('declined', 'Declined'), ('expired', 'Expired')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('responded_at', models.DateTimeField(blank=True, null=True)),
+                ('open_shift', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='offers', to='roster.openshift')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shift_offers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['open_shift', 'rank'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='openshift',
+            index=models.Index(fields=['status', 'date'], name='roster_open_status_18ef9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shiftoffer',
+            index=models.Index(fields=['user', 'status'], name='roster_shif_user_id_3a262c_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='shiftoffer',
+            unique_together={('open_shift', 'user')},
+        ),
+    ]
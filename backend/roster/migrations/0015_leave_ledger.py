@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-19 20:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0014_open_shifts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('annual', 'Annual Leave'), ('sick', 'Sick Leave'), ('personal', 'Personal Leave'), ('unpaid', 'Unpaid Leave'), ('other', 'Other')], max_length=20)),
+                ('hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'leave_type'],
+                'unique_together': {('user', 'leave_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('annual', 'Annual Leave'), ('sick', 'Sick Leave'), ('personal', 'Personal Leave'), ('unpaid', 'Unpaid Leave'), ('other', 'Other')], max_length=20)),
+                ('kind', models.CharField(choices=[('accrual', 'Accrual'), ('leave', 'Leave Taken'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('hours', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('period_start', models.DateField(blank=True, help_text='Accrual month (first day)', null=True)),
+                ('note', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posted_leave_entries', to=settings.AUTH_USER_MODEL)),
+                ('pto_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leave_entries', to='roster.ptorequest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Leave ledger entries',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['user', 'leave_type'], name='roster_leav_user_id_06f573_idx'), models.Index(fields=['pto_request'], name='roster_leav_pto_req_01f22d_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'accrual')), fields=('user', 'leave_type', 'period_start'), name='unique_leave_accrual_per_period')],
+            },
+        ),
+    ]
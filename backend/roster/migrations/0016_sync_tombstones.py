@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-19 21:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        ('roster', '0015_leave_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('shift', 'Shift'), ('availability', 'Availability'), ('pto', 'PTO Request')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['updated_at'], name='roster_avai_updated_d83409_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ptorequest',
+            index=models.Index(fields=['updated_at'], name='roster_ptor_updated_0218eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rostershift',
+            index=models.Index(fields=['updated_at'], name='roster_rost_updated_d6b083_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['deleted_at'], name='roster_sync_deleted_f0614d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['user_id', 'deleted_at'], name='roster_sync_user_id_30d1f5_idx'),
+        ),
+    ]
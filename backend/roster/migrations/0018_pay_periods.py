@@ -0,0 +1,64 @@
+# Generated by Django 6.0.2 on 2026-10-19 22:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0017_calendar_feeds'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('source', models.CharField(choices=[('roster', 'Rostered Shifts'), ('attendance', 'Reconciled Attendance')], default='roster', max_length=20)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('finalised', 'Finalised')], default='draft', max_length=20)),
+                ('rules', models.JSONField(blank=True, default=dict, help_text='Rate rules the lines were computed with')),
+                ('fingerprint', models.CharField(blank=True, default='', help_text='Inputs of the last computation', max_length=32)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('gross_pay', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('finalised_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pay_periods', to=settings.AUTH_USER_MODEL)),
+                ('finalised_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='finalised_pay_periods', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-start_date', 'source'],
+                'unique_together': {('start_date', 'end_date', 'source')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PayrollLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shift_count', models.PositiveIntegerField(default=0)),
+                ('ordinary_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('ordinary_pay', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('night_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('night_pay', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('saturday_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('saturday_pay', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('sunday_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('sunday_pay', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('overtime_pay', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('gross_pay', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='roster.payperiod')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_lines', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['period', 'user__last_name', 'user__first_name'],
+                'unique_together': {('period', 'user')},
+            },
+        ),
+    ]
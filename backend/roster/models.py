@@ -1,11 +1,90 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
 
 from django.db import models
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import ExtractHour, ExtractMinute, Round
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from branches.models import Branch
 
 
+# ---------------------------------------------------------------------------
+# Timeline helpers — the one place the overnight rule is defined
+# ---------------------------------------------------------------------------
+
+# Shift statuses that occupy a guard's time (overlap, rest and availability checks)
+ACTIVE_STATUSES = ('scheduled', 'confirmed')
+
+
+def clock_minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def shift_window(start, end):
+    """(start, end) minutes from midnight; end <= start wraps past midnight."""
+    s, e = clock_minutes(start), clock_minutes(end)
+    return (s, e) if e > s else (s, e + 24 * 60)
+
+
+def shift_hours(start, end, break_minutes):
+    """Net hours of a window, rounded like the generated hours fields (for unsaved rows)."""
+    s, e = shift_window(start, end)
+    return (Decimal(e - s - (break_minutes or 0)) / Decimal(60)).quantize(Decimal('0.01'), ROUND_HALF_UP)
+
+
+def availability_window(start, end):
+    """Like :func:`shift_window`, but an availability end of 23:59 means end of day."""
+    s, e = shift_window(start, end)
+    return (s, 24 * 60) if clock_minutes(end) == 23 * 60 + 59 else (s, e)
+
+
+def week_of(d):
+    """Monday of the week containing *d*."""
+    return d - timedelta(days=d.weekday())
+
+
+# ---------------------------------------------------------------------------
+# Labour expressions — SQL equivalents of the hours/pay properties
+# ---------------------------------------------------------------------------
+
+def _minute_of_day(field):
+    return ExtractHour(field) * 60 + ExtractMinute(field)
+
+
+def gross_minutes_expression():
+    """Gross shift length in minutes; end <= start wraps past midnight."""
+    span = _minute_of_day('end_time') - _minute_of_day('start_time')
+    return Case(
+        When(end_time__gt=F('start_time'), then=span),
+        default=span + 24 * 60,
+        output_field=models.IntegerField(),
+    )
+
+
+def net_minutes_expression():
+    """Net billable minutes (gross − unpaid break)."""
+    return gross_minutes_expression() - F('break_duration_minutes')
+
+
+def hours_expression(minutes):
+    """Convert a minutes expression to Decimal hours rounded to 2 places."""
+    return Round(
+        minutes / Value(Decimal('60.0')),
+        2,
+        output_field=models.DecimalField(max_digits=6, decimal_places=2),
+    )
+
+
+def pay_expression():
+    """Net minutes × hourly rate, as Decimal rounded to cents."""
+    return Round(
+        net_minutes_expression() * F('hourly_rate') / 60,
+        2,
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
 # ---------------------------------------------------------------------------
 # Shift Template — reusable shift definitions
 # ---------------------------------------------------------------------------
@@ -20,6 +99,17 @@ class ShiftTemplate(models.Model):
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text='Default hourly rate ($)')
     break_duration_minutes = models.PositiveIntegerField(default=0, help_text='Unpaid break duration in minutes')
     is_active = models.BooleanField(default=True)
+    # Database-generated: gross duration (before break) and net billable hours
+    duration_hours = models.GeneratedField(
+        expression=hours_expression(gross_minutes_expression()),
+        output_field=models.DecimalField(max_digits=6, decimal_places=2),
+        db_persist=True,
+    )
+    net_hours = models.GeneratedField(
+        expression=hours_expression(net_minutes_expression()),
+        output_field=models.DecimalField(max_digits=6, decimal_places=2),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -27,27 +117,37 @@ class ShiftTemplate(models.Model):
         ordering = ['branch', 'start_time']
         unique_together = ('branch', 'name')
 
-    @property
-    def duration_hours(self):
-        """Gross shift duration in hours (before break deduction)."""
-        d1 = datetime.combine(datetime.min, self.start_time)
-        d2 = datetime.combine(datetime.min, self.end_time)
-        delta = (d2 - d1).total_seconds() / 3600
-        return round(delta, 2) if delta > 0 else round(delta + 24, 2)
-
-    @property
-    def net_hours(self):
-        """Net billable hours (gross − break)."""
-        return round(self.duration_hours - (self.break_duration_minutes / 60), 2)
-
     def __str__(self):
-        return f'{self.name} ({self.start_time:%H:%M}–{self.end_time:%H:%M}) {self.net_hours}h @ {self.branch.name}'
+        # Generated fields can't be read before the row is saved
+        hours = self.net_hours if self.pk else shift_hours(self.start_time, self.end_time, self.break_duration_minutes)
+        return f'{self.name} ({self.start_time:%H:%M}–{self.end_time:%H:%M}) {hours}h @ {self.branch.name}'
 
 
 # ---------------------------------------------------------------------------
 # Roster Shift — actual assigned shift on a date
 # ---------------------------------------------------------------------------
 
+class RosterShiftQuerySet(models.QuerySet):
+
+    def labour_summary(self, *fields, **expressions):
+        """
+        Aggregate net minutes, pay and shift count in SQL, grouped by the
+        given ``values()`` fields/expressions (e.g. ``'user', 'date'`` or
+        ``week=TruncWeek('date')``).
+        """
+        return (
+            self.order_by()
+            .alias(shift_net_minutes=net_minutes_expression())
+            .values(*fields, **expressions)
+            .annotate(
+                net_minutes=Sum('shift_net_minutes'),
+                pay=Sum('total_pay'),
+                shift_count=Count('id'),
+            )
+            .order_by(*fields, *expressions)
+        )
+
+
 class RosterShift(models.Model):
     """A shift assigned to a user on a specific date at a branch."""
     STATUS_CHOICES = [
@@ -68,57 +168,200 @@ class RosterShift(models.Model):
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text='Hourly rate ($)')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
     notes = models.TextField(blank=True, default='')
+    recurrence = models.ForeignKey(
+        'RecurringShift', on_delete=models.SET_NULL, null=True, blank=True, related_name='shifts',
+        help_text='Pattern this shift was materialised from',
+    )
+    # Database-generated: gross hours, net billable hours and net hours × rate
+    gross_hours = models.GeneratedField(
+        expression=hours_expression(gross_minutes_expression()),
+        output_field=models.DecimalField(max_digits=6, decimal_places=2),
+        db_persist=True,
+    )
+    total_hours = models.GeneratedField(
+        expression=hours_expression(net_minutes_expression()),
+        output_field=models.DecimalField(max_digits=6, decimal_places=2),
+        db_persist=True,
+    )
+    total_pay = models.GeneratedField(
+        expression=pay_expression(),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_shifts')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RosterShiftQuerySet.as_manager()
+
     class Meta:
         ordering = ['date', 'start_time']
         indexes = [
             models.Index(fields=['user', 'date']),
             models.Index(fields=['branch', 'date']),
             models.Index(fields=['date', 'status']),
+            models.Index(fields=['total_hours']),
+            models.Index(fields=['date', 'total_pay']),
+            models.Index(fields=['updated_at']),
         ]
+        constraints = [
+            # One concrete shift per pattern occurrence — keeps materialisation idempotent
+            models.UniqueConstraint(
+                fields=['recurrence', 'date'],
+                condition=models.Q(recurrence__isnull=False),
+                name='roster_shift_unique_recurrence_date',
+            ),
+        ]
+
+    def __str__(self):
+        # Generated fields can't be read before the row is saved
+        hours = self.total_hours if self.pk else shift_hours(self.start_time, self.end_time, self.break_duration_minutes)
+        return f'{self.user.get_full_name()} — {self.date} {self.start_time:%H:%M}–{self.end_time:%H:%M} ({hours}h)'
 
-    @property
-    def gross_hours(self):
-        """Gross shift duration in hours."""
-        d1 = datetime.combine(datetime.min, self.start_time)
-        d2 = datetime.combine(datetime.min, self.end_time)
-        delta = (d2 - d1).total_seconds() / 3600
-        return round(delta, 2) if delta > 0 else round(delta + 24, 2)
+    def clean(self):
+        """
+        Validate no overlapping shifts for the same user. Shifts ending at or
+        before their start time run past midnight, so the neighbouring days
+        are checked too.
+        """
+        if self.start_time and self.end_time and self.start_time == self.end_time:
+            raise ValidationError('Start and end time must differ.')
+
+        start, end = shift_window(self.start_time, self.end_time)
+        neighbours = RosterShift.objects.filter(
+            user=self.user,
+            date__gte=self.date - timedelta(days=1),
+            date__lte=self.date + timedelta(days=1),
+            status__in=ACTIVE_STATUSES,
+        ).exclude(pk=self.pk).only('date', 'start_time', 'end_time')
+        for other in neighbours:
+            offset = (other.date - self.date).days * 24 * 60
+            other_start, other_end = shift_window(other.start_time, other.end_time)
+            if other_start + offset < end and start < other_end + offset:
+                raise ValidationError(
+                    f'Conflict: {self.user.get_full_name()} already has a shift '
+                    f'on {other.date} that overlaps with {self.start_time:%H:%M}–{self.end_time:%H:%M}.'
+                )
 
-    @property
-    def total_hours(self):
-        """Net billable hours (gross − break)."""
-        return round(self.gross_hours - (self.break_duration_minutes / 60), 2)
 
-    @property
-    def total_pay(self):
-        """Total pay = net hours × hourly rate."""
-        return round(float(self.total_hours) * float(self.hourly_rate), 2)
+# ---------------------------------------------------------------------------
+# Recurring Shift — weekly pattern materialised into RosterShift rows
+# ---------------------------------------------------------------------------
+
+class RecurringShift(models.Model):
+    """
+    A repeating weekly shift for one user. Concrete ``RosterShift`` rows are
+    created for a rolling horizon by ``materialize_recurring_shifts``
+    (``materialized_until`` marks how far); later dates are expanded on the
+    fly by ``roster.recurrence``.
+    """
+    WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_shifts')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='recurring_shifts')
+    template = models.ForeignKey(ShiftTemplate, on_delete=models.SET_NULL, null=True, blank=True, related_name='recurring_shifts')
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    break_duration_minutes = models.PositiveIntegerField(default=0, help_text='Unpaid break in minutes')
+    hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text='Hourly rate ($)')
+    weekdays = models.PositiveSmallIntegerField(help_text='Bitmask of weekdays: Monday = 1, Tuesday = 2 … Sunday = 64')
+    interval_weeks = models.PositiveSmallIntegerField(default=1, help_text='Repeat every N weeks')
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True, help_text='Last date of the pattern (blank = no end)')
+    materialized_until = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    notes = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_recurring_shifts')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['user', 'start_date']
+        indexes = [
+            models.Index(fields=['is_active', 'materialized_until']),
+        ]
 
     def __str__(self):
-        return f'{self.user.get_full_name()} — {self.date} {self.start_time:%H:%M}–{self.end_time:%H:%M} ({self.total_hours}h)'
+        days = ', '.join(name for i, name in enumerate(self.WEEKDAY_NAMES) if self.weekdays & (1 << i))
+        return f'{self.user.get_full_name()} — {days} {self.start_time:%H:%M}–{self.end_time:%H:%M}'
 
-    def clean(self):
-        """Validate no overlapping shifts for the same user on the same date."""
-        if self.start_time and self.end_time and self.start_time >= self.end_time:
-            raise ValidationError('End time must be after start time.')
+    def occurrences(self, date_from, date_to):
+        """Yield the pattern's dates within date_from–date_to (inclusive)."""
+        d = max(date_from, self.start_date)
+        last = min(date_to, self.end_date) if self.end_date else date_to
+        anchor = self.start_date - timedelta(days=self.start_date.weekday())
+        while d <= last:
+            if self.weekdays & (1 << d.weekday()) and ((d - anchor).days // 7) % self.interval_weeks == 0:
+                yield d
+            d += timedelta(days=1)
 
-        overlapping = RosterShift.objects.filter(
-            user=self.user,
-            date=self.date,
-            status__in=('scheduled', 'confirmed'),
-        ).exclude(pk=self.pk).filter(
-            start_time__lt=self.end_time,
-            end_time__gt=self.start_time,
-        )
-        if overlapping.exists():
-            raise ValidationError(
-                f'Conflict: {self.user.get_full_name()} already has a shift '
-                f'on {self.date} that overlaps with {self.start_time:%H:%M}–{self.end_time:%H:%M}.'
-            )
+
+# ---------------------------------------------------------------------------
+# Roster Draft — staged edits published in one go
+# ---------------------------------------------------------------------------
+
+class RosterDraft(models.Model):
+    """
+    A working copy of the roster for a date range (optionally one branch).
+    Opening a draft snapshots the published shifts into ``DraftShift`` rows;
+    edits to those rows have no side effects until ``roster.drafts.publish``
+    applies the diff in one transaction and notifies each affected user once.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('published', 'Published'),
+        ('discarded', 'Discarded'),
+    ]
+
+    name = models.CharField(max_length=255, blank=True, default='')
+    date_from = models.DateField()
+    date_to = models.DateField()
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True, related_name='roster_drafts')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='roster_drafts')
+    published_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='published_roster_drafts')
+    published_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'date_from']),
+        ]
+
+    def __str__(self):
+        return self.name or f'Draft {self.date_from} → {self.date_to}'
+
+
+class DraftShift(models.Model):
+    """
+    One shift in a draft. ``source_shift`` links rows snapshotted from the
+    published roster; rows without it are new. Removing a snapshotted row
+    sets ``is_removed`` so publishing cancels the published shift.
+    """
+    draft = models.ForeignKey(RosterDraft, on_delete=models.CASCADE, related_name='shifts')
+    source_shift = models.ForeignKey(RosterShift, on_delete=models.SET_NULL, null=True, blank=True, related_name='draft_copies')
+    source_updated_at = models.DateTimeField(null=True, blank=True, help_text='source_shift.updated_at when snapshotted')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='draft_shifts')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='draft_shifts')
+    template = models.ForeignKey(ShiftTemplate, on_delete=models.SET_NULL, null=True, blank=True, related_name='draft_shifts')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    break_duration_minutes = models.PositiveIntegerField(default=0, help_text='Unpaid break in minutes')
+    hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text='Hourly rate ($)')
+    notes = models.TextField(blank=True, default='')
+    is_removed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['draft', 'date']),
+        ]
+
+    def __str__(self):
+        return f'{self.draft} — {self.user.get_full_name()} {self.date} {self.start_time:%H:%M}–{self.end_time:%H:%M}'
 
 
 # ---------------------------------------------------------------------------
@@ -155,12 +398,62 @@ class Availability(models.Model):
         verbose_name_plural = 'Availabilities'
         ordering = ['date', 'user', 'start_time']
         unique_together = ('user', 'date')
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         status = 'Available' if self.is_available else 'Unavailable'
         return f'{self.user.get_full_name()} — {self.date} ({self.get_preset_display()}: {self.start_time:%H:%M}–{self.end_time:%H:%M}) [{status}]'
 
 
+# ---------------------------------------------------------------------------
+# Availability Bitmap — per-user, per-day 15-minute slot index
+# ---------------------------------------------------------------------------
+
+class AvailabilityBitmap(models.Model):
+    """
+    Derived index of free/booked 15-minute slots (96 per day) for one user
+    on one date, built from Availability, approved PTO and booked shifts by
+    ``roster.availability_index``. A missing row means "no availability
+    declared, nothing booked" — the user is treated as free all day.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='availability_bitmaps')
+    date = models.DateField()
+    free = models.BinaryField(max_length=12, help_text='Bitmap of slots the user can still be rostered for')
+    booked = models.BinaryField(max_length=12, help_text='Bitmap of slots covered by active shifts')
+    declared = models.BooleanField(default=False, help_text='True when an Availability row exists for the date')
+    on_leave = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'date')
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} — {self.date}'
+
+
+# ---------------------------------------------------------------------------
+# Availability Week — change counter for the cached weekly matrix
+# ---------------------------------------------------------------------------
+
+class AvailabilityWeek(models.Model):
+    """
+    Version of one week's availability, bumped by ``roster.availability_matrix``
+    whenever an Availability row in that week changes. The cached LPO matrix
+    and its ETag are keyed on it, so only the touched weeks are rebuilt.
+    """
+    week_start = models.DateField(primary_key=True, help_text='Monday of the week')
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Week of {self.week_start} (v{self.version})'
+
+
 # ---------------------------------------------------------------------------
 # PTO (Paid Time Off) — leave requests
 # ---------------------------------------------------------------------------
@@ -198,6 +491,7 @@ class PTORequest(models.Model):
         indexes = [
             models.Index(fields=['user', 'status']),
             models.Index(fields=['start_date', 'end_date']),
+            models.Index(fields=['updated_at']),
         ]
 
     def clean(self):
@@ -236,7 +530,270 @@ class DropRequest(models.Model):
 
 
 # ---------------------------------------------------------------------------
-# Notification — in-app notification log
+# Open Shift — uncovered shift offered to ranked replacements
+# ---------------------------------------------------------------------------
+
+class OpenShift(models.Model):
+    """
+    A shift with nobody on it, e.g. after an approved drop request.
+    ``roster.marketplace`` ranks replacements and sends ``ShiftOffer`` rows;
+    the first offeree to accept is assigned a new ``RosterShift``.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('filled', 'Filled'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    source_shift = models.ForeignKey(RosterShift, on_delete=models.SET_NULL, null=True, blank=True, related_name='open_shifts')
+    drop_request = models.OneToOneField('DropRequest', on_delete=models.SET_NULL, null=True, blank=True, related_name='open_shift')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='open_shifts')
+    template = models.ForeignKey(ShiftTemplate, on_delete=models.SET_NULL, null=True, blank=True, related_name='open_shifts')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    break_duration_minutes = models.PositiveIntegerField(default=0, help_text='Unpaid break in minutes')
+    hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text='Hourly rate ($)')
+    notes = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    filled_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='filled_open_shifts')
+    filled_shift = models.OneToOneField(RosterShift, on_delete=models.SET_NULL, null=True, blank=True, related_name='filled_from')
+    filled_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['status', 'date']),
+        ]
+
+    def __str__(self):
+        return f'Open: {self.branch.name} {self.date} {self.start_time:%H:%M}–{self.end_time:%H:%M} ({self.get_status_display()})'
+
+
+class ShiftOffer(models.Model):
+    """An open shift offered to one candidate, in ranking order."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('accepted', 'Accepted'),
+        ('declined', 'Declined'),
+        ('expired', 'Expired'),
+    ]
+
+    open_shift = models.ForeignKey(OpenShift, on_delete=models.CASCADE, related_name='offers')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shift_offers')
+    rank = models.PositiveIntegerField(help_text='1 = best candidate')
+    score = models.FloatField(default=0, help_text='Ranking cost — lower is better')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    responded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['open_shift', 'rank']
+        unique_together = ('open_shift', 'user')
+        indexes = [
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f'{self.open_shift} → {self.user.get_full_name()} (#{self.rank}, {self.get_status_display()})'
+
+
+# ---------------------------------------------------------------------------
+# Leave Ledger — accruals, leave taken and adjustments per user and leave type
+# ---------------------------------------------------------------------------
+
+class LeaveLedgerEntry(models.Model):
+    """
+    One signed movement of a leave balance, in hours. Accruals are posted
+    once per user, leave type and month by ``accrue_leave``; approved PTO is
+    deducted (and reversed) by ``roster.leave``. Entries are never edited —
+    corrections are posted as adjustments.
+    """
+    KIND_CHOICES = [
+        ('accrual', 'Accrual'),
+        ('leave', 'Leave Taken'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_entries')
+    leave_type = models.CharField(max_length=20, choices=PTORequest.TYPE_CHOICES)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    hours = models.DecimalField(max_digits=8, decimal_places=2)
+    period_start = models.DateField(null=True, blank=True, help_text='Accrual month (first day)')
+    pto_request = models.ForeignKey(
+        PTORequest, on_delete=models.SET_NULL, null=True, blank=True, related_name='leave_entries',
+    )
+    note = models.CharField(max_length=255, blank=True, default='')
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='posted_leave_entries',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        verbose_name_plural = 'Leave ledger entries'
+        indexes = [
+            models.Index(fields=['user', 'leave_type']),
+            models.Index(fields=['pto_request']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'leave_type', 'period_start'], condition=models.Q(kind='accrual'),
+                name='unique_leave_accrual_per_period',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user.get_full_name()} — {self.leave_type} {self.hours:+}h ({self.get_kind_display()})'
+
+
+class LeaveBalance(models.Model):
+    """
+    Current balance for one user and leave type — the running sum of their
+    ``LeaveLedgerEntry`` rows, kept in step with atomic ``F()`` updates.
+    ``recompute_leave_balances`` rebuilds it from the ledger.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.CharField(max_length=20, choices=PTORequest.TYPE_CHOICES)
+    hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['user', 'leave_type']
+        unique_together = [('user', 'leave_type')]
+
+    def __str__(self):
+        return f'{self.user.get_full_name()} — {self.leave_type}: {self.hours}h'
+
+
+# ---------------------------------------------------------------------------
+# Sync Tombstone — deletes for the delta sync feed
+# ---------------------------------------------------------------------------
+
+class SyncTombstone(models.Model):
+    """
+    A deleted shift, availability or PTO row (or one moved away from
+    ``user_id``), so ``roster.sync`` can tell clients to drop it. Plain id
+    columns — the row it describes is gone. Pruned by
+    ``prune_sync_tombstones`` after ``ROSTER_SYNC_RETENTION_DAYS``.
+    """
+    KIND_CHOICES = [
+        ('shift', 'Shift'),
+        ('availability', 'Availability'),
+        ('pto', 'PTO Request'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    user_id = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['deleted_at']),
+            models.Index(fields=['user_id', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} #{self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}'
+
+
+# ---------------------------------------------------------------------------
+# Calendar Feed — secret iCalendar link per user
+# ---------------------------------------------------------------------------
+
+class CalendarFeed(models.Model):
+    """
+    Secret ``.ics`` feed link for one user. ``changed_at`` moves whenever one
+    of their shifts is written (``roster.ical.touch``), so calendar polls
+    are answered from this row alone.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='calendar_feed')
+    token = models.CharField(max_length=64, unique=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Calendar feed — {self.user.get_full_name()}'
+
+
+# ---------------------------------------------------------------------------
+# Pay Period — payroll snapshot for a date range
+# ---------------------------------------------------------------------------
+
+class PayPeriod(models.Model):
+    """
+    Payroll for every staff member over a date range, computed by
+    ``roster.payroll`` from rostered shifts or reconciled attendance. A draft
+    is recomputed when its inputs change; once finalised its lines, rules and
+    totals are frozen.
+    """
+    SOURCE_CHOICES = [
+        ('roster', 'Rostered Shifts'),
+        ('attendance', 'Reconciled Attendance'),
+    ]
+    STATUS_CHOICES = [
+        ('draft', 'Draft'),
+        ('finalised', 'Finalised'),
+    ]
+
+    start_date = models.DateField()
+    end_date = models.DateField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='roster')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    rules = models.JSONField(default=dict, blank=True, help_text='Rate rules the lines were computed with')
+    fingerprint = models.CharField(max_length=32, blank=True, default='', help_text='Inputs of the last computation')
+    total_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    gross_pay = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    computed_at = models.DateTimeField(null=True, blank=True)
+    finalised_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='finalised_pay_periods',
+    )
+    finalised_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='pay_periods')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-start_date', 'source']
+        unique_together = [('start_date', 'end_date', 'source')]
+
+    def __str__(self):
+        return f'Pay period {self.start_date} → {self.end_date} ({self.get_source_display()})'
+
+
+class PayrollLine(models.Model):
+    """
+    One staff member's pay for a period, by pay category. Each category's
+    pay is rounded on its own and ``gross_pay`` is their sum.
+    """
+    period = models.ForeignKey(PayPeriod, on_delete=models.CASCADE, related_name='lines')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payroll_lines')
+    shift_count = models.PositiveIntegerField(default=0)
+    ordinary_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    ordinary_pay = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    night_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    night_pay = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    saturday_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    saturday_pay = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    sunday_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    sunday_pay = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    overtime_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    overtime_pay = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    gross_pay = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['period', 'user__last_name', 'user__first_name']
+        unique_together = [('period', 'user')]
+
+    def __str__(self):
+        return f'{self.user.get_full_name()} — {self.period}: ${self.gross_pay}'
+
+
+# ---------------------------------------------------------------------------
+# Notification — in-app notification log + delivery outbox
 # ---------------------------------------------------------------------------
 
 class Notification(models.Model):
@@ -253,12 +810,20 @@ class Notification(models.Model):
         ('pto_rejected', 'PTO Rejected'),
         ('reminder', 'Shift Reminder'),
         ('conflict', 'Schedule Conflict'),
+        ('roster_published', 'Roster Published'),
+        ('shift_offer', 'Shift Offer'),
     ]
     CHANNEL_CHOICES = [
         ('in_app', 'In-App'),
         ('email', 'Email'),
         ('whatsapp', 'WhatsApp'),
     ]
+    DELIVERY_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='roster_notifications')
     notification_type = models.CharField(max_length=30, choices=TYPE_CHOICES)
@@ -268,12 +833,92 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     related_shift = models.ForeignKey(RosterShift, on_delete=models.SET_NULL, null=True, blank=True)
     sent_at = models.DateTimeField(auto_now_add=True)
+    repeat_count = models.PositiveIntegerField(default=1, help_text='Repeats coalesced into this row')
+
+    # Outbox — email/WhatsApp rows are delivered by `dispatch_notifications`
+    delivery_status = models.CharField(max_length=20, choices=DELIVERY_STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
 
     class Meta:
         ordering = ['-sent_at']
         indexes = [
             models.Index(fields=['user', 'is_read']),
+            models.Index(fields=['user', '-sent_at']),
+            models.Index(fields=['sent_at']),
+            models.Index(fields=['delivery_status', 'next_attempt_at']),
         ]
 
     def __str__(self):
         return f'{self.title} → {self.user.get_full_name()}'
+
+
+# ---------------------------------------------------------------------------
+# Notification Archive — cold storage for old read/delivered notifications
+# ---------------------------------------------------------------------------
+
+class NotificationArchive(models.Model):
+    """
+    Read in-app and finished email/WhatsApp notifications moved out of the
+    hot ``Notification`` table by ``archive_notifications``. Plain id columns
+    (no foreign keys) so archiving never cascades or blocks deletes.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    user_id = models.IntegerField(db_index=True)
+    notification_type = models.CharField(max_length=30, choices=Notification.TYPE_CHOICES)
+    channel = models.CharField(max_length=20, choices=Notification.CHANNEL_CHOICES)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    related_shift_id = models.IntegerField(null=True, blank=True)
+    repeat_count = models.PositiveIntegerField(default=1)
+    sent_at = models.DateTimeField()
+    delivery_status = models.CharField(max_length=20, choices=Notification.DELIVERY_STATUS_CHOICES)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-sent_at']
+        indexes = [
+            models.Index(fields=['sent_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.title} (archived)'
+
+
+# ---------------------------------------------------------------------------
+# Notification Counter — cached unread in-app count per user
+# ---------------------------------------------------------------------------
+
+class NotificationCounter(models.Model):
+    """
+    Unread in-app notification count for one user, kept in step with
+    ``Notification`` by ``roster.notifications`` using atomic ``F()``
+    updates. ``reconcile_notification_counters`` repairs any drift.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user.get_full_name()}: {self.unread} unread'
+
+
+# ---------------------------------------------------------------------------
+# Shift Reminder — one row per (shift, lead time) reminder already sent
+# ---------------------------------------------------------------------------
+
+class ShiftReminder(models.Model):
+    """Idempotency log for ``send_shift_reminders`` — a reminder is sent at most once."""
+    shift = models.ForeignKey(RosterShift, on_delete=models.CASCADE, related_name='reminders')
+    lead_minutes = models.PositiveIntegerField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['shift', 'lead_minutes']
+
+    def __str__(self):
+        return f'{self.shift} — {self.lead_minutes} min reminder'
@@ -0,0 +1,173 @@
+"""
+Notification outbox — the only way roster code creates notifications.
+
+Every notification is written as one row per configured channel
+(``ROSTER_NOTIFICATION_CHANNELS``) with a single ``bulk_create``. In-app rows
+are delivered the moment they exist; email/WhatsApp rows are queued as
+``pending`` and sent later by the ``dispatch_notifications`` worker, so
+provider latency never reaches the API response. New in-app rows and the
+recipients' unread counts are pushed to open SSE streams (``roster.events``).
+
+Unread counts are served from ``NotificationCounter`` rows, adjusted with
+``F()`` in the same transaction as every insert, read or delete.
+
+Types listed in ``ROSTER_NOTIFICATION_COALESCE_SECONDS`` are coalesced: a
+repeat for the same user, shift, type and channel within the window updates
+the existing row (still unread / not yet sent) instead of adding another.
+"""
+
+from datetime import timedelta
+
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import events
+from .models import Notification, NotificationCounter
+from .serializers import NotificationSerializer
+
+
+def _channels():
+    channels = [c for c in settings.ROSTER_NOTIFICATION_CHANNELS if c != 'in_app']
+    return ['in_app', *channels]
+
+
+def build_notifications(user_id, notification_type, title, message, shift_id=None):
+    """Return unsaved notification rows for *user_id*, one per channel."""
+    now = timezone.now()
+    rows = []
+    for channel in _channels():
+        row = Notification(
+            user_id=user_id,
+            notification_type=notification_type,
+            channel=channel,
+            title=title,
+            message=message,
+            related_shift_id=shift_id,
+        )
+        if channel == 'in_app':
+            row.delivery_status = 'delivered'
+            row.delivered_at = now
+            row.latency_ms = 0
+        else:
+            row.next_attempt_at = now
+        rows.append(row)
+    return rows
+
+
+def _coalesce(rows):
+    """
+    Fold coalescible rows into recent matching ones. Returns
+    ``(rows still to insert, existing rows updated)``.
+    """
+    windows = settings.ROSTER_NOTIFICATION_COALESCE_SECONDS
+    candidates = [n for n in rows if n.related_shift_id and n.notification_type in windows]
+    if not candidates:
+        return rows, []
+
+    now = timezone.now()
+    lookup = Q()
+    for notification_type in {n.notification_type for n in candidates}:
+        lookup |= Q(notification_type=notification_type,
+                    sent_at__gte=now - timedelta(seconds=windows[notification_type]))
+    recent = {}
+    for n in Notification.objects.select_for_update().filter(
+        lookup,
+        Q(channel='in_app', is_read=False) | (~Q(channel='in_app') & Q(delivery_status='pending')),
+        user_id__in={n.user_id for n in candidates},
+        related_shift_id__in={n.related_shift_id for n in candidates},
+    ).order_by('sent_at'):
+        recent[(n.user_id, n.related_shift_id, n.notification_type, n.channel)] = n
+
+    fresh, merged = [], {}
+    coalescible = {id(n) for n in candidates}
+    for n in rows:
+        key = (n.user_id, n.related_shift_id, n.notification_type, n.channel)
+        existing = recent.get(key) if id(n) in coalescible else None
+        if existing is None:
+            fresh.append(n)
+            continue
+        existing.title, existing.message, existing.sent_at = n.title, n.message, now
+        existing.repeat_count += 1
+        merged[existing.pk] = existing
+    Notification.objects.bulk_update(merged.values(), ['title', 'message', 'sent_at', 'repeat_count'])
+    return fresh, list(merged.values())
+
+
+def send_notifications(rows):
+    """
+    Insert notification rows (built by :func:`build_notifications`) in one
+    query, coalescing repeats into existing rows where configured.
+    """
+    with transaction.atomic():
+        rows, merged = _coalesce(rows)
+        rows = Notification.objects.bulk_create(rows)
+        deltas = {}
+        for n in rows:
+            if n.channel == 'in_app':
+                deltas[n.user_id] = deltas.get(n.user_id, 0) + 1
+        adjust_unread(deltas)
+    in_app = [n for n in rows + merged if n.channel == 'in_app']
+    if in_app:
+        events.publish(
+            (n.user_id, 'notification', NotificationSerializer(n).data) for n in in_app
+        )
+        publish_unread_counts({n.user_id for n in in_app})
+    return rows + merged
+
+
+# ---------------------------------------------------------------------------
+# Unread counters
+# ---------------------------------------------------------------------------
+
+def adjust_unread(deltas):
+    """Apply ``{user_id: delta}`` to the unread counters."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in deltas], ignore_conflicts=True,
+    )
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(user_id)
+    now = timezone.now()
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread=F('unread') + delta, updated_at=now,
+        )
+
+
+def unread_counts(user_ids):
+    """``{user_id: unread in-app count}`` for the given users."""
+    counts = dict.fromkeys(user_ids, 0)
+    for user_id, unread in NotificationCounter.objects.filter(
+        user_id__in=counts,
+    ).values_list('user_id', 'unread'):
+        counts[user_id] = max(unread, 0)
+    return counts
+
+
+def mark_notifications_read(user_id, queryset):
+    """Mark the unread rows of *queryset* (one user's) read; returns how many changed."""
+    with transaction.atomic():
+        count = queryset.filter(is_read=False).update(is_read=True)
+        adjust_unread({user_id: -count})
+    publish_unread_counts([user_id])
+    return count
+
+
+def publish_unread_counts(user_ids):
+    events.publish(
+        (user_id, 'unread_count', {'count': count})
+        for user_id, count in unread_counts(user_ids).items()
+    )
+
+
+def notify(user, notification_type, title, message, shift=None):
+    """Create a notification for a single user on every channel."""
+    return send_notifications(build_notifications(
+        user.pk, notification_type, title, message, shift.pk if shift else None,
+    ))
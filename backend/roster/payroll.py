@@ -0,0 +1,351 @@
+"""
+Payroll — pay periods computed in one pass over the shifts.
+
+:func:`calculate` loads every payable shift in the range (and, for the
+``attendance`` source, every approved clock event) in one query each, then
+splits each worked interval into runs at midnight and at the night-window
+edges. Each run is paid at the highest penalty that applies to it —
+Saturday, Sunday or night, per ``ROSTER_PAYROLL_RULES`` — and minutes past
+the weekly overtime threshold (Monday to Sunday, counting shifts earlier in
+the week than the period) are paid as overtime at the larger of the
+overtime and penalty multipliers.
+
+Amounts are summed as exact ``Decimal`` minutes × rate × multiplier; each
+category is rounded once per line with the configured rounding mode, and
+gross pay is the sum of the rounded categories so exports always add up.
+
+Unpaid breaks are assumed to be taken at the middle of the shift — their
+position is not recorded. With reconciled attendance a shift is paid from
+the later of its start and the clock-in, to the clock-out (or the rostered
+end if there is none); shifts without a clock-in are not paid.
+
+:func:`compute` stores the result as ``PayrollLine`` rows on the
+``PayPeriod``, tagged with a fingerprint of its inputs, so an unchanged
+draft is not recomputed; a finalised period is never recomputed.
+"""
+
+import csv
+import hashlib
+from collections import namedtuple
+from datetime import timedelta
+from decimal import (
+    ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP,
+    Decimal,
+)
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from attendance.models import Attendance
+
+from .models import PayPeriod, PayrollLine, RosterShift, shift_window, week_of
+
+# Shifts that are paid (for the attendance source, only if clocked)
+PAYABLE_STATUSES = ('scheduled', 'confirmed', 'completed')
+
+CATEGORIES = ('ordinary', 'night', 'saturday', 'sunday', 'overtime')
+
+MAX_PERIOD_DAYS = 62
+
+_ROUNDING = (ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP)
+
+_DAY = 24 * 60
+_CENT = Decimal('0.01')
+_ONE = Decimal(1)
+_BATCH = 500
+
+Rules = namedtuple('Rules', 'saturday sunday night night_start night_end overtime overtime_after rounding')
+
+
+def _clock(value):
+    hours, _, minutes = value.partition(':')
+    minute = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= minute < _DAY:
+        raise ValueError(f'{value!r} is not a time of day')
+    return minute
+
+
+def rules(raw=None):
+    """Parsed ``ROSTER_PAYROLL_RULES`` (or *raw*, e.g. a period's stored rules)."""
+    raw = settings.ROSTER_PAYROLL_RULES if raw is None else raw
+    try:
+        parsed = Rules(
+            saturday=Decimal(raw['saturday']),
+            sunday=Decimal(raw['sunday']),
+            night=Decimal(raw['night']),
+            night_start=_clock(raw['night_start']),
+            night_end=_clock(raw['night_end']),
+            overtime=Decimal(raw['overtime']),
+            overtime_after=int(Decimal(raw['overtime_after_hours']) * 60),
+            rounding=raw['rounding'],
+        )
+    except (KeyError, ArithmeticError, ValueError) as exc:
+        raise ImproperlyConfigured(f'ROSTER_PAYROLL_RULES is invalid: {exc}') from exc
+    if parsed.rounding not in _ROUNDING:
+        raise ImproperlyConfigured(f'ROSTER_PAYROLL_RULES["rounding"] must be one of {", ".join(_ROUNDING)}.')
+    return parsed
+
+
+# ---------------------------------------------------------------------------
+# Worked intervals
+# ---------------------------------------------------------------------------
+# Intervals are [start, end) in minutes from midnight of the first loaded day.
+
+def _without_break(start, end, break_minutes):
+    """*start*–*end* less an unpaid break taken at its middle."""
+    if break_minutes <= 0:
+        return [(start, end)]
+    if break_minutes >= end - start:
+        return []
+    gap = (start + end - break_minutes) // 2
+    return [(start, gap), (gap + break_minutes, end)]
+
+
+def _rostered(base, shift):
+    _, _, d, start, end, _, _ = shift
+    s, e = shift_window(start, end)
+    offset = (d - base).days * _DAY
+    return offset + s, offset + e
+
+
+def _clock_pairs(base, date_to):
+    """``{user_id: [(in, out or None)]}`` from approved clock events, in order."""
+    pairs = {}
+    events = Attendance.objects.filter(
+        status='approved', created_at__date__gte=base, created_at__date__lte=date_to + timedelta(days=1),
+    ).order_by('user_id', 'created_at').values_list('user_id', 'type', 'created_at')
+    for user_id, kind, at in events:
+        at = timezone.localtime(at)
+        minute = (at.date() - base).days * _DAY + at.hour * 60 + at.minute
+        user_pairs = pairs.setdefault(user_id, [])
+        if kind == 'clock_in':
+            # An unclosed clock-in followed by another is dropped
+            if user_pairs and user_pairs[-1][1] is None:
+                user_pairs.pop()
+            user_pairs.append((minute, None))
+        elif user_pairs and user_pairs[-1][1] is None:
+            user_pairs[-1] = (user_pairs[-1][0], minute)
+    return pairs
+
+
+def _reconciled(base, date_to, shifts):
+    """``{shift_pk: (start, end)}`` actually worked, matched to clock events."""
+    pairs = _clock_pairs(base, date_to)
+    worked = {}
+    used = set()
+    for shift in shifts:
+        pk, user_id = shift[0], shift[1]
+        s, e = _rostered(base, shift)
+        best, best_overlap = None, 0
+        for i, (clock_in, clock_out) in enumerate(pairs.get(user_id, ())):
+            if (user_id, i) in used:
+                continue
+            overlap = min(e, clock_out if clock_out is not None else e) - max(s, clock_in)
+            if overlap > best_overlap:
+                best, best_overlap = i, overlap
+        if best is None:
+            continue
+        used.add((user_id, best))
+        clock_in, clock_out = pairs[user_id][best]
+        worked[pk] = (max(s, clock_in), clock_out if clock_out is not None else e)
+    return worked
+
+
+# ---------------------------------------------------------------------------
+# Calculation
+# ---------------------------------------------------------------------------
+
+def _is_night(r, minute):
+    if r.night_start < r.night_end:
+        return r.night_start <= minute < r.night_end
+    if r.night_start > r.night_end:
+        return minute >= r.night_start or minute < r.night_end
+    return False
+
+
+def _penalty(r, d, minute):
+    """``(category, multiplier)`` for minute-of-day *minute* on date *d*."""
+    best = ('ordinary', _ONE)
+    candidates = []
+    if d.weekday() == 5:
+        candidates.append(('saturday', r.saturday))
+    elif d.weekday() == 6:
+        candidates.append(('sunday', r.sunday))
+    if _is_night(r, minute):
+        candidates.append(('night', r.night))
+    for category, multiplier in candidates:
+        if multiplier > best[1]:
+            best = (category, multiplier)
+    return best
+
+
+def _runs(r, base, start, end):
+    """Split [start, end) into ``(minutes, category, multiplier)`` runs at rate boundaries."""
+    points = {start, end}
+    for day in range(start // _DAY, (end - 1) // _DAY + 1):
+        for edge in (0, r.night_start, r.night_end, _DAY):
+            if start < day * _DAY + edge < end:
+                points.add(day * _DAY + edge)
+    points = sorted(points)
+    for lo, hi in zip(points, points[1:]):
+        yield (hi - lo, *_penalty(r, base + timedelta(days=lo // _DAY), lo % _DAY))
+
+
+def calculate(date_from, date_to, source='roster', raw_rules=None):
+    """
+    ``{user_id: {'shift_count', '<category>_minutes', '<category>_amount'}}``
+    for shifts dated date_from–date_to; amounts are unrounded, in rate × hours.
+    """
+    r = rules(raw_rules)
+    base = week_of(date_from)
+    shifts = list(RosterShift.objects.filter(
+        date__gte=base, date__lte=date_to, status__in=PAYABLE_STATUSES,
+    ).order_by('user_id', 'date', 'start_time', 'pk').values_list(
+        'pk', 'user_id', 'date', 'start_time', 'end_time', 'break_duration_minutes', 'hourly_rate',
+    ))
+    if source == 'attendance':
+        worked = _reconciled(base, date_to, shifts)
+    else:
+        worked = {shift[0]: _rostered(base, shift) for shift in shifts}
+
+    totals = {}
+    week_minutes = {}  # (user_id, week start) → minutes worked so far
+    for pk, user_id, d, _, _, break_minutes, rate in shifts:
+        if pk not in worked:
+            continue
+        # Shifts earlier in the week than the period only count towards overtime
+        paid = d >= date_from
+        week = (user_id, week_of(d))
+        if paid:
+            line = totals.setdefault(user_id, {
+                'shift_count': 0,
+                **{f'{c}_minutes': 0 for c in CATEGORIES},
+                **{f'{c}_amount': Decimal(0) for c in CATEGORIES},
+            })
+            line['shift_count'] += 1
+        for start, end in _without_break(*worked[pk], break_minutes):
+            for minutes, category, multiplier in _runs(r, base, start, end):
+                used = week_minutes.get(week, 0)
+                regular = min(minutes, max(0, r.overtime_after - used))
+                week_minutes[week] = used + minutes
+                if not paid:
+                    continue
+                line[f'{category}_minutes'] += regular
+                line[f'{category}_amount'] += regular * rate * multiplier
+                if minutes > regular:
+                    line['overtime_minutes'] += minutes - regular
+                    line['overtime_amount'] += (minutes - regular) * rate * max(multiplier, r.overtime)
+    return totals
+
+
+def _line(period, user_id, totals, r):
+    line = PayrollLine(period=period, user_id=user_id, shift_count=totals['shift_count'])
+    total_minutes, gross = 0, Decimal(0)
+    for c in CATEGORIES:
+        minutes = totals[f'{c}_minutes']
+        pay = (totals[f'{c}_amount'] / 60).quantize(_CENT, rounding=r.rounding)
+        setattr(line, f'{c}_hours', (Decimal(minutes) / 60).quantize(_CENT, rounding=ROUND_HALF_UP))
+        setattr(line, f'{c}_pay', pay)
+        total_minutes += minutes
+        gross += pay
+    line.total_hours = (Decimal(total_minutes) / 60).quantize(_CENT, rounding=ROUND_HALF_UP)
+    line.gross_pay = gross
+    return line
+
+
+# ---------------------------------------------------------------------------
+# Periods
+# ---------------------------------------------------------------------------
+
+def fingerprint(period, raw_rules):
+    """Digest of everything *period*'s lines depend on."""
+    base = week_of(period.start_date)
+    stats = [RosterShift.objects.filter(date__gte=base, date__lte=period.end_date).aggregate(
+        n=Count('id'), ids=Sum('id'), last=Max('updated_at'),
+    )]
+    if period.source == 'attendance':
+        stats.append(Attendance.objects.filter(
+            status='approved', created_at__date__gte=base,
+            created_at__date__lte=period.end_date + timedelta(days=1),
+        ).aggregate(n=Count('id'), ids=Sum('id')))
+    return hashlib.md5(repr((period.source, stats, sorted(raw_rules.items()))).encode()).hexdigest()
+
+
+def is_stale(period):
+    """Whether a draft's lines no longer match its inputs."""
+    return period.status == 'draft' and period.fingerprint != fingerprint(period, settings.ROSTER_PAYROLL_RULES)
+
+
+def compute(period, force=False):
+    """
+    Recompute a draft *period*'s lines if its inputs changed since the last
+    run (always with *force*). Returns ``(period, recomputed)``; raises
+    ``ValidationError`` for a finalised period.
+    """
+    raw = dict(settings.ROSTER_PAYROLL_RULES)
+    r = rules(raw)
+    with transaction.atomic():
+        period = PayPeriod.objects.select_for_update().get(pk=period.pk)
+        if period.status != 'draft':
+            raise ValidationError('A finalised pay period cannot be recomputed.')
+        tag = fingerprint(period, raw)
+        if period.fingerprint == tag and not force:
+            return period, False
+
+        lines = [
+            _line(period, user_id, totals, r)
+            for user_id, totals in calculate(period.start_date, period.end_date, period.source, raw).items()
+        ]
+        PayrollLine.objects.filter(period=period).delete()
+        PayrollLine.objects.bulk_create(lines, batch_size=_BATCH)
+        period.rules = raw
+        period.fingerprint = tag
+        period.total_hours = sum((line.total_hours for line in lines), Decimal(0))
+        period.gross_pay = sum((line.gross_pay for line in lines), Decimal(0))
+        period.computed_at = timezone.now()
+        period.save(update_fields=['rules', 'fingerprint', 'total_hours', 'gross_pay', 'computed_at'])
+    return period, True
+
+
+def finalise(period, user):
+    """Bring a draft up to date and freeze it. Raises ``ValidationError`` if already final."""
+    if period.status != 'draft':
+        raise ValidationError('This pay period is already finalised.')
+    with transaction.atomic():
+        period, _ = compute(period)
+        period.status = 'finalised'
+        period.finalised_by = user
+        period.finalised_at = timezone.now()
+        period.save(update_fields=['status', 'finalised_by', 'finalised_at'])
+    return period
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(period):
+    """Yield *period*'s lines as CSV text, one row at a time."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([
+        'user_id', 'username', 'name', 'shifts',
+        *[f'{c}_{part}' for c in CATEGORIES for part in ('hours', 'pay')],
+        'total_hours', 'gross_pay',
+    ])
+    lines = period.lines.select_related('user').order_by('user__last_name', 'user__first_name', 'user_id')
+    for line in lines.iterator(chunk_size=_BATCH):
+        yield writer.writerow([
+            line.user_id, line.user.username, line.user.get_full_name(), line.shift_count,
+            *[getattr(line, f'{c}_{part}') for c in CATEGORIES for part in ('hours', 'pay')],
+            line.total_hours, line.gross_pay,
+        ])
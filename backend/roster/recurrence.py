@@ -0,0 +1,192 @@
+"""
+Recurring shifts — lazy materialisation and on-the-fly expansion.
+
+``materialize`` turns active ``RecurringShift`` patterns into concrete
+``RosterShift`` rows up to a rolling horizon (``ROSTER_RECURRENCE_HORIZON_DAYS``
+from today), one batch of patterns at a time with a single bulk insert per
+batch. Occurrences that would overlap an existing active shift, fall on
+approved leave or break a labour compliance rule (with
+``ROSTER_COMPLIANCE_ENFORCE`` on) are skipped. Occurrences that already have
+a row are left alone, so re-runs are idempotent; the ``(recurrence, date)``
+unique constraint backs this up.
+
+``virtual_shifts`` expands patterns past their ``materialized_until`` date so
+the calendar can show the full pattern without storing it.
+
+Changing a pattern only rewrites its own untouched (``scheduled``) future
+rows inside the horizon — see ``rematerialize``.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import compliance, signals, sync
+from .models import ACTIVE_STATUSES, PTORequest, RecurringShift, RosterShift, shift_window
+
+_BATCH = 200
+
+
+def horizon_end(today=None):
+    return (today or timezone.localdate()) + timedelta(days=settings.ROSTER_RECURRENCE_HORIZON_DAYS)
+
+
+def first_open_date(pattern, today):
+    """First date not yet materialised (never in the past)."""
+    first = max(today, pattern.start_date)
+    if pattern.materialized_until:
+        first = max(first, pattern.materialized_until + timedelta(days=1))
+    return first
+
+
+# ---------------------------------------------------------------------------
+# Materialisation
+# ---------------------------------------------------------------------------
+
+def materialize(patterns=None, until=None):
+    """
+    Create concrete shifts for *patterns* (default: every active pattern
+    behind the horizon) up to *until*. Returns ``(created, skipped)``.
+    """
+    today = timezone.localdate()
+    until = until or horizon_end(today)
+    if patterns is None:
+        patterns = RecurringShift.objects.filter(is_active=True, start_date__lte=until).exclude(
+            materialized_until__gte=until,
+        ).exclude(end_date__lt=today)
+
+    created = skipped = 0
+    ids = list(patterns.order_by('pk').values_list('pk', flat=True))
+    for i in range(0, len(ids), _BATCH):
+        c, s = _materialize_batch(ids[i:i + _BATCH], today, until)
+        created += c
+        skipped += s
+    return created, skipped
+
+
+def _materialize_batch(pattern_ids, today, until):
+    with transaction.atomic():
+        patterns = list(
+            RecurringShift.objects.select_for_update(skip_locked=True).filter(pk__in=pattern_ids)
+        )
+        if not patterns:
+            return 0, 0
+        user_ids = {p.user_id for p in patterns}
+        span_from = min(first_open_date(p, today) for p in patterns)
+
+        # Busy intervals in absolute minutes from span_from, plus leave days
+        busy = {}
+
+        def book(user_id, d, start, end):
+            s, e = shift_window(start, end)
+            offset = (d - span_from).days * 24 * 60
+            busy.setdefault(user_id, []).append((offset + s, offset + e))
+
+        for s in RosterShift.objects.filter(
+            user_id__in=user_ids, date__gte=span_from - timedelta(days=1), date__lte=until,
+            status__in=ACTIVE_STATUSES,
+        ).only('user_id', 'date', 'start_time', 'end_time'):
+            book(s.user_id, s.date, s.start_time, s.end_time)
+
+        on_leave = set()
+        for pto in PTORequest.objects.filter(
+            user_id__in=user_ids, status='approved', start_date__lte=until, end_date__gte=span_from,
+        ).only('user_id', 'start_date', 'end_date'):
+            d = max(pto.start_date, span_from)
+            while d <= min(pto.end_date, until):
+                on_leave.add((pto.user_id, d))
+                d += timedelta(days=1)
+
+        # Occurrences that already have a row (kept by rematerialize, or
+        # cancelled) are left as they are rather than inserted again
+        existing = set(RosterShift.objects.filter(
+            recurrence_id__in=[p.pk for p in patterns], date__gte=span_from, date__lte=until,
+        ).values_list('recurrence_id', 'date'))
+
+        checker = compliance.Checker(user_ids, span_from, until) if settings.ROSTER_COMPLIANCE_ENFORCE else None
+
+        rows, skipped = [], 0
+        for p in patterns:
+            s, e = shift_window(p.start_time, p.end_time)
+            for d in p.occurrences(first_open_date(p, today), until):
+                if (p.pk, d) in existing:
+                    continue
+                offset = (d - span_from).days * 24 * 60
+                if (p.user_id, d) in on_leave or any(
+                    bs < offset + e and offset + s < be for bs, be in busy.get(p.user_id, ())
+                ):
+                    skipped += 1
+                    continue
+                row = RosterShift(
+                    user_id=p.user_id, branch_id=p.branch_id, template_id=p.template_id,
+                    date=d, start_time=p.start_time, end_time=p.end_time,
+                    break_duration_minutes=p.break_duration_minutes, hourly_rate=p.hourly_rate,
+                    notes=p.notes, recurrence=p, created_by_id=p.created_by_id,
+                )
+                if checker:
+                    entry = compliance.to_entry(row, ref=(p.pk, d))
+                    if checker.check(p.user_id, entry):
+                        skipped += 1
+                        continue
+                    checker.add(p.user_id, entry)
+                book(p.user_id, d, p.start_time, p.end_time)
+                rows.append(row)
+            p.materialized_until = max(until, p.materialized_until or until)
+
+        # The patterns are locked and existing rows filtered out above, so
+        # every row is inserted and the count, index and feeds stay exact
+        RosterShift.objects.bulk_create(rows)
+        RecurringShift.objects.bulk_update(patterns, ['materialized_until'])
+        signals.refresh_shifts((r.user_id, r.date) for r in rows)
+    return len(rows), skipped
+
+
+def rematerialize(pattern):
+    """
+    Re-apply a changed pattern: drop its untouched future shifts (status
+    ``scheduled``, from today on) and materialise again. Confirmed or
+    otherwise changed rows are left alone.
+    """
+    created = 0
+    with transaction.atomic():
+        clear_future(pattern)
+        RecurringShift.objects.filter(pk=pattern.pk).update(materialized_until=None)
+        pattern.materialized_until = None
+        if pattern.is_active:
+            created, _ = materialize(RecurringShift.objects.filter(pk=pattern.pk))
+    return created
+
+
+def clear_future(pattern):
+    """Delete the pattern's untouched shifts from today on, as one set."""
+    with transaction.atomic():
+        rows = list(RosterShift.objects.select_for_update().filter(
+            recurrence=pattern, date__gte=timezone.localdate(), status='scheduled',
+        ).values_list('pk', 'user_id', 'date'))
+        if not rows:
+            return 0
+        with signals.bulk_changes():
+            RosterShift.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+        sync.record('shift', [(pk, user_id) for pk, user_id, _ in rows])
+        signals.refresh_shifts((user_id, d) for _, user_id, d in rows)
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Expansion beyond the horizon
+# ---------------------------------------------------------------------------
+
+def virtual_shifts(patterns, date_from, date_to):
+    """
+    Unsaved occurrences of *patterns* between date_from and date_to that are
+    not materialised yet, as ``(pattern, date)`` pairs in date order.
+    """
+    today = timezone.localdate()
+    occurrences = []
+    for p in patterns.filter(is_active=True, start_date__lte=date_to).exclude(end_date__lt=date_from):
+        first = max(date_from, first_open_date(p, today))
+        occurrences += [(p, d) for d in p.occurrences(first, date_to)]
+    occurrences.sort(key=lambda o: (o[1], o[0].start_time))
+    return occurrences
@@ -0,0 +1,78 @@
+"""
+Shift reminders — notify guards ahead of their shifts.
+
+Each tick (``manage.py send_shift_reminders``) loads only the active shifts
+dated between today and the longest lead time ahead (``(date, status)``
+index), works out which ``ROSTER_REMINDER_LEAD_MINUTES`` are due, and writes
+the reminders and their notifications with one bulk insert each, in one
+transaction. ``ShiftReminder`` rows (unique per shift and lead) make ticks
+idempotent: a restart or a second worker never sends the same reminder
+twice. When several leads fall due together (e.g. a shift created two hours
+before it starts) only one notification is sent and all leads are recorded.
+
+Shift dates/times are wall-clock times in ``TIME_ZONE``.
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ACTIVE_STATUSES, RosterShift, ShiftReminder
+from .notifications import build_notifications, send_notifications
+
+
+
+def _until(delta):
+    minutes = max(0, round(delta.total_seconds() / 60))
+    hours, minutes = divmod(minutes, 60)
+    if hours and minutes:
+        return f'{hours} h {minutes} min'
+    return f'{hours} h' if hours else f'{minutes} min'
+
+
+def send_due_reminders(now=None):
+    """Send every reminder due at *now*; returns the number of notifications sent."""
+    leads = sorted(set(settings.ROSTER_REMINDER_LEAD_MINUTES))
+    if not leads:
+        return 0
+    now = now or timezone.now()
+    tz = timezone.get_default_timezone()
+    local_now = timezone.localtime(now, tz)
+    horizon = timezone.localtime(now + timedelta(minutes=leads[-1]), tz)
+
+    with transaction.atomic():
+        shifts = list(
+            RosterShift.objects.filter(
+                date__gte=local_now.date(), date__lte=horizon.date(), status__in=ACTIVE_STATUSES,
+            ).select_for_update(of=('self',), skip_locked=True).select_related('branch').only(
+                'user_id', 'date', 'start_time', 'end_time', 'branch__name',
+            )
+        )
+        sent = set(ShiftReminder.objects.filter(
+            shift_id__in=[s.pk for s in shifts],
+        ).values_list('shift_id', 'lead_minutes'))
+
+        reminders, notifications = [], []
+        for shift in shifts:
+            starts_at = datetime.combine(shift.date, shift.start_time, tzinfo=tz)
+            if starts_at <= now:
+                continue
+            due = [
+                lead for lead in leads
+                if (shift.pk, lead) not in sent and starts_at - timedelta(minutes=lead) <= now
+            ]
+            if not due:
+                continue
+            reminders += [ShiftReminder(shift=shift, lead_minutes=lead) for lead in due]
+            notifications += build_notifications(
+                shift.user_id, 'reminder', 'Shift Reminder',
+                f'Your shift at {shift.branch.name} starts in {_until(starts_at - now)} '
+                f'({shift.date} {shift.start_time:%H:%M}–{shift.end_time:%H:%M}).',
+                shift.pk,
+            )
+
+        ShiftReminder.objects.bulk_create(reminders)
+        send_notifications(notifications)
+    return len({n.related_shift_id for n in notifications})
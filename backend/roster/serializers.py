@@ -1,9 +1,15 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.utils import timezone
 from rest_framework import serializers
 from .models import (
-    ShiftTemplate, RosterShift, Availability,
-    PTORequest, DropRequest, Notification,
+    ACTIVE_STATUSES, ShiftTemplate, RosterShift, RecurringShift, RosterDraft, DraftShift,
+    Availability, PTORequest, DropRequest, OpenShift, ShiftOffer,
+    LeaveLedgerEntry, LeaveBalance, PayPeriod, PayrollLine, Notification,
 )
+from . import compliance, leave, payroll
 
 
 # ---------------------------------------------------------------------------
@@ -53,11 +59,11 @@ class RosterShiftSerializer(serializers.ModelSerializer):
             'break_duration_minutes', 'hourly_rate',
             'gross_hours', 'total_hours', 'total_pay',
             'status', 'status_display', 'notes',
-            'has_drop_request',
+            'has_drop_request', 'recurrence',
             'created_by', 'created_by_name',
             'created_at', 'updated_at',
         ]
-        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'recurrence', 'created_by', 'created_at', 'updated_at']
 
     def get_user_name(self, obj):
         return f'{obj.user.first_name} {obj.user.last_name}'.strip() or obj.user.username
@@ -68,12 +74,41 @@ class RosterShiftSerializer(serializers.ModelSerializer):
         return ''
 
     def get_has_drop_request(self, obj):
-        return obj.drop_requests.filter(status='pending').exists()
+        # Iterate the prefetched drop requests instead of issuing a query per row
+        return any(d.status == 'pending' for d in obj.drop_requests.all())
+
+    # Fields that move a shift on its user's timeline
+    TIMELINE_FIELDS = ('user', 'date', 'start_time', 'end_time', 'break_duration_minutes')
+
+    def _affects_timeline(self, data):
+        if self.instance is None:
+            return True
+        if any(f in data and data[f] != getattr(self.instance, f) for f in self.TIMELINE_FIELDS):
+            return True
+        # Back to active from cancelled / no-show / completed
+        return data.get('status') in ACTIVE_STATUSES and self.instance.status not in ACTIVE_STATUSES
 
     def validate(self, data):
-        """Run model-level overlap validation."""
-        instance = RosterShift(**{**data, 'pk': self.instance.pk if self.instance else None})
+        """
+        Run model-level overlap validation and the labour compliance rules —
+        on edits only when the shift moves on the timeline, so a shift that
+        already breaks a rule can still have e.g. its notes changed.
+        """
+        if not self._affects_timeline(data):
+            return data
+        current = {}
+        if self.instance:
+            # Partial updates only carry the changed fields
+            current = {
+                f: getattr(self.instance, f)
+                for f in ('user', 'branch', 'date', 'start_time', 'end_time', 'break_duration_minutes', 'status')
+            }
+        instance = RosterShift(**{**current, **data, 'pk': self.instance.pk if self.instance else None})
         instance.clean()
+
+        violations = compliance.check_shift(instance)
+        if violations and settings.ROSTER_COMPLIANCE_ENFORCE:
+            raise serializers.ValidationError({'compliance': [v['message'] for v in violations]})
         return data
 
     def create(self, validated_data):
@@ -81,6 +116,189 @@ class RosterShiftSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+# ---------------------------------------------------------------------------
+# Recurring Shift
+# ---------------------------------------------------------------------------
+
+class WeekdaysField(serializers.ListField):
+    """Weekdays as a list of 0 (Monday) … 6 (Sunday), stored as a bitmask."""
+    child = serializers.IntegerField(min_value=0, max_value=6)
+
+    def to_representation(self, mask):
+        return [d for d in range(7) if mask & (1 << d)]
+
+    def to_internal_value(self, data):
+        mask = 0
+        for d in super().to_internal_value(data):
+            mask |= 1 << d
+        return mask
+
+
+class RecurringShiftSerializer(serializers.ModelSerializer):
+    user_name = serializers.SerializerMethodField()
+    branch_name = serializers.CharField(source='branch.name', read_only=True)
+    template_name = serializers.CharField(source='template.name', read_only=True, default='')
+    weekdays = WeekdaysField(allow_empty=False)
+
+    class Meta:
+        model = RecurringShift
+        fields = [
+            'id', 'user', 'user_name',
+            'branch', 'branch_name',
+            'template', 'template_name',
+            'start_time', 'end_time',
+            'break_duration_minutes', 'hourly_rate',
+            'weekdays', 'interval_weeks', 'start_date', 'end_date',
+            'materialized_until', 'is_active', 'notes',
+            'created_by', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'materialized_until', 'created_by', 'created_at', 'updated_at']
+
+    def get_user_name(self, obj):
+        return f'{obj.user.first_name} {obj.user.last_name}'.strip() or obj.user.username
+
+    def to_internal_value(self, data):
+        # Fill times/rate from the template when not given explicitly
+        template_id = data.get('template')
+        if template_id and not all(data.get(f) for f in ('start_time', 'end_time')):
+            template = ShiftTemplate.objects.filter(pk=template_id).first()
+            if template:
+                data = {
+                    'start_time': template.start_time,
+                    'end_time': template.end_time,
+                    'break_duration_minutes': template.break_duration_minutes,
+                    'hourly_rate': template.hourly_rate,
+                    **{k: v for k, v in data.items() if v not in (None, '')},
+                }
+        return super().to_internal_value(data)
+
+    def validate_interval_weeks(self, value):
+        if value < 1:
+            raise serializers.ValidationError('Must be at least 1.')
+        return value
+
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError('End date must be on or after start date.')
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time and end_time and start_time == end_time:
+            raise serializers.ValidationError('Start and end time must differ.')
+        return data
+
+    def create(self, validated_data):
+        validated_data['created_by'] = self.context['request'].user
+        return super().create(validated_data)
+
+
+# ---------------------------------------------------------------------------
+# Template-driven generation (request payload)
+# ---------------------------------------------------------------------------
+
+class GenerationRuleSerializer(serializers.Serializer):
+    template = serializers.PrimaryKeyRelatedField(queryset=ShiftTemplate.objects.all())
+    weekdays = WeekdaysField(allow_empty=False, required=False, default=0b1111111)
+    users = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), many=True, allow_empty=False)
+
+
+class GenerateShiftsSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    rules = GenerationRuleSerializer(many=True, allow_empty=False)
+    on_conflict = serializers.ChoiceField(choices=['skip', 'abort'], default='skip')
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data['date_to'] < data['date_from'] or (data['date_to'] - data['date_from']).days > 62:
+            raise serializers.ValidationError('date_to must be on or after date_from and within 62 days.')
+        return data
+
+
+# ---------------------------------------------------------------------------
+# Roster Draft
+# ---------------------------------------------------------------------------
+
+class RosterDraftSerializer(serializers.ModelSerializer):
+    branch_name = serializers.CharField(source='branch.name', read_only=True, default='')
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    created_by_name = serializers.SerializerMethodField()
+    shift_count = serializers.IntegerField(read_only=True, default=0)
+
+    class Meta:
+        model = RosterDraft
+        fields = [
+            'id', 'name', 'date_from', 'date_to',
+            'branch', 'branch_name',
+            'status', 'status_display', 'shift_count',
+            'created_by', 'created_by_name',
+            'published_by', 'published_at',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = [
+            'id', 'status', 'created_by', 'published_by', 'published_at', 'created_at', 'updated_at',
+        ]
+
+    def get_created_by_name(self, obj):
+        if obj.created_by:
+            return f'{obj.created_by.first_name} {obj.created_by.last_name}'.strip() or obj.created_by.username
+        return ''
+
+    def validate(self, data):
+        date_from = data.get('date_from', getattr(self.instance, 'date_from', None))
+        date_to = data.get('date_to', getattr(self.instance, 'date_to', None))
+        if date_from and date_to and date_to < date_from:
+            raise serializers.ValidationError('date_to must be on or after date_from.')
+        if self.instance and ({'date_from', 'date_to', 'branch'} & data.keys()):
+            raise serializers.ValidationError('The scope of an existing draft cannot change.')
+        return data
+
+    def create(self, validated_data):
+        validated_data['created_by'] = self.context['request'].user
+        return super().create(validated_data)
+
+
+class DraftShiftSerializer(serializers.ModelSerializer):
+    user_name = serializers.SerializerMethodField()
+    branch_name = serializers.CharField(source='branch.name', read_only=True)
+    template_name = serializers.CharField(source='template.name', read_only=True, default='')
+
+    class Meta:
+        model = DraftShift
+        fields = [
+            'id', 'draft', 'source_shift',
+            'user', 'user_name',
+            'branch', 'branch_name',
+            'template', 'template_name',
+            'date', 'start_time', 'end_time',
+            'break_duration_minutes', 'hourly_rate',
+            'notes', 'is_removed',
+        ]
+        read_only_fields = ['id', 'source_shift', 'is_removed']
+
+    def get_user_name(self, obj):
+        return f'{obj.user.first_name} {obj.user.last_name}'.strip() or obj.user.username
+
+    def validate(self, data):
+        draft = data.get('draft', getattr(self.instance, 'draft', None))
+        if self.instance and 'draft' in data and data['draft'] != self.instance.draft:
+            raise serializers.ValidationError('A shift cannot move between drafts.')
+        if draft.status != 'open':
+            raise serializers.ValidationError(f'Draft is {draft.status}.')
+        d = data.get('date', getattr(self.instance, 'date', None))
+        if not draft.date_from <= d <= draft.date_to:
+            raise serializers.ValidationError(f'Date must be within {draft.date_from} to {draft.date_to}.')
+        branch = data.get('branch', getattr(self.instance, 'branch', None))
+        if draft.branch_id and branch.pk != draft.branch_id:
+            raise serializers.ValidationError('Shift must be at the draft\'s branch.')
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time == end_time:
+            raise serializers.ValidationError('Start and end time must differ.')
+        return data
+
+
 # ---------------------------------------------------------------------------
 # Availability
 # ---------------------------------------------------------------------------
@@ -104,6 +322,47 @@ class AvailabilitySerializer(serializers.ModelSerializer):
         return f'{obj.user.first_name} {obj.user.last_name}'.strip() or obj.user.username
 
 
+class BulkAvailabilitySerializer(serializers.Serializer):
+    """Request payload for ``bulk_set`` / ``bulk_clear``: users × dates (weekday-filtered)."""
+    users = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), many=True, allow_empty=False)
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    weekdays = WeekdaysField(allow_empty=False, required=False, default=0b1111111)
+    preset = serializers.ChoiceField(choices=Availability.PRESET_CHOICES, default='custom')
+    start_time = serializers.TimeField(required=False)
+    end_time = serializers.TimeField(required=False)
+    is_available = serializers.BooleanField(default=True)
+    notes = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+    def validate(self, data):
+        if data['date_to'] < data['date_from'] or (data['date_to'] - data['date_from']).days > 366:
+            raise serializers.ValidationError('date_to must be on or after date_from and within a year.')
+        return data
+
+    def resolve_times(self):
+        """(start, end) for the preset, mirroring ``quick_set``."""
+        data = self.validated_data
+        preset = data['preset']
+        if preset in Availability.PRESET_TIMES:
+            return Availability.PRESET_TIMES[preset]
+        if preset == 'from_time':
+            if 'start_time' not in data:
+                raise serializers.ValidationError({'start_time': 'Required for from_time preset.'})
+            return data['start_time'], '23:59'
+        if 'start_time' not in data or 'end_time' not in data:
+            raise serializers.ValidationError('start_time and end_time required for custom preset.')
+        return data['start_time'], data['end_time']
+
+    def dates(self):
+        data = self.validated_data
+        d, days = data['date_from'], []
+        while d <= data['date_to']:
+            if data['weekdays'] & (1 << d.weekday()):
+                days.append(d)
+            d += timedelta(days=1)
+        return days
+
+
 # ---------------------------------------------------------------------------
 # PTO Request
 # ---------------------------------------------------------------------------
@@ -113,13 +372,14 @@ class PTORequestSerializer(serializers.ModelSerializer):
     type_display = serializers.CharField(source='get_leave_type_display', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     reviewed_by_name = serializers.SerializerMethodField()
+    hours = serializers.SerializerMethodField()
 
     class Meta:
         model = PTORequest
         fields = [
             'id', 'user', 'user_name',
             'leave_type', 'type_display',
-            'start_date', 'end_date', 'reason',
+            'start_date', 'end_date', 'hours', 'reason',
             'status', 'status_display',
             'reviewed_by', 'reviewed_by_name', 'reviewed_at', 'notes',
             'created_at', 'updated_at',
@@ -134,12 +394,23 @@ class PTORequestSerializer(serializers.ModelSerializer):
             return f'{obj.reviewed_by.first_name} {obj.reviewed_by.last_name}'.strip() or obj.reviewed_by.username
         return ''
 
+    def get_hours(self, obj):
+        """Hours the request takes from the leave balance."""
+        return leave.leave_hours(obj.start_date, obj.end_date)
+
     def validate(self, data):
         instance = PTORequest(**{**data, 'pk': self.instance.pk if self.instance else None})
         instance.clean()
         return data
 
 
+class BulkReviewSerializer(serializers.Serializer):
+    """Request payload for ``bulk_review`` of PTO or drop requests."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    status = serializers.ChoiceField(choices=['approved', 'rejected'])
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
 # ---------------------------------------------------------------------------
 # Drop Request
 # ---------------------------------------------------------------------------
@@ -184,6 +455,144 @@ class DropRequestSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+# ---------------------------------------------------------------------------
+# Open Shift
+# ---------------------------------------------------------------------------
+
+class ShiftOfferSerializer(serializers.ModelSerializer):
+    user_name = serializers.SerializerMethodField()
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = ShiftOffer
+        fields = ['id', 'user', 'user_name', 'rank', 'score', 'status', 'status_display', 'created_at', 'responded_at']
+        read_only_fields = fields
+
+    def get_user_name(self, obj):
+        return f'{obj.user.first_name} {obj.user.last_name}'.strip() or obj.user.username
+
+
+class OpenShiftSerializer(serializers.ModelSerializer):
+    branch_name = serializers.CharField(source='branch.name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    filled_by_name = serializers.SerializerMethodField()
+    offers = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OpenShift
+        fields = [
+            'id', 'source_shift', 'drop_request',
+            'branch', 'branch_name', 'template',
+            'date', 'start_time', 'end_time',
+            'break_duration_minutes', 'hourly_rate', 'notes',
+            'status', 'status_display',
+            'filled_by', 'filled_by_name', 'filled_shift', 'filled_at',
+            'offers', 'created_at',
+        ]
+        read_only_fields = fields
+
+    def get_filled_by_name(self, obj):
+        if obj.filled_by:
+            return f'{obj.filled_by.first_name} {obj.filled_by.last_name}'.strip() or obj.filled_by.username
+        return ''
+
+    def get_offers(self, obj):
+        # LPOs only see their own offer; prefetched, so no query per row
+        offers = obj.offers.all()
+        user = self.context['request'].user if 'request' in self.context else None
+        if user and hasattr(user, 'profile') and user.profile.role == 'LPO':
+            offers = [o for o in offers if o.user_id == user.pk]
+        return ShiftOfferSerializer(offers, many=True).data
+
+
+# ---------------------------------------------------------------------------
+# Leave Balance / Ledger
+# ---------------------------------------------------------------------------
+
+class LeaveBalanceSerializer(serializers.ModelSerializer):
+    user_name = serializers.SerializerMethodField()
+    type_display = serializers.CharField(source='get_leave_type_display', read_only=True)
+
+    class Meta:
+        model = LeaveBalance
+        fields = ['id', 'user', 'user_name', 'leave_type', 'type_display', 'hours', 'updated_at']
+        read_only_fields = fields
+
+    def get_user_name(self, obj):
+        return f'{obj.user.first_name} {obj.user.last_name}'.strip() or obj.user.username
+
+
+class LeaveLedgerEntrySerializer(serializers.ModelSerializer):
+    type_display = serializers.CharField(source='get_leave_type_display', read_only=True)
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+
+    class Meta:
+        model = LeaveLedgerEntry
+        fields = [
+            'id', 'user', 'leave_type', 'type_display', 'kind', 'kind_display',
+            'hours', 'period_start', 'pto_request', 'note', 'created_by', 'created_at',
+        ]
+        read_only_fields = fields
+
+
+class LeaveAdjustmentSerializer(serializers.Serializer):
+    """Request payload for a manual balance adjustment (signed hours)."""
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+    leave_type = serializers.ChoiceField(choices=sorted(set(leave.BALANCE_TYPES.values())))
+    hours = serializers.DecimalField(max_digits=8, decimal_places=2)
+    note = serializers.CharField(max_length=255)
+
+    def validate_hours(self, value):
+        if not value:
+            raise serializers.ValidationError('hours must not be zero.')
+        return value
+
+
+# ---------------------------------------------------------------------------
+# Payroll
+# ---------------------------------------------------------------------------
+
+class PayPeriodSerializer(serializers.ModelSerializer):
+    source_display = serializers.CharField(source='get_source_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    line_count = serializers.IntegerField(read_only=True, default=0)
+
+    class Meta:
+        model = PayPeriod
+        fields = [
+            'id', 'start_date', 'end_date', 'source', 'source_display',
+            'status', 'status_display', 'rules', 'line_count', 'total_hours', 'gross_pay',
+            'computed_at', 'finalised_by', 'finalised_at', 'created_by', 'created_at',
+        ]
+        read_only_fields = [
+            'id', 'status', 'rules', 'total_hours', 'gross_pay',
+            'computed_at', 'finalised_by', 'finalised_at', 'created_by', 'created_at',
+        ]
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError('end_date must be on or after start_date.')
+        if (data['end_date'] - data['start_date']).days >= payroll.MAX_PERIOD_DAYS:
+            raise serializers.ValidationError(f'A pay period can span at most {payroll.MAX_PERIOD_DAYS} days.')
+        return data
+
+
+class PayrollLineSerializer(serializers.ModelSerializer):
+    user_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PayrollLine
+        fields = [
+            'id', 'period', 'user', 'user_name', 'shift_count',
+            *[f'{c}_{part}' for c in payroll.CATEGORIES for part in ('hours', 'pay')],
+            'total_hours', 'gross_pay',
+        ]
+        read_only_fields = fields
+
+    def get_user_name(self, obj):
+        return f'{obj.user.first_name} {obj.user.last_name}'.strip() or obj.user.username
+
+
 # ---------------------------------------------------------------------------
 # Notification
 # ---------------------------------------------------------------------------
@@ -198,6 +607,6 @@ class NotificationSerializer(serializers.ModelSerializer):
             'id', 'user', 'notification_type', 'type_display',
             'channel', 'channel_display',
             'title', 'message', 'is_read',
-            'related_shift', 'sent_at',
+            'related_shift', 'sent_at', 'repeat_count',
         ]
-        read_only_fields = ['id', 'sent_at']
+        read_only_fields = ['id', 'sent_at', 'repeat_count']
@@ -0,0 +1,138 @@
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from profiles.models import Profile
+
+from . import availability_index, availability_matrix, ical, sync
+from .models import Availability, PTORequest, RosterShift
+
+
+_bulk = threading.local()
+
+
+@contextmanager
+def bulk_changes():
+    """
+    Skip the per-row sync, feed and index receivers below for ORM writes made
+    inside the block. The caller records tombstones, touches feeds and
+    rebuilds the index once for the whole set afterwards.
+    """
+    depth = getattr(_bulk, 'depth', 0)
+    _bulk.depth = depth + 1
+    try:
+        yield
+    finally:
+        _bulk.depth = depth
+
+
+def _in_bulk():
+    return getattr(_bulk, 'depth', 0) > 0
+
+
+def refresh_shifts(pairs):
+    """
+    The index and calendar-feed work of the shift receivers below, done once
+    for ``(user_id, date)`` pairs written in bulk (``bulk_create``,
+    ``.update()`` or inside :func:`bulk_changes`).
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    user_ids = {user_id for user_id, _ in pairs}
+    availability_index.rebuild(user_ids, {d + timedelta(days=i) for _, d in pairs for i in (0, 1)})
+    ical.touch(user_ids)
+
+
+def _as_date(value):
+    # Rows created from request data (e.g. quick_set) can still hold ISO strings
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _index_state(instance):
+    """(user_id, first date, last date, status) without loading deferred fields."""
+    fields = instance.__dict__
+    if isinstance(instance, PTORequest):
+        start, end = fields.get('start_date'), fields.get('end_date')
+    else:
+        start = end = fields.get('date')
+    return fields.get('user_id'), _as_date(start), _as_date(end), fields.get('status')
+
+
+def _dates(start, end):
+    """start … end plus the following day, which receives overnight carry."""
+    return {start + timedelta(days=i) for i in range((end - start).days + 2)}
+
+
+@receiver(post_init, sender=RosterShift)
+@receiver(post_init, sender=Availability)
+@receiver(post_init, sender=PTORequest)
+def remember_index_state(sender, instance, **kwargs):
+    """Keep the loaded state so moving a row also refreshes its old dates."""
+    instance._index_state = _index_state(instance)
+
+
+# Connected before refresh_availability_index, which moves _index_state on,
+# so these still see the previous holder
+@receiver(post_save, sender=RosterShift)
+@receiver(post_delete, sender=RosterShift)
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+@receiver(post_save, sender=PTORequest)
+@receiver(post_delete, sender=PTORequest)
+def record_sync_tombstone(sender, instance, **kwargs):
+    """Tell delta-sync clients about deleted rows, and rows moved to another user."""
+    if _in_bulk():
+        return
+    old_user = getattr(instance, '_index_state', (None,))[0]
+    if kwargs.get('signal') is post_delete:
+        sync.record(sync.KINDS[sender], [(instance.pk, instance.user_id)])
+    elif old_user and old_user != instance.user_id:
+        sync.record(sync.KINDS[sender], [(instance.pk, old_user)])
+
+
+@receiver(post_save, sender=RosterShift)
+@receiver(post_delete, sender=RosterShift)
+def touch_calendar_feed(sender, instance, **kwargs):
+    """Move the iCalendar feed stamp of the shift's holder (and previous holder)."""
+    if _in_bulk():
+        return
+    ical.touch({getattr(instance, '_index_state', (None,))[0], instance.user_id})
+
+
+@receiver(post_save, sender=RosterShift)
+@receiver(post_delete, sender=RosterShift)
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+@receiver(post_save, sender=PTORequest)
+@receiver(post_delete, sender=PTORequest)
+def refresh_availability_index(sender, instance, **kwargs):
+    """Rebuild availability bitmaps for the (user, date) pairs a change touches."""
+    if _in_bulk():
+        return
+    old = getattr(instance, '_index_state', (None,) * 4)
+    new = _index_state(instance)
+    instance._index_state = new
+
+    # Leave only affects the index while (or until just now) approved
+    if sender is PTORequest and 'approved' not in (old[3], new[3]):
+        return
+
+    user_ids, dates = set(), set()
+    for user_id, start, end, _ in (old, new):
+        if user_id and start and end:
+            user_ids.add(user_id)
+            dates |= _dates(start, end)
+    availability_index.rebuild(user_ids, dates)
+
+    if sender is Availability:
+        availability_matrix.touch({old[1], new[1]})
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def clear_lpo_directory(sender, **kwargs):
+    availability_index.clear_directory_cache()
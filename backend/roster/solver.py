@@ -0,0 +1,323 @@
+"""
+Automatic roster solver — assigns active LPOs to open template slots.
+
+Open slots are built from active ``ShiftTemplate`` rows for every date in
+the range, minus shifts already rostered at the same branch and times.
+Each day is solved as a min-cost bipartite assignment (slots × LPOs) using
+shortest augmenting paths over the feasible pairs only; hours assigned on
+earlier days feed the weekly fairness cost of later days. Nothing is written — the result is a draft
+the manager reviews and then posts to ``bulk_create``.
+"""
+
+import heapq
+from datetime import timedelta
+
+from profiles.models import Profile
+
+from .models import (
+    ACTIVE_STATUSES, Availability, PTORequest, RosterShift, ShiftTemplate,
+    availability_window, shift_window,
+)
+
+# Cost of leaving a slot unfilled
+_UNFILLED = 10 ** 6
+
+# Cost weights
+_BASE_COST = 100
+_PREFERRED_BONUS = 15
+_NOT_PREFERRED_PENALTY = 5
+_UNDECLARED_PENALTY = 10
+_FAIRNESS_WEIGHT = 20
+_OVERTIME_WEIGHT = 50
+
+
+# ---------------------------------------------------------------------------
+# Time helpers
+# ---------------------------------------------------------------------------
+
+def _week_key(d):
+    return d.isocalendar()[:2]
+
+
+# ---------------------------------------------------------------------------
+# Min-cost assignment (sparse shortest augmenting paths)
+# ---------------------------------------------------------------------------
+
+def min_cost_assignment(rows, n_columns):
+    """
+    Solve a sparse assignment problem. ``rows[i]`` is a list of
+    ``(column, cost)`` edges (columns ``0 .. n_columns - 1``, costs ≥ 0);
+    every row must have at least one edge. Returns ``assignment[i] = column``
+    minimising total cost.
+
+    Each row is added with one Dijkstra search over reduced costs (Hungarian
+    dual potentials), so only feasible edges are ever visited.
+    """
+    inf = float('inf')
+    u = [0] * len(rows)        # row potentials
+    v = [0] * n_columns        # column potentials
+    col_owner = [None] * n_columns
+    row_col = [None] * len(rows)
+
+    for i0 in range(len(rows)):
+        dist, pred, done = {}, {}, {}
+        heap = []
+        ui0 = u[i0]
+        for j, c in rows[i0]:
+            d = c - ui0 - v[j]
+            if d < dist.get(j, inf):
+                dist[j] = d
+                pred[j] = i0
+                heap.append((d, j))
+        heapq.heapify(heap)
+
+        while True:
+            d, j = heapq.heappop(heap)
+            if j in done:
+                continue
+            done[j] = d
+            r = col_owner[j]
+            if r is None:
+                sink, total = j, d
+                break
+            base = d - u[r]  # matched edge (r, j) has zero reduced cost
+            for j2, c in rows[r]:
+                nd = base + c - v[j2]
+                if nd < dist.get(j2, inf) and j2 not in done:
+                    dist[j2] = nd
+                    pred[j2] = r
+                    heapq.heappush(heap, (nd, j2))
+
+        # Dual update keeps reduced costs ≥ 0 and zero along the new path
+        u[i0] += total
+        for j, d in done.items():
+            if j != sink:
+                v[j] -= total - d
+                u[col_owner[j]] += total - d
+
+        # Augment along predecessors
+        j = sink
+        while True:
+            i = pred[j]
+            prev = row_col[i]
+            col_owner[j], row_col[i] = i, j
+            if i == i0:
+                break
+            j = prev
+
+    return row_col
+
+
+# ---------------------------------------------------------------------------
+# Solver
+# ---------------------------------------------------------------------------
+
+class RosterSolver:
+    """Build open slots and candidate data for a date range, then solve it."""
+
+    def __init__(self, date_from, date_to, branch_ids=None, template_ids=None,
+                 target_weekly_hours=38, headcount=1):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.branch_ids = branch_ids
+        self.template_ids = template_ids
+        self.target_weekly_hours = float(target_weekly_hours)
+        self.headcount = headcount
+
+    # --- data loading ------------------------------------------------------
+
+    def _dates(self):
+        d = self.date_from
+        while d <= self.date_to:
+            yield d
+            d += timedelta(days=1)
+
+    def _load(self):
+        """Load everything the solver needs in a fixed number of queries."""
+        # Whole ISO weeks around the range, so weekly hours are complete
+        span_from = self.date_from - timedelta(days=self.date_from.weekday())
+        span_to = self.date_to + timedelta(days=6 - self.date_to.weekday())
+
+        templates = ShiftTemplate.objects.filter(is_active=True).select_related('branch')
+        if self.branch_ids:
+            templates = templates.filter(branch_id__in=self.branch_ids)
+        if self.template_ids:
+            templates = templates.filter(pk__in=self.template_ids)
+        self.templates = list(templates)
+
+        profiles = Profile.objects.filter(role='LPO', status='Active').select_related('user')
+        self.users = {
+            p.user_id: f'{p.user.first_name} {p.user.last_name}'.strip() or p.user.username
+            for p in profiles
+        }
+        self.preferred = {}
+        for user_id, branch_id in Profile.preferred_branches.through.objects.filter(
+            profile__user_id__in=self.users,
+        ).values_list('profile__user_id', 'branch_id'):
+            self.preferred.setdefault(user_id, set()).add(branch_id)
+
+        self.availability = {
+            (a.user_id, a.date): a
+            for a in Availability.objects.filter(
+                user_id__in=self.users,
+                date__gte=self.date_from - timedelta(days=1),
+                date__lte=self.date_to,
+            )
+        }
+
+        self.on_leave = set()
+        for pto in PTORequest.objects.filter(
+            user_id__in=self.users, status='approved',
+            start_date__lte=self.date_to, end_date__gte=self.date_from,
+        ).only('user_id', 'start_date', 'end_date'):
+            d = max(pto.start_date, self.date_from)
+            while d <= min(pto.end_date, self.date_to):
+                self.on_leave.add((pto.user_id, d))
+                d += timedelta(days=1)
+
+        # Busy intervals (absolute minutes from span_from) + weekly hours
+        self.origin = span_from
+        self.busy = {}
+        self.week_hours = {}
+        self.filled = {}
+        for s in RosterShift.objects.filter(
+            date__gte=span_from, date__lte=span_to, status__in=ACTIVE_STATUSES,
+        ).only('user_id', 'branch_id', 'date', 'start_time', 'end_time', 'total_hours'):
+            self._book(s.user_id, s.date, s.start_time, s.end_time, float(s.total_hours or 0))
+            key = (s.branch_id, s.date, s.start_time, s.end_time)
+            self.filled[key] = self.filled.get(key, 0) + 1
+
+    def _book(self, user_id, d, start, end, hours):
+        s, e = shift_window(start, end)
+        offset = (d - self.origin).days * 24 * 60
+        self.busy.setdefault(user_id, []).append((offset + s, offset + e))
+        week = _week_key(d)
+        self.week_hours[(user_id, week)] = self.week_hours.get((user_id, week), 0) + hours
+
+    # --- constraints & cost -----------------------------------------------
+
+    def _availability(self, user_id, d, s, e):
+        """Return 'declared', 'undeclared' or None (not available)."""
+        prev = self.availability.get((user_id, d - timedelta(days=1)))
+        if prev and prev.is_available:
+            ps, pe = availability_window(prev.start_time, prev.end_time)
+            if pe > 24 * 60 and ps - 24 * 60 <= s and e <= pe - 24 * 60:
+                return 'declared'
+        row = self.availability.get((user_id, d))
+        if row is None:
+            return 'undeclared'
+        if not row.is_available:
+            return None
+        a_s, a_e = availability_window(row.start_time, row.end_time)
+        return 'declared' if a_s <= s and e <= a_e else None
+
+    def _is_busy(self, user_id, d, s, e):
+        offset = (d - self.origin).days * 24 * 60
+        s, e = offset + s, offset + e
+        return any(bs < e and s < be for bs, be in self.busy.get(user_id, ()))
+
+    def _window_cost(self, user_id, d, window, hours):
+        """Branch-independent cost of giving *user_id* a shift in *window* on *d*."""
+        s, e = window
+        if (user_id, d) in self.on_leave or self._is_busy(user_id, d, s, e):
+            return None
+        declared = self._availability(user_id, d, s, e)
+        if declared is None:
+            return None
+
+        cost = _BASE_COST
+        if declared == 'undeclared':
+            cost += _UNDECLARED_PENALTY
+        projected = self.week_hours.get((user_id, _week_key(d)), 0) + hours
+        cost += _FAIRNESS_WEIGHT * projected / self.target_weekly_hours
+        cost += _OVERTIME_WEIGHT * max(0.0, projected - self.target_weekly_hours)
+        return cost
+
+    def _branch_cost(self, user_id, branch_id):
+        preferred = self.preferred.get(user_id)
+        if not preferred:
+            return 0
+        return -_PREFERRED_BONUS if branch_id in preferred else _NOT_PREFERRED_PENALTY
+
+    # --- solve --------------------------------------------------------------
+
+    def _open_slots(self, d):
+        slots = []
+        for t in self.templates:
+            key = (t.branch_id, d, t.start_time, t.end_time)
+            for _ in range(max(0, self.headcount - self.filled.get(key, 0))):
+                slots.append({
+                    'branch_id': t.branch_id,
+                    'branch_name': t.branch.name,
+                    'template': t,
+                    'date': d,
+                    'window': shift_window(t.start_time, t.end_time),
+                    'hours': float(t.net_hours or 0),
+                })
+        return slots
+
+    def solve(self):
+        """Return ``{'assignments': [...], 'unfilled': [...]}`` for the range."""
+        self._load()
+        assignments, unfilled = [], []
+
+        for d in self._dates():
+            slots = self._open_slots(d)
+            if not slots:
+                continue
+
+            # Feasibility and base cost only depend on the shift window, so
+            # evaluate each user once per distinct window rather than per slot
+            candidates = list(self.users)
+            window_costs = {
+                key: [self._window_cost(uid, d, *key) for uid in candidates]
+                for key in {(slot['window'], slot['hours']) for slot in slots}
+            }
+
+            # Edges: feasible candidates + one private "unfilled" column per
+            # slot. Keeping each slot's n cheapest candidates (n = number of
+            # slots) still contains an optimal assignment.
+            n, n_candidates = len(slots), len(candidates)
+            rows = []
+            for i, slot in enumerate(slots):
+                costs = window_costs[(slot['window'], slot['hours'])]
+                edges = [
+                    (col, costs[col] + self._branch_cost(uid, slot['branch_id']))
+                    for col, uid in enumerate(candidates) if costs[col] is not None
+                ]
+                if len(edges) > n:
+                    edges = heapq.nsmallest(n, edges, key=lambda edge: edge[1])
+                edges.append((n_candidates + i, _UNFILLED))
+                rows.append(edges)
+
+            for i, col in enumerate(min_cost_assignment(rows, n_candidates + n)):
+                slot, t = slots[i], slots[i]['template']
+                if col >= n_candidates:
+                    unfilled.append(self._slot_data(slot))
+                    continue
+                uid = candidates[col]
+                self._book(uid, d, t.start_time, t.end_time, slot['hours'])
+                assignments.append({
+                    **self._slot_data(slot),
+                    'user': uid,
+                    'user_name': self.users[uid],
+                    'break_duration_minutes': t.break_duration_minutes,
+                    'hourly_rate': t.hourly_rate,
+                    'hours': slot['hours'],
+                    'status': 'scheduled',
+                })
+
+        return {'assignments': assignments, 'unfilled': unfilled}
+
+    @staticmethod
+    def _slot_data(slot):
+        t = slot['template']
+        return {
+            'branch': slot['branch_id'],
+            'branch_name': slot['branch_name'],
+            'template': t.pk,
+            'template_name': t.name,
+            'date': slot['date'],
+            'start_time': t.start_time,
+            'end_time': t.end_time,
+        }
@@ -0,0 +1,104 @@
+"""
+Delta sync — roster rows changed since a client's cursor.
+
+A client keeps the ``cursor`` from its last response and sends it back.
+Changed shifts, availability and PTO requests are found through their
+``updated_at`` indexes; deleted rows through the ``SyncTombstone`` rows that
+``roster.signals`` (and bulk deletes, via :func:`record`) leave behind.
+
+Each query reaches ``_OVERLAP`` further back than the cursor, to pick up
+transactions that committed just after the previous response was built.
+Rows may therefore be sent twice; clients upsert by id, so that is harmless.
+
+A client further behind than ``ROSTER_SYNC_RETENTION_DAYS`` (tombstones may
+have been pruned), or with more than ``ROSTER_SYNC_MAX_CHANGES`` changes to
+catch up on, gets ``reset`` and should reload instead.
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Availability, PTORequest, RosterShift, SyncTombstone
+
+_OVERLAP = timedelta(seconds=5)
+
+KINDS = {RosterShift: 'shift', Availability: 'availability', PTORequest: 'pto'}
+
+
+def _querysets():
+    """kind → queryset with what its serializer reads."""
+    return {
+        'shift': RosterShift.objects.select_related(
+            'user', 'branch', 'template', 'created_by',
+        ).prefetch_related('drop_requests'),
+        'availability': Availability.objects.select_related('user'),
+        'pto': PTORequest.objects.select_related('user', 'reviewed_by'),
+    }
+
+
+def record(kind, rows):
+    """Write tombstones for ``[(object_id, user_id)]`` of one kind."""
+    SyncTombstone.objects.bulk_create(
+        [SyncTombstone(kind=kind, object_id=object_id, user_id=user_id) for object_id, user_id in rows],
+        batch_size=1000,
+    )
+
+
+def parse_cursor(value):
+    """Aware datetime from an ISO 8601 cursor; raises ``ValueError``."""
+    cursor = datetime.fromisoformat(value)
+    if timezone.is_naive(cursor):
+        cursor = timezone.make_aware(cursor)
+    return cursor
+
+
+def changes(since, user_id=None):
+    """
+    Everything changed after *since*, only *user_id*'s rows when given.
+    Returns ``{'cursor', 'reset', 'changed': {kind: [row]}, 'deleted':
+    {kind: [id]}}``; with ``reset`` the lists are empty.
+    """
+    now = timezone.now()
+    result = {
+        'cursor': now,
+        'reset': False,
+        'changed': {kind: [] for kind in KINDS.values()},
+        'deleted': {kind: [] for kind in KINDS.values()},
+    }
+    if since < now - timedelta(days=settings.ROSTER_SYNC_RETENTION_DAYS):
+        result['reset'] = True
+        return result
+
+    limit = settings.ROSTER_SYNC_MAX_CHANGES
+    after = since - _OVERLAP
+    budget = limit + 1
+    changed = {}
+    for kind, qs in _querysets().items():
+        qs = qs.filter(updated_at__gt=after)
+        if user_id is not None:
+            qs = qs.filter(user_id=user_id)
+        changed[kind] = list(qs.order_by('updated_at', 'pk')[:budget])
+        budget -= len(changed[kind])
+        if budget <= 0:
+            result['reset'] = True
+            return result
+
+    tombstones = SyncTombstone.objects.filter(deleted_at__gt=after)
+    if user_id is not None:
+        tombstones = tombstones.filter(user_id=user_id)
+    deleted = {kind: set() for kind in KINDS.values()}
+    for kind, object_id in tombstones.values_list('kind', 'object_id')[:budget]:
+        deleted[kind].add(object_id)
+    if sum(map(len, deleted.values())) >= budget:
+        result['reset'] = True
+        return result
+
+    for kind, rows in changed.items():
+        # A row moved to another user leaves a tombstone for the old one, but
+        # still exists — it is an update, not a delete, for anyone who sees it
+        live = {r.pk for r in rows}
+        result['changed'][kind] = rows
+        result['deleted'][kind] = sorted(deleted[kind] - live)
+    return result
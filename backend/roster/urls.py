@@ -1,18 +1,32 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    ShiftTemplateViewSet, RosterShiftViewSet, AvailabilityViewSet,
-    PTORequestViewSet, DropRequestViewSet, NotificationViewSet,
+    ShiftTemplateViewSet, RosterShiftViewSet, RecurringShiftViewSet,
+    RosterDraftViewSet, DraftShiftViewSet, AvailabilityViewSet,
+    PTORequestViewSet, LeaveBalanceViewSet, LeaveLedgerEntryViewSet, PayPeriodViewSet,
+    DropRequestViewSet, OpenShiftViewSet, NotificationViewSet,
+    notification_stream, roster_sync, calendar_feed, roster_ical,
 )
 
 router = DefaultRouter()
 router.register(r'roster/shift-templates', ShiftTemplateViewSet, basename='shift-templates')
 router.register(r'roster/shifts', RosterShiftViewSet, basename='roster-shifts')
+router.register(r'roster/recurring-shifts', RecurringShiftViewSet, basename='recurring-shifts')
+router.register(r'roster/drafts', RosterDraftViewSet, basename='roster-drafts')
+router.register(r'roster/draft-shifts', DraftShiftViewSet, basename='draft-shifts')
 router.register(r'roster/availability', AvailabilityViewSet, basename='availability')
 router.register(r'roster/pto', PTORequestViewSet, basename='pto-requests')
+router.register(r'roster/leave-balances', LeaveBalanceViewSet, basename='leave-balances')
+router.register(r'roster/leave-ledger', LeaveLedgerEntryViewSet, basename='leave-ledger')
+router.register(r'roster/pay-periods', PayPeriodViewSet, basename='pay-periods')
 router.register(r'roster/drop-requests', DropRequestViewSet, basename='drop-requests')
+router.register(r'roster/open-shifts', OpenShiftViewSet, basename='open-shifts')
 router.register(r'roster/notifications', NotificationViewSet, basename='notifications')
 
 urlpatterns = [
+    path('roster/notifications/stream/', notification_stream, name='notification-stream'),
+    path('roster/sync/', roster_sync, name='roster-sync'),
+    path('roster/calendar-feed/', calendar_feed, name='roster-calendar-feed'),
+    path('roster/ical/<str:token>.ics', roster_ical, name='roster-ical'),
     path('', include(router.urls)),
 ]
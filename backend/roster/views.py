@@ -1,21 +1,54 @@
+import asyncio
+import time
 from datetime import timedelta
+from decimal import Decimal
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.utils import timezone
+from django.views.decorators.http import require_GET
 from django_filters import rest_framework as django_filters
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from branches.models import Branch
 
 from .models import (
-    ShiftTemplate, RosterShift, Availability,
-    PTORequest, DropRequest, Notification,
+    ACTIVE_STATUSES, ShiftTemplate, RosterShift, RecurringShift, RosterDraft, DraftShift,
+    Availability, PTORequest, DropRequest, OpenShift, ShiftOffer,
+    LeaveLedgerEntry, LeaveBalance, CalendarFeed, PayPeriod, PayrollLine, Notification,
+    shift_hours, shift_window,
 )
 from .serializers import (
-    ShiftTemplateSerializer, RosterShiftSerializer, AvailabilitySerializer,
-    PTORequestSerializer, DropRequestSerializer, NotificationSerializer,
+    ShiftTemplateSerializer, RosterShiftSerializer, RecurringShiftSerializer,
+    GenerateShiftsSerializer, RosterDraftSerializer, DraftShiftSerializer,
+    AvailabilitySerializer, BulkAvailabilitySerializer, PTORequestSerializer, BulkReviewSerializer,
+    DropRequestSerializer,
+    OpenShiftSerializer, LeaveBalanceSerializer, LeaveLedgerEntrySerializer, LeaveAdjustmentSerializer,
+    PayPeriodSerializer, PayrollLineSerializer, NotificationSerializer,
+)
+from . import (
+    availability_index, availability_matrix, compliance, coverage, drafts, events, generation,
+    ical, leave, marketplace, payroll, recurrence, signals, sync,
+)
+from .notifications import (
+    adjust_unread, build_notifications, mark_notifications_read, notify,
+    publish_unread_counts, send_notifications, unread_counts,
 )
+from .solver import RosterSolver
 
 
 # ===================================================================
@@ -25,10 +58,17 @@ from .serializers import (
 class RosterShiftFilter(django_filters.FilterSet):
     date_from = django_filters.DateFilter(field_name='date', lookup_expr='gte')
     date_to = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+    min_hours = django_filters.NumberFilter(field_name='total_hours', lookup_expr='gte')
+    max_hours = django_filters.NumberFilter(field_name='total_hours', lookup_expr='lte')
+    min_pay = django_filters.NumberFilter(field_name='total_pay', lookup_expr='gte')
+    max_pay = django_filters.NumberFilter(field_name='total_pay', lookup_expr='lte')
 
     class Meta:
         model = RosterShift
-        fields = ['user', 'branch', 'status', 'date_from', 'date_to']
+        fields = [
+            'user', 'branch', 'status', 'date_from', 'date_to',
+            'min_hours', 'max_hours', 'min_pay', 'max_pay',
+        ]
 
 
 class PTORequestFilter(django_filters.FilterSet):
@@ -41,19 +81,69 @@ class PTORequestFilter(django_filters.FilterSet):
 
 
 # ===================================================================
-# Helper — create in-app notification
+# Calendar payload
+# ===================================================================
+
+# Column order of each shift row in the compact calendar payload
+CALENDAR_FIELDS = [
+    'id', 'user', 'branch', 'template',
+    'start_time', 'end_time', 'status',
+    'total_hours', 'total_pay', 'has_drop_request', 'recurrence',
+]
+
+
+# ===================================================================
+# Labour summary helpers
+# ===================================================================
+
+# Statuses that count towards rostered labour
+LABOUR_STATUSES = ('scheduled', 'confirmed', 'completed')
+
+# group_by name → values() fields
+LABOUR_DIMENSIONS = {
+    'user': ('user', 'user__first_name', 'user__last_name', 'user__username'),
+    'branch': ('branch', 'branch__name'),
+    'template': ('template', 'template__name'),
+    'status': ('status',),
+    'date': ('date',),
+}
+
+# group_by name → date truncation expression
+LABOUR_PERIODS = {
+    'week': lambda: TruncWeek('date'),
+    'month': lambda: TruncMonth('date'),
+}
+
+
+def _minutes_to_hours(minutes):
+    return round((minutes or 0) / 60, 2)
+
+
+def _labour_user_name(row):
+    return f"{row['user__first_name']} {row['user__last_name']}".strip() or row['user__username']
+
+
+# ===================================================================
+# Helpers — set-based shift cancellation
 # ===================================================================
 
-def _notify(user, notification_type, title, message, shift=None):
-    """Create an in-app notification for a user."""
-    Notification.objects.create(
-        user=user,
-        notification_type=notification_type,
-        channel='in_app',
-        title=title,
-        message=message,
-        related_shift=shift,
+def _cancel_shifts(queryset, note):
+    """
+    Cancel every shift in *queryset* with one UPDATE (rows locked first) and
+    return ``[{'id', 'user_id', 'date', 'branch_name'}]`` for what changed.
+    Must run inside a transaction.
+    """
+    cancelled = list(
+        queryset.select_for_update(of=('self',)).order_by('date', 'start_time').values(
+            'id', 'user_id', 'date', branch_name=F('branch__name'),
+        )
     )
+    if cancelled:
+        RosterShift.objects.filter(pk__in=[s['id'] for s in cancelled]).update(
+            status='cancelled', notes=note, updated_at=timezone.now(),
+        )
+        signals.refresh_shifts((s['user_id'], s['date']) for s in cancelled)
+    return cancelled
 
 
 # ===================================================================
@@ -66,7 +156,7 @@ class ShiftTemplateViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['branch', 'is_active']
     search_fields = ['name']
-    ordering_fields = ['name', 'start_time', 'branch']
+    ordering_fields = ['name', 'start_time', 'branch', 'duration_hours', 'net_hours']
 
 
 # ===================================================================
@@ -78,41 +168,124 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     filterset_class = RosterShiftFilter
     search_fields = ['user__first_name', 'user__last_name', 'branch__name']
-    ordering_fields = ['date', 'start_time', 'user', 'branch', 'status']
+    ordering_fields = [
+        'date', 'start_time', 'user', 'branch', 'status',
+        'gross_hours', 'total_hours', 'total_pay',
+    ]
 
-    def get_queryset(self):
-        qs = RosterShift.objects.select_related(
-            'user', 'branch', 'template', 'created_by',
-        ).prefetch_related('drop_requests')
+    def _is_lpo(self):
+        user = self.request.user
+        return hasattr(user, 'profile') and user.profile.role == 'LPO'
+
+    def _scoped_queryset(self):
+        qs = RosterShift.objects.all()
 
         # LPO users only see their own shifts
-        user = self.request.user
-        if hasattr(user, 'profile') and user.profile.role == 'LPO':
-            qs = qs.filter(user=user)
+        if self._is_lpo():
+            qs = qs.filter(user=self.request.user)
         return qs
 
-    # --- Calendar endpoint: /api/roster/shifts/calendar/?month=2025-07 ---
+    def get_queryset(self):
+        return self._scoped_queryset().select_related(
+            'user', 'branch', 'template', 'created_by',
+        ).prefetch_related('drop_requests')
+
+    # --- Calendar endpoint: /api/roster/shifts/calendar/?month=2025-07 (or date_from/date_to) ---
     @action(detail=False, methods=['get'])
     def calendar(self, request):
-        """Return shifts grouped by date for a given month."""
-        month_str = request.query_params.get('month')  # YYYY-MM
-        if not month_str:
-            return Response({'error': 'month parameter required (YYYY-MM)'}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            year, month = map(int, month_str.split('-'))
-        except (ValueError, AttributeError):
-            return Response({'error': 'Invalid month format. Use YYYY-MM.'}, status=status.HTTP_400_BAD_REQUEST)
-
+        """
+        Return a compact, day-grouped calendar payload for a month (or any
+        date_from/date_to window up to 93 days). Each shift is a row of
+        ``fields`` values; users, branches and templates are sent once as
+        lookup tables. Honours the regular shift filters (branch, user, …).
+        Recurring patterns past their materialised horizon are expanded as
+        rows with ``id = null`` and ``recurrence`` set.
+        """
         from calendar import monthrange
-        _, last_day = monthrange(year, month)
         from datetime import date
-        start = date(year, month, 1)
-        end = date(year, month, last_day)
 
-        qs = self.get_queryset().filter(date__gte=start, date__lte=end)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+        month_str = request.query_params.get('month')  # YYYY-MM
+        if month_str:
+            try:
+                year, month = map(int, month_str.split('-'))
+                start = date(year, month, 1)
+            except (ValueError, AttributeError):
+                return Response({'error': 'Invalid month format. Use YYYY-MM.'}, status=status.HTTP_400_BAD_REQUEST)
+            end = date(year, month, monthrange(year, month)[1])
+        else:
+            try:
+                start = date.fromisoformat(request.query_params.get('date_from', ''))
+                end = date.fromisoformat(request.query_params.get('date_to', ''))
+            except ValueError:
+                return Response(
+                    {'error': 'month (YYYY-MM) or date_from and date_to (YYYY-MM-DD) required'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        if end < start or (end - start).days > 92:
+            return Response({'error': 'Date window must be 1–93 days.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        pending_drop = DropRequest.objects.filter(shift=OuterRef('pk'), status='pending')
+        rows = list(self.filter_queryset(self._scoped_queryset()).filter(
+            date__gte=start, date__lte=end,
+        ).annotate(
+            has_drop_request=Exists(pending_drop),
+        ).order_by('date', 'start_time').values_list('date', *CALENDAR_FIELDS))
+
+        # Recurring patterns beyond their materialised horizon (id = null)
+        if request.query_params.get('status', 'scheduled') == 'scheduled':
+            patterns = RecurringShift.objects.all()
+            for param in ('user', 'branch'):
+                if request.query_params.get(param):
+                    patterns = patterns.filter(**{f'{param}_id': request.query_params[param]})
+            if self._is_lpo():
+                patterns = patterns.filter(user=request.user)
+            virtual = [
+                (d, None, p.user_id, p.branch_id, p.template_id, p.start_time, p.end_time, 'scheduled',
+                 hours, (hours * p.hourly_rate).quantize(Decimal('0.01')), False, p.pk)
+                for p, d in recurrence.virtual_shifts(patterns, start, end)
+                for hours in [shift_hours(p.start_time, p.end_time, p.break_duration_minutes)]
+            ]
+            if virtual:
+                rows = sorted(rows + virtual, key=lambda r: (r[0], r[5]))
+
+        days = {}
+        user_ids, branch_ids, template_ids = set(), set(), set()
+        total_hours, total_pay = Decimal('0'), Decimal('0')
+        for shift_date, *row in rows:
+            shift_id, user_id, branch_id, template_id, start_time, end_time, _, hours, pay, _, _ = row
+            row[4], row[5] = start_time.strftime('%H:%M'), end_time.strftime('%H:%M')
+            days.setdefault(str(shift_date), []).append(row)
+            user_ids.add(user_id)
+            branch_ids.add(branch_id)
+            if template_id:
+                template_ids.add(template_id)
+            total_hours += hours or 0
+            total_pay += pay or 0
+
+        return Response({
+            'date_from': str(start),
+            'date_to': str(end),
+            'fields': CALENDAR_FIELDS,
+            'days': days,
+            'users': {
+                uid: f'{first} {last}'.strip() or username
+                for uid, first, last, username in User.objects.filter(pk__in=user_ids).values_list(
+                    'id', 'first_name', 'last_name', 'username',
+                )
+            },
+            'branches': dict(Branch.objects.filter(pk__in=branch_ids).values_list('id', 'name')),
+            'templates': {
+                tid: {'name': name, 'color': color}
+                for tid, name, color in ShiftTemplate.objects.filter(pk__in=template_ids).values_list(
+                    'id', 'name', 'color',
+                )
+            },
+            'totals': {
+                'shifts': sum(len(day) for day in days.values()),
+                'hours': total_hours,
+                'pay': total_pay,
+            },
+        })
 
     # --- Conflict check: /api/roster/shifts/check_conflicts/ ---
     @action(detail=False, methods=['post'])
@@ -127,15 +300,29 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
         if not all([user_id, date_val, start_time, end_time]):
             return Response({'error': 'user, date, start_time, end_time required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        conflicts = RosterShift.objects.filter(
+        from datetime import date as date_cls, time as time_cls
+        try:
+            shift_date = date_cls.fromisoformat(str(date_val))
+            start, end = shift_window(time_cls.fromisoformat(str(start_time)), time_cls.fromisoformat(str(end_time)))
+        except ValueError:
+            return Response({'error': 'date must be YYYY-MM-DD and start_time/end_time HH:MM'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Same test as RosterShift.clean(): overnight shifts wrap past midnight,
+        # so shifts on the neighbouring days can overlap too
+        neighbours = RosterShift.objects.filter(
             user_id=user_id,
-            date=date_val,
-            status__in=('scheduled', 'confirmed'),
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-        )
+            date__gte=shift_date - timedelta(days=1),
+            date__lte=shift_date + timedelta(days=1),
+            status__in=ACTIVE_STATUSES,
+        ).order_by('date', 'start_time')
         if exclude_id:
-            conflicts = conflicts.exclude(pk=exclude_id)
+            neighbours = neighbours.exclude(pk=exclude_id)
+        conflicts = []
+        for other in neighbours:
+            offset = (other.date - shift_date).days * 24 * 60
+            other_start, other_end = shift_window(other.start_time, other.end_time)
+            if other_start + offset < end and start < other_end + offset:
+                conflicts.append(other)
 
         # Also check PTO
         pto_conflicts = PTORequest.objects.filter(
@@ -158,12 +345,72 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
                 availability_issue = True
 
         return Response({
-            'has_shift_conflict': conflicts.exists(),
+            'has_shift_conflict': bool(conflicts),
             'shift_conflicts': RosterShiftSerializer(conflicts, many=True).data,
             'has_pto_conflict': pto_conflicts.exists(),
             'has_availability_issue': availability_issue,
         })
 
+    # --- Compliance report: /api/roster/shifts/compliance/?date_from=...&date_to=...[&user=...] ---
+    @action(detail=False, methods=['get'])
+    def compliance(self, request):
+        """Rest, consecutive-day and weekly-hour violations in a date range."""
+        from datetime import date as date_cls
+        try:
+            date_from = date_cls.fromisoformat(request.query_params.get('date_from', ''))
+            date_to = date_cls.fromisoformat(request.query_params.get('date_to', ''))
+        except ValueError:
+            return Response({'error': 'date_from and date_to required (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if date_to < date_from or (date_to - date_from).days > 366:
+            return Response({'error': 'date_to must be on or after date_from and within a year'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_ids = None
+        if self._is_lpo():
+            user_ids = [request.user.pk]
+        elif request.query_params.get('user'):
+            user_ids = [request.query_params['user']]
+
+        violations = compliance.evaluate(date_from, date_to, user_ids)
+        return Response({
+            'date_from': str(date_from),
+            'date_to': str(date_to),
+            'rules': {
+                'min_rest_hours': settings.ROSTER_MIN_REST_HOURS,
+                'max_consecutive_days': settings.ROSTER_MAX_CONSECUTIVE_DAYS,
+                'max_weekly_hours': settings.ROSTER_MAX_WEEKLY_HOURS,
+            },
+            'count': len(violations),
+            'violations': violations,
+        })
+
+    # --- Coverage heatmap: /api/roster/shifts/coverage/?date_from=...&date_to=...[&branch=...] ---
+    @action(detail=False, methods=['get'])
+    def coverage(self, request):
+        """
+        Guards on shift per branch and hour (see ``roster.coverage``), at most
+        62 days at a time. Honours ``If-None-Match``.
+        """
+        from datetime import date as date_cls
+        if self._is_lpo():
+            return Response({'error': 'Only managers can view coverage.'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            date_from = date_cls.fromisoformat(request.query_params.get('date_from', ''))
+            date_to = date_cls.fromisoformat(request.query_params.get('date_to', ''))
+            branch_ids = [int(b) for b in request.query_params.getlist('branch') if b]
+        except ValueError:
+            return Response(
+                {'error': 'date_from and date_to required (YYYY-MM-DD); branch must be a number'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if date_to < date_from or (date_to - date_from).days > 61:
+            return Response({'error': 'date_to must be on or after date_from and within 62 days'}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag, matrix = coverage.matrix(date_from, date_to, branch_ids)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(matrix, headers=headers)
+
     # --- Bulk create shifts: /api/roster/shifts/bulk_create/ ---
     @action(detail=False, methods=['post'])
     def bulk_create(self, request):
@@ -179,7 +426,7 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
             if serializer.is_valid():
                 shift = serializer.save()
                 created.append(serializer.data)
-                _notify(
+                notify(
                     shift.user, 'shift_assigned',
                     'New Shift Assigned',
                     f'You have been assigned a shift on {shift.date} '
@@ -195,7 +442,11 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
     # --- Copy week: /api/roster/shifts/copy_week/ ---
     @action(detail=False, methods=['post'])
     def copy_week(self, request):
-        """Copy all shifts from source_week_start to target_week_start."""
+        """
+        Copy all shifts from source_week_start to target_week_start. Copies
+        that would overlap a shift, fall on approved leave or break a
+        compliance rule are skipped and listed in ``conflicts``.
+        """
         from datetime import date as date_cls
         source = request.data.get('source_week_start')  # YYYY-MM-DD (Monday)
         target = request.data.get('target_week_start')
@@ -213,29 +464,136 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
         source_shifts = RosterShift.objects.filter(
             date__gte=source_date,
             date__lt=source_date + timedelta(days=7),
-            status__in=('scheduled', 'confirmed'),
+            status__in=ACTIVE_STATUSES,
+        ).order_by('date', 'start_time', 'pk')
+
+        rows = [
+            RosterShift(
+                user_id=s.user_id, branch_id=s.branch_id, template_id=s.template_id,
+                date=s.date + delta, start_time=s.start_time, end_time=s.end_time,
+                break_duration_minutes=s.break_duration_minutes, hourly_rate=s.hourly_rate,
+                status='scheduled', notes=f'Copied from {s.date}',
+            )
+            for s in source_shifts
+        ]
+        clear, conflicts = generation.find_conflicts(rows, target_date, target_date + timedelta(days=6))
+        generation.create(clear, request.user)
+
+        return Response({
+            'created': len(clear),
+            'conflicts': [
+                {'user': r.user_id, 'date': r.date, 'start_time': r.start_time, 'reason': reason}
+                for r, reason in conflicts
+            ],
+        }, status=status.HTTP_201_CREATED if clear else status.HTTP_200_OK)
+
+    # --- Generate from templates: /api/roster/shifts/generate/ ---
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """
+        Expand templates over a date range for the given users and weekdays
+        (``rules: [{template, weekdays, users}]``) and create the shifts in
+        one insert. Conflicting rows are skipped, or with
+        ``on_conflict: "abort"`` nothing is created. ``dry_run`` previews.
+        Each user gets one notification for everything assigned to them.
+        """
+        if self._is_lpo():
+            return Response({'error': 'Only managers can generate shifts.'}, status=status.HTTP_403_FORBIDDEN)
+
+        params = GenerateShiftsSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        date_from, date_to = data['date_from'], data['date_to']
+
+        rows = generation.expand(
+            [(r['template'], r['weekdays'], [u.pk for u in r['users']]) for r in data['rules']],
+            date_from, date_to,
         )
+        clear, conflicts = generation.find_conflicts(rows, date_from, date_to)
+        result = {
+            'requested': len(rows),
+            'created': 0,
+            'conflicts': [
+                {'user': r.user_id, 'template': r.template_id, 'date': r.date, 'reason': reason}
+                for r, reason in conflicts
+            ],
+        }
+        if data['dry_run']:
+            return Response(result)
+        if conflicts and data['on_conflict'] == 'abort':
+            return Response({'error': f'{len(conflicts)} shift(s) conflict; nothing was created.', **result},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        per_user = {}
+        for r in clear:
+            per_user.setdefault(r.user_id, []).append(r)
+        with transaction.atomic():
+            generation.create(clear, request.user)
+            send_notifications([
+                n
+                for user_id, shifts in per_user.items()
+                for n in build_notifications(
+                    user_id, 'shift_assigned',
+                    'New Shifts Assigned',
+                    f'You have been assigned {len(shifts)} shift(s) between '
+                    f'{shifts[0].date} and {shifts[-1].date}. Check your calendar for details.',
+                )
+            ])
+        result['created'] = len(clear)
+        return Response(result, status=status.HTTP_201_CREATED if clear else status.HTTP_200_OK)
 
-        created = []
-        for s in source_shifts:
-            new_shift = RosterShift.objects.create(
-                user=s.user,
-                branch=s.branch,
-                template=s.template,
-                date=s.date + delta,
-                start_time=s.start_time,
-                end_time=s.end_time,
-                status='scheduled',
-                notes=f'Copied from {s.date}',
-                created_by=request.user,
-            )
-            created.append(new_shift.pk)
+    # --- Auto-assign: /api/roster/shifts/auto_assign/ ---
+    @action(detail=False, methods=['post'])
+    def auto_assign(self, request):
+        """
+        Propose LPO assignments for open template slots in a date range.
+        Nothing is saved — the draft is returned for review and can be
+        posted to ``bulk_create`` as-is.
+        """
+        from datetime import date as date_cls
+        user = request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO':
+            return Response({'error': 'Only managers can auto-assign shifts.'}, status=status.HTTP_403_FORBIDDEN)
 
-        return Response({'created': len(created)}, status=status.HTTP_201_CREATED)
+        try:
+            date_from = date_cls.fromisoformat(request.data.get('date_from', ''))
+            date_to = date_cls.fromisoformat(request.data.get('date_to', ''))
+        except ValueError:
+            return Response({'error': 'date_from and date_to required (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if date_to < date_from or (date_to - date_from).days > 62:
+            return Response({'error': 'date_to must be on or after date_from and within 62 days'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            target_hours = float(request.data.get('target_weekly_hours', settings.ROSTER_TARGET_WEEKLY_HOURS))
+            headcount = int(request.data.get('headcount', 1))
+        except (TypeError, ValueError):
+            return Response({'error': 'target_weekly_hours and headcount must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        started = time.monotonic()
+        result = RosterSolver(
+            date_from, date_to,
+            branch_ids=request.data.get('branches') or None,
+            template_ids=request.data.get('templates') or None,
+            target_weekly_hours=target_hours,
+            headcount=headcount,
+        ).solve()
+
+        return Response({
+            'date_from': str(date_from),
+            'date_to': str(date_to),
+            'assignments': result['assignments'],
+            'unfilled': result['unfilled'],
+            'stats': {
+                'slots': len(result['assignments']) + len(result['unfilled']),
+                'filled': len(result['assignments']),
+                'users': len({a['user'] for a in result['assignments']}),
+                'elapsed_ms': round((time.monotonic() - started) * 1000),
+            },
+        })
 
     def perform_create(self, serializer):
         shift = serializer.save()
-        _notify(
+        notify(
             shift.user, 'shift_assigned',
             'New Shift Assigned',
             f'You have been assigned a shift on {shift.date} '
@@ -245,7 +603,7 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
 
     def perform_update(self, serializer):
         shift = serializer.save()
-        _notify(
+        notify(
             shift.user, 'shift_updated',
             'Shift Updated',
             f'Your shift on {shift.date} at {shift.branch.name} has been updated.',
@@ -266,41 +624,36 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)
 
         end = start + timedelta(days=6)
-        shifts = self.get_queryset().filter(
+        rows = self._scoped_queryset().filter(
             date__gte=start, date__lte=end,
-            status__in=('scheduled', 'confirmed', 'completed'),
-        )
+            status__in=LABOUR_STATUSES,
+        ).labour_summary(*LABOUR_DIMENSIONS['user'], 'date')
 
         user_summary = {}
-        for s in shifts:
-            uid = s.user_id
+        for row in rows:
+            uid = row['user']
             if uid not in user_summary:
                 user_summary[uid] = {
                     'user_id': uid,
-                    'user_name': f'{s.user.first_name} {s.user.last_name}'.strip() or s.user.username,
+                    'user_name': _labour_user_name(row),
                     'total_hours': 0,
-                    'total_pay': 0,
+                    'total_pay': Decimal('0'),
                     'shift_count': 0,
                     'daily': {},
                 }
             entry = user_summary[uid]
-            entry['total_hours'] += s.total_hours
-            entry['total_pay'] += s.total_pay
-            entry['shift_count'] += 1
-            day_str = str(s.date)
-            if day_str not in entry['daily']:
-                entry['daily'][day_str] = {'hours': 0, 'pay': 0, 'shifts': 0}
-            entry['daily'][day_str]['hours'] += s.total_hours
-            entry['daily'][day_str]['pay'] += s.total_pay
-            entry['daily'][day_str]['shifts'] += 1
-
-        # Round totals
+            hours = _minutes_to_hours(row['net_minutes'])
+            entry['total_hours'] += hours
+            entry['total_pay'] += row['pay']
+            entry['shift_count'] += row['shift_count']
+            entry['daily'][str(row['date'])] = {
+                'hours': hours,
+                'pay': row['pay'],
+                'shifts': row['shift_count'],
+            }
+
         for u in user_summary.values():
             u['total_hours'] = round(u['total_hours'], 2)
-            u['total_pay'] = round(u['total_pay'], 2)
-            for d in u['daily'].values():
-                d['hours'] = round(d['hours'], 2)
-                d['pay'] = round(d['pay'], 2)
 
         return Response({
             'week_start': str(start),
@@ -308,6 +661,242 @@ class RosterShiftViewSet(viewsets.ModelViewSet):
             'users': list(user_summary.values()),
         })
 
+    # --- Labour summary: /api/roster/shifts/labour_summary/?date_from=...&date_to=...&group_by=branch,week ---
+    @action(detail=False, methods=['get'])
+    def labour_summary(self, request):
+        """
+        Return net hours, pay and shift counts aggregated in SQL over any
+        date range, grouped by any of: user, branch, template, status,
+        date, week, month. Honours the regular shift filters.
+        """
+        if not request.query_params.get('date_from') or not request.query_params.get('date_to'):
+            return Response({'error': 'date_from and date_to parameters required (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = [g.strip() for g in request.query_params.get('group_by', 'user').split(',') if g.strip()]
+        unknown = [g for g in group_by if g not in LABOUR_DIMENSIONS and g not in LABOUR_PERIODS]
+        if unknown:
+            return Response(
+                {'error': f'Unknown group_by: {", ".join(unknown)}. '
+                          f'Choose from {", ".join([*LABOUR_DIMENSIONS, *LABOUR_PERIODS])}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        qs = self.filter_queryset(self._scoped_queryset())
+        if 'status' not in request.query_params:
+            qs = qs.filter(status__in=LABOUR_STATUSES)
+
+        fields = [f for g in group_by if g in LABOUR_DIMENSIONS for f in LABOUR_DIMENSIONS[g]]
+        periods = {g: LABOUR_PERIODS[g]() for g in group_by if g in LABOUR_PERIODS}
+
+        results = []
+        total_minutes, total_pay, total_shifts = 0, Decimal('0'), 0
+        for row in qs.labour_summary(*fields, **periods):
+            entry = {}
+            if 'user' in group_by:
+                entry['user_id'] = row['user']
+                entry['user_name'] = _labour_user_name(row)
+            if 'branch' in group_by:
+                entry['branch_id'] = row['branch']
+                entry['branch_name'] = row['branch__name']
+            if 'template' in group_by:
+                entry['template_id'] = row['template']
+                entry['template_name'] = row['template__name'] or ''
+            for key in ('status', 'date', 'week', 'month'):
+                if key in group_by:
+                    entry[key] = str(row[key])
+            entry['hours'] = _minutes_to_hours(row['net_minutes'])
+            entry['pay'] = row['pay']
+            entry['shift_count'] = row['shift_count']
+            results.append(entry)
+
+            total_minutes += row['net_minutes'] or 0
+            total_pay += row['pay'] or 0
+            total_shifts += row['shift_count']
+
+        return Response({
+            'date_from': request.query_params['date_from'],
+            'date_to': request.query_params['date_to'],
+            'group_by': group_by,
+            'totals': {
+                'hours': _minutes_to_hours(total_minutes),
+                'pay': total_pay,
+                'shift_count': total_shifts,
+            },
+            'results': results,
+        })
+
+
+# ===================================================================
+# Recurring Shift ViewSet
+# ===================================================================
+
+class RecurringShiftViewSet(viewsets.ModelViewSet):
+    serializer_class = RecurringShiftSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['user', 'branch', 'template', 'is_active']
+    search_fields = ['user__first_name', 'user__last_name', 'branch__name']
+    ordering_fields = ['start_date', 'user', 'branch', 'start_time']
+
+    def get_queryset(self):
+        qs = RecurringShift.objects.select_related('user', 'branch', 'template')
+
+        # LPO users only see their own patterns
+        user = self.request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO':
+            qs = qs.filter(user=user)
+        return qs
+
+    def check_permissions(self, request):
+        super().check_permissions(request)
+        user = request.user
+        if request.method not in permissions.SAFE_METHODS and hasattr(user, 'profile') and user.profile.role == 'LPO':
+            self.permission_denied(request, message='Only managers can change recurring shifts.')
+
+    def perform_create(self, serializer):
+        pattern = serializer.save()
+        recurrence.materialize(RecurringShift.objects.filter(pk=pattern.pk))
+        pattern.refresh_from_db()
+        notify(
+            pattern.user, 'shift_assigned',
+            'Recurring Shift Assigned',
+            f'You have a recurring shift at {pattern.branch.name}: {pattern}. '
+            f'Starting {pattern.start_date}.',
+        )
+
+    def perform_update(self, serializer):
+        pattern = serializer.save()
+        recurrence.rematerialize(pattern)
+        pattern.refresh_from_db()
+        notify(
+            pattern.user, 'shift_updated',
+            'Recurring Shift Updated',
+            f'Your recurring shift at {pattern.branch.name} has changed: {pattern}.',
+        )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            recurrence.clear_future(instance)
+            instance.delete()
+
+    # --- Materialise now: /api/roster/recurring-shifts/materialize/ ---
+    @action(detail=False, methods=['post'])
+    def materialize(self, request):
+        """Create concrete shifts for every pattern up to the rolling horizon."""
+        created, skipped = recurrence.materialize()
+        return Response({'created': created, 'skipped': skipped, 'horizon': recurrence.horizon_end()})
+
+
+# ===================================================================
+# Roster Draft ViewSets
+# ===================================================================
+
+class _ManagersOnly:
+    """Drafts are invisible to LPOs until published."""
+    denied_message = 'Only managers can edit draft rosters.'
+
+    def check_permissions(self, request):
+        super().check_permissions(request)
+        user = request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO':
+            self.permission_denied(request, message=self.denied_message)
+
+
+class RosterDraftViewSet(_ManagersOnly, viewsets.ModelViewSet):
+    serializer_class = RosterDraftSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['status', 'branch']
+    ordering_fields = ['created_at', 'date_from']
+
+    def get_queryset(self):
+        return RosterDraft.objects.select_related('branch', 'created_by').annotate(
+            shift_count=Count('shifts', filter=Q(shifts__is_removed=False)),
+        )
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            draft = serializer.save()
+            draft.shift_count = drafts.open_draft(draft)
+
+    # --- Preview: /api/roster/drafts/{id}/changes/ ---
+    @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
+        """Per-user diff against the published roster, without applying it."""
+        draft = self.get_object()
+        changes, stale = drafts.diff(draft)
+        users = User.objects.in_bulk(changes.keys())
+        return Response({
+            'users': [
+                {
+                    'user_id': user_id,
+                    'user_name': users[user_id].get_full_name() or users[user_id].username,
+                    'created': DraftShiftSerializer(change['created'], many=True).data,
+                    'updated': DraftShiftSerializer([row for row, _ in change['updated']], many=True).data,
+                    'cancelled': [s.pk for s in change['cancelled']],
+                }
+                for user_id, change in changes.items()
+            ],
+            'stale': [row.pk for row in stale],
+        })
+
+    # --- Publish: /api/roster/drafts/{id}/publish/ ---
+    @action(detail=True, methods=['post'])
+    def publish(self, request, pk=None):
+        """
+        Apply the draft in one transaction and notify each affected user
+        once. Pass ``force: true`` to skip shifts changed since the draft
+        was opened instead of refusing.
+        """
+        draft = self.get_object()
+        force = str(request.data.get('force', '')).lower() in ('1', 'true')
+        try:
+            result = drafts.publish(draft, request.user, force=force)
+        except ValidationError as exc:
+            return Response({'error': 'Draft cannot be published.', 'conflicts': exc.messages},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(result)
+
+    # --- Discard: /api/roster/drafts/{id}/discard/ ---
+    @action(detail=True, methods=['post'])
+    def discard(self, request, pk=None):
+        draft = self.get_object()
+        if draft.status != 'open':
+            return Response({'error': f'Draft is already {draft.status}.'}, status=status.HTTP_400_BAD_REQUEST)
+        draft.status = 'discarded'
+        draft.save(update_fields=['status', 'updated_at'])
+        return Response(RosterDraftSerializer(draft).data)
+
+
+class DraftShiftViewSet(_ManagersOnly, viewsets.ModelViewSet):
+    serializer_class = DraftShiftSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['draft', 'user', 'branch', 'date', 'is_removed']
+    ordering_fields = ['date', 'start_time', 'user']
+
+    def get_queryset(self):
+        return DraftShift.objects.select_related('draft', 'user', 'branch', 'template')
+
+    def destroy(self, request, *args, **kwargs):
+        """New rows are deleted; rows copied from the roster are marked removed."""
+        row = self.get_object()
+        if row.draft.status != 'open':
+            return Response({'error': f'Draft is {row.draft.status}.'}, status=status.HTTP_400_BAD_REQUEST)
+        if row.source_shift_id is None:
+            row.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        row.is_removed = True
+        row.save(update_fields=['is_removed'])
+        return Response(DraftShiftSerializer(row).data)
+
+    # --- Undo a removal: /api/roster/draft-shifts/{id}/restore/ ---
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        row = self.get_object()
+        if row.draft.status != 'open':
+            return Response({'error': f'Draft is {row.draft.status}.'}, status=status.HTTP_400_BAD_REQUEST)
+        row.is_removed = False
+        row.save(update_fields=['is_removed'])
+        return Response(DraftShiftSerializer(row).data)
+
 
 # ===================================================================
 # Availability ViewSet
@@ -329,55 +918,58 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
     # --- LPO availability matrix for a week ---
     @action(detail=False, methods=['get'])
     def lpo_matrix(self, request):
-        """Return LPO users availability matrix for a given week."""
-        from datetime import date as date_cls, timedelta as td
-        from profiles.models import Profile
+        """
+        Return the LPO availability matrix for a week in columnar form
+        (see ``roster.availability_matrix``). Honours ``If-None-Match``.
+        """
+        from datetime import date as date_cls
 
         week_start_str = request.query_params.get('week_start')
         if not week_start_str:
-            today = date_cls.today()
-            week_start = today - td(days=today.weekday())
+            week_start = availability_matrix.week_of(date_cls.today())
         else:
             try:
-                week_start = date_cls.fromisoformat(week_start_str)
+                # Cache versions are kept per Monday, so any other day maps to its week
+                week_start = availability_matrix.week_of(date_cls.fromisoformat(week_start_str))
             except ValueError:
                 return Response({'error': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)
 
-        week_end = week_start + td(days=6)
-        dates = [week_start + td(days=i) for i in range(7)]
-
-        lpo_profiles = Profile.objects.filter(
-            role='LPO', status='Active',
-        ).select_related('user').order_by('user__first_name', 'user__last_name')
-
-        avails = Availability.objects.filter(
-            date__gte=week_start, date__lte=week_end,
-            user__profile__role='LPO',
-        ).select_related('user')
-
-        avail_map = {}
-        for a in avails:
-            avail_map.setdefault(a.user_id, {})[str(a.date)] = AvailabilitySerializer(a).data
-
-        users_data = []
-        for profile in lpo_profiles:
-            user = profile.user
-            user_avails = avail_map.get(user.id, {})
-            days = {}
-            for d in dates:
-                d_str = str(d)
-                days[d_str] = user_avails.get(d_str, None)
-            users_data.append({
-                'user_id': user.id,
-                'user_name': f'{user.first_name} {user.last_name}'.strip() or user.username,
-                'days': days,
-            })
+        etag, matrix = availability_matrix.matrix(week_start)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(matrix, headers=headers)
+
+    # --- Who can work: /api/roster/availability/available/?date=...&start_time=...&end_time=...&branch=... ---
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """Return active LPOs free for a time window, best candidates first."""
+        from datetime import date as date_cls, time as time_cls
+        try:
+            date_val = date_cls.fromisoformat(request.query_params.get('date', ''))
+            start_time = time_cls.fromisoformat(request.query_params.get('start_time', ''))
+            end_time = time_cls.fromisoformat(request.query_params.get('end_time', ''))
+        except ValueError:
+            return Response(
+                {'error': 'date (YYYY-MM-DD), start_time and end_time (HH:MM) required'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
 
+        candidates = availability_index.available_users(
+            date_val, start_time, end_time,
+            branch_id=request.query_params.get('branch') or None,
+        )
         return Response({
-            'week_start': str(week_start),
-            'week_end': str(week_end),
-            'dates': [str(d) for d in dates],
-            'users': users_data,
+            'date': str(date_val),
+            'start_time': start_time.strftime('%H:%M'),
+            'end_time': end_time.strftime('%H:%M'),
+            'count': len(candidates),
+            'users': candidates[:limit],
         })
 
     # --- Quick-set availability for a user + date ---
@@ -443,6 +1035,84 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
         deleted, _ = Availability.objects.filter(user_id=user_id, date=date_val).delete()
         return Response({'deleted': deleted})
 
+    def _bulk_params(self, request):
+        """Validated bulk payload, or an error response (LPOs may only edit themselves)."""
+        params = BulkAvailabilitySerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        user = request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO' and any(
+            u.pk != user.pk for u in params.validated_data['users']
+        ):
+            return params, Response(
+                {'error': 'LPO users can only set their own availability.'}, status=status.HTTP_403_FORBIDDEN,
+            )
+        return params, None
+
+    # --- Bulk set: /api/roster/availability/bulk_set/ ---
+    @action(detail=False, methods=['post'])
+    def bulk_set(self, request):
+        """
+        Set one preset for many users over a date range (optionally only
+        some weekdays) with a single INSERT … ON CONFLICT (user, date) upsert.
+        """
+        params, error = self._bulk_params(request)
+        if error:
+            return error
+        data = params.validated_data
+        start_time, end_time = params.resolve_times()
+        user_ids = [u.pk for u in data['users']]
+        dates = params.dates()
+
+        rows = [
+            Availability(
+                user_id=user_id, date=d, preset=data['preset'],
+                start_time=start_time, end_time=end_time,
+                is_available=data['is_available'], notes=data['notes'],
+            )
+            for user_id in user_ids
+            for d in dates
+        ]
+        with transaction.atomic():
+            Availability.objects.bulk_create(
+                rows, batch_size=1000,
+                update_conflicts=True, unique_fields=['user', 'date'],
+                update_fields=['preset', 'start_time', 'end_time', 'is_available', 'notes', 'updated_at'],
+            )
+            # The upsert bypasses the receivers; rebuild the whole range once
+            if dates:
+                availability_index.rebuild_range(dates[0], dates[-1] + timedelta(days=1), user_ids)
+                availability_matrix.touch(dates)
+
+        return Response({'saved': len(rows), 'users': len(user_ids), 'dates': len(dates)})
+
+    # --- Bulk clear: /api/roster/availability/bulk_clear/ ---
+    @action(detail=False, methods=['post'])
+    def bulk_clear(self, request):
+        """Remove availability for many users over a date range in one DELETE."""
+        params, error = self._bulk_params(request)
+        if error:
+            return error
+        user_ids = [u.pk for u in params.validated_data['users']]
+        dates = params.dates()
+
+        with transaction.atomic():
+            # Lock the rows first so the tombstones cover exactly what is deleted
+            rows = list(
+                Availability.objects.select_for_update()
+                .filter(user_id__in=user_ids, date__in=dates)
+                .values_list('pk', 'user_id')
+            )
+            deleted = 0
+            if rows:
+                # Per-row receivers are skipped; sync, index and matrix are refreshed once below
+                with signals.bulk_changes():
+                    deleted = Availability.objects.filter(pk__in=[pk for pk, _ in rows]).delete()[0]
+                sync.record('availability', rows)
+                availability_index.rebuild_range(dates[0], dates[-1] + timedelta(days=1), user_ids)
+                availability_matrix.touch(dates)
+
+        return Response({'deleted': deleted})
+
 
 # ===================================================================
 # PTO Request ViewSet
@@ -465,61 +1135,289 @@ class PTORequestViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         pto = serializer.save()
         # Notify admins/managers
-        from profiles.models import Profile
-        admins = User.objects.filter(
+        admin_ids = User.objects.filter(
             profile__role='Admin',
-        ).exclude(pk=pto.user.pk)
-        for admin in admins:
-            _notify(
-                admin, 'pto_request',
-                'New PTO Request',
-                f'{pto.user.get_full_name()} requested {pto.get_leave_type_display()} '
-                f'from {pto.start_date} to {pto.end_date}.',
-            )
+        ).exclude(pk=pto.user.pk).values_list('pk', flat=True)
+        message = (
+            f'{pto.user.get_full_name()} requested {pto.get_leave_type_display()} '
+            f'from {pto.start_date} to {pto.end_date}.'
+        )
+        send_notifications([
+            row
+            for admin_id in admin_ids
+            for row in build_notifications(admin_id, 'pto_request', 'New PTO Request', message)
+        ])
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            pto = serializer.save()
+            leave.sync_pto(pto, self.request.user)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Give back any leave taken before the request disappears
+            instance.status = 'cancelled'
+            leave.sync_pto(instance, self.request.user)
+            instance.delete()
 
     # --- Approve/Reject PTO ---
     @action(detail=True, methods=['post'])
     def review(self, request, pk=None):
-        """Approve or reject a PTO request."""
-        pto = self.get_object()
+        """
+        Approve or reject a PTO request. Approval deducts the leave from the
+        user's balance and cancels their conflicting shifts in one UPDATE;
+        the response lists them in ``cancelled_shifts``.
+        """
         new_status = request.data.get('status')  # 'approved' or 'rejected'
         if new_status not in ('approved', 'rejected'):
             return Response({'error': 'status must be approved or rejected'}, status=status.HTTP_400_BAD_REQUEST)
 
-        pto.status = new_status
-        pto.reviewed_by = request.user
-        pto.reviewed_at = timezone.now()
-        pto.notes = request.data.get('notes', pto.notes)
-        pto.save()
-
-        ntype = 'pto_approved' if new_status == 'approved' else 'pto_rejected'
-        _notify(
-            pto.user, ntype,
-            f'PTO {new_status.title()}',
-            f'Your {pto.get_leave_type_display()} request ({pto.start_date} to {pto.end_date}) '
-            f'has been {new_status}.',
-        )
-
-        # If approved, cancel any conflicting shifts
-        if new_status == 'approved':
-            conflicting = RosterShift.objects.filter(
-                user=pto.user,
-                date__gte=pto.start_date,
-                date__lte=pto.end_date,
-                status__in=('scheduled', 'confirmed'),
+        with transaction.atomic():
+            pto = self.get_object()
+            pto = PTORequest.objects.select_for_update(of=('self',)).select_related('user').get(pk=pto.pk)
+            pto.status = new_status
+            pto.reviewed_by = request.user
+            pto.reviewed_at = timezone.now()
+            pto.notes = request.data.get('notes', pto.notes)
+            pto.save()
+            leave.sync_pto(pto, request.user)
+
+            ntype = 'pto_approved' if new_status == 'approved' else 'pto_rejected'
+            notifications = build_notifications(
+                pto.user_id, ntype,
+                f'PTO {new_status.title()}',
+                f'Your {pto.get_leave_type_display()} request ({pto.start_date} to {pto.end_date}) '
+                f'has been {new_status}.',
             )
-            for shift in conflicting:
-                shift.status = 'cancelled'
-                shift.notes = f'Auto-cancelled: PTO approved ({pto.get_leave_type_display()})'
-                shift.save()
-                _notify(
-                    shift.user, 'shift_cancelled',
-                    'Shift Cancelled',
-                    f'Your shift on {shift.date} at {shift.branch.name} was cancelled due to approved leave.',
-                    shift=shift,
+
+            # If approved, cancel any conflicting shifts
+            cancelled = []
+            if new_status == 'approved':
+                cancelled = _cancel_shifts(
+                    RosterShift.objects.filter(
+                        user_id=pto.user_id,
+                        date__gte=pto.start_date,
+                        date__lte=pto.end_date,
+                        status__in=ACTIVE_STATUSES,
+                    ),
+                    f'Auto-cancelled: PTO approved ({pto.get_leave_type_display()})',
                 )
+                for shift in cancelled:
+                    notifications += build_notifications(
+                        shift['user_id'], 'shift_cancelled',
+                        'Shift Cancelled',
+                        f'Your shift on {shift["date"]} at {shift["branch_name"]} was cancelled due to approved leave.',
+                        shift['id'],
+                    )
 
-        return Response(PTORequestSerializer(pto).data)
+            send_notifications(notifications)
+
+        return Response({
+            **PTORequestSerializer(pto).data,
+            'cancelled_shifts': cancelled,
+        })
+
+    # --- Bulk approve/reject: /api/roster/pto/bulk_review/ ---
+    @action(detail=False, methods=['post'])
+    def bulk_review(self, request):
+        """
+        Approve or reject many pending PTO requests in one transaction. The
+        rows are locked and updated, their leave posted and conflicting
+        shifts cancelled set-wise, and all notifications inserted together.
+        Requests that are missing or no longer pending come back in ``skipped``.
+        """
+        user = request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO':
+            return Response({'error': 'Only managers can review leave requests.'}, status=status.HTTP_403_FORBIDDEN)
+        params = BulkReviewSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        ids, new_status = set(params.validated_data['ids']), params.validated_data['status']
+
+        with transaction.atomic():
+            ptos = list(PTORequest.objects.select_for_update(of=('self',)).select_related('user').filter(
+                pk__in=ids, status='pending',
+            ).order_by('pk'))
+            now = timezone.now()
+            changes = {'status': new_status, 'reviewed_by': user, 'reviewed_at': now, 'updated_at': now}
+            if 'notes' in params.validated_data:
+                changes['notes'] = params.validated_data['notes']
+            PTORequest.objects.filter(pk__in=[pto.pk for pto in ptos]).update(**changes)
+            for pto in ptos:
+                for field, value in changes.items():
+                    setattr(pto, field, value)
+            leave.sync_ptos(ptos, user)
+
+            ntype = 'pto_approved' if new_status == 'approved' else 'pto_rejected'
+            notifications = [
+                n
+                for pto in ptos
+                for n in build_notifications(
+                    pto.user_id, ntype,
+                    f'PTO {new_status.title()}',
+                    f'Your {pto.get_leave_type_display()} request ({pto.start_date} to {pto.end_date}) '
+                    f'has been {new_status}.',
+                )
+            ]
+
+            cancelled = []
+            if new_status == 'approved' and ptos:
+                # The approval was one UPDATE, so the leave goes into the index here
+                availability_index.rebuild(
+                    {pto.user_id for pto in ptos},
+                    {
+                        pto.start_date + timedelta(days=i)
+                        for pto in ptos for i in range((pto.end_date - pto.start_date).days + 2)
+                    },
+                )
+                # One UPDATE per leave type, since the cancellation note names it
+                by_type = {}
+                for pto in ptos:
+                    by_type.setdefault(pto.leave_type, []).append(pto)
+                for group in by_type.values():
+                    overlaps = Q()
+                    for pto in group:
+                        overlaps |= Q(user_id=pto.user_id, date__gte=pto.start_date, date__lte=pto.end_date)
+                    cancelled += _cancel_shifts(
+                        RosterShift.objects.filter(overlaps, status__in=ACTIVE_STATUSES),
+                        f'Auto-cancelled: PTO approved ({group[0].get_leave_type_display()})',
+                    )
+                for shift in cancelled:
+                    notifications += build_notifications(
+                        shift['user_id'], 'shift_cancelled',
+                        'Shift Cancelled',
+                        f'Your shift on {shift["date"]} at {shift["branch_name"]} was cancelled due to approved leave.',
+                        shift['id'],
+                    )
+
+            send_notifications(notifications)
+
+        return Response({
+            'reviewed': PTORequestSerializer(ptos, many=True).data,
+            'skipped': sorted(ids - {pto.pk for pto in ptos}),
+            'cancelled_shifts': cancelled,
+        })
+
+
+# ===================================================================
+# Leave Balance / Ledger ViewSets
+# ===================================================================
+
+class LeaveBalanceViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = LeaveBalanceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['user', 'leave_type']
+    ordering_fields = ['hours', 'updated_at']
+
+    def get_queryset(self):
+        qs = LeaveBalance.objects.select_related('user')
+        user = self.request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO':
+            qs = qs.filter(user=user)
+        return qs
+
+    # --- Manual correction: /api/roster/leave-balances/adjust/ ---
+    @action(detail=False, methods=['post'])
+    def adjust(self, request):
+        """Post a signed adjustment (e.g. opening balance, payroll correction)."""
+        user = request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO':
+            return Response({'error': 'Only managers can adjust leave balances.'}, status=status.HTTP_403_FORBIDDEN)
+        serializer = LeaveAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        leave.post([LeaveLedgerEntry(
+            user=data['user'], leave_type=data['leave_type'], kind='adjustment',
+            hours=data['hours'], note=data['note'], created_by=user,
+        )])
+        balance = LeaveBalance.objects.select_related('user').get(user=data['user'], leave_type=data['leave_type'])
+        return Response(LeaveBalanceSerializer(balance).data, status=status.HTTP_201_CREATED)
+
+
+class LeaveLedgerEntryViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = LeaveLedgerEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['user', 'leave_type', 'kind', 'pto_request', 'period_start']
+    ordering_fields = ['created_at', 'period_start']
+
+    def get_queryset(self):
+        qs = LeaveLedgerEntry.objects.all()
+        user = self.request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO':
+            qs = qs.filter(user=user)
+        return qs
+
+
+# ===================================================================
+# Payroll ViewSet
+# ===================================================================
+
+class PayPeriodViewSet(_ManagersOnly, viewsets.ModelViewSet):
+    """Pay periods are created and computed here; finalised ones are read-only."""
+    serializer_class = PayPeriodSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    denied_message = 'Only managers can run payroll.'
+    filterset_fields = ['status', 'source']
+    ordering_fields = ['start_date', 'created_at']
+
+    def get_queryset(self):
+        return PayPeriod.objects.annotate(line_count=Count('lines'))
+
+    def perform_create(self, serializer):
+        period, _ = payroll.compute(serializer.save(created_by=self.request.user))
+        period.line_count = period.lines.count()
+        serializer.instance = period
+
+    def retrieve(self, request, *args, **kwargs):
+        period = self.get_object()
+        return Response({**self.get_serializer(period).data, 'stale': payroll.is_stale(period)})
+
+    def destroy(self, request, *args, **kwargs):
+        if self.get_object().status != 'draft':
+            return Response({'error': 'A finalised pay period cannot be deleted.'}, status=status.HTTP_409_CONFLICT)
+        return super().destroy(request, *args, **kwargs)
+
+    # --- Recompute a draft: /api/roster/pay-periods/{id}/compute/ ---
+    @action(detail=True, methods=['post'])
+    def compute(self, request, pk=None):
+        """Recompute the lines if the shifts, attendance or rules changed (``force: true`` always)."""
+        force = str(request.data.get('force', '')).lower() in ('1', 'true')
+        try:
+            period, recomputed = payroll.compute(self.get_object(), force=force)
+        except ValidationError as exc:
+            return Response({'error': exc.messages[0]}, status=status.HTTP_409_CONFLICT)
+        period.line_count = period.lines.count()
+        return Response({**self.get_serializer(period).data, 'recomputed': recomputed})
+
+    # --- Freeze: /api/roster/pay-periods/{id}/finalise/ ---
+    @action(detail=True, methods=['post'])
+    def finalise(self, request, pk=None):
+        try:
+            period = payroll.finalise(self.get_object(), request.user)
+        except ValidationError as exc:
+            return Response({'error': exc.messages[0]}, status=status.HTTP_409_CONFLICT)
+        period.line_count = period.lines.count()
+        return Response(self.get_serializer(period).data)
+
+    # --- Lines: /api/roster/pay-periods/{id}/lines/ ---
+    @action(detail=True, methods=['get'])
+    def lines(self, request, pk=None):
+        qs = PayrollLine.objects.filter(period=self.get_object()).select_related('user')
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            return self.get_paginated_response(PayrollLineSerializer(page, many=True).data)
+        return Response(PayrollLineSerializer(qs, many=True).data)
+
+    # --- CSV export: /api/roster/pay-periods/{id}/export/ ---
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """Stream the period's lines as CSV."""
+        period = self.get_object()
+        response = StreamingHttpResponse(payroll.export_csv(period), content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename="payroll-{period.start_date}-{period.end_date}-{period.source}.csv"'
+        )
+        return response
 
 
 # ===================================================================
@@ -544,45 +1442,236 @@ class DropRequestViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         drop = serializer.save()
         # Notify admins
-        from profiles.models import Profile
-        admins = User.objects.filter(profile__role='Admin').exclude(pk=drop.requested_by.pk)
-        for admin in admins:
-            _notify(
-                admin, 'drop_request',
-                'New Drop Request',
-                f'{drop.requested_by.get_full_name()} wants to drop their shift on '
-                f'{drop.shift.date} at {drop.shift.branch.name}.',
-                shift=drop.shift,
-            )
+        admin_ids = User.objects.filter(
+            profile__role='Admin',
+        ).exclude(pk=drop.requested_by.pk).values_list('pk', flat=True)
+        message = (
+            f'{drop.requested_by.get_full_name()} wants to drop their shift on '
+            f'{drop.shift.date} at {drop.shift.branch.name}.'
+        )
+        send_notifications([
+            row
+            for admin_id in admin_ids
+            for row in build_notifications(admin_id, 'drop_request', 'New Drop Request', message, drop.shift_id)
+        ])
 
     @action(detail=True, methods=['post'])
     def review(self, request, pk=None):
-        """Approve or reject a drop request."""
-        drop = self.get_object()
+        """
+        Approve or reject a drop request. Approving an upcoming shift cancels
+        it and opens it to ranked replacements (``open_shift`` in the response).
+        """
         new_status = request.data.get('status')
         if new_status not in ('approved', 'rejected'):
             return Response({'error': 'status must be approved or rejected'}, status=status.HTTP_400_BAD_REQUEST)
 
-        drop.status = new_status
-        drop.reviewed_by = request.user
-        drop.reviewed_at = timezone.now()
-        drop.save()
-
-        ntype = 'drop_approved' if new_status == 'approved' else 'drop_rejected'
-        _notify(
-            drop.requested_by, ntype,
-            f'Drop Request {new_status.title()}',
-            f'Your request to drop the shift on {drop.shift.date} '
-            f'at {drop.shift.branch.name} has been {new_status}.',
-            shift=drop.shift,
-        )
+        with transaction.atomic():
+            drop = self.get_object()
+            drop = DropRequest.objects.select_for_update(of=('self',)).select_related(
+                'shift', 'shift__branch', 'requested_by', 'reviewed_by',
+            ).get(pk=drop.pk)
+            drop.status = new_status
+            drop.reviewed_by = request.user
+            drop.reviewed_at = timezone.now()
+            drop.save()
+
+            ntype = 'drop_approved' if new_status == 'approved' else 'drop_rejected'
+            notifications = build_notifications(
+                drop.requested_by_id, ntype,
+                f'Drop Request {new_status.title()}',
+                f'Your request to drop the shift on {drop.shift.date} '
+                f'at {drop.shift.branch.name} has been {new_status}.',
+                drop.shift_id,
+            )
+
+            cancelled, open_shift = [], None
+            if new_status == 'approved':
+                cancelled = _cancel_shifts(
+                    RosterShift.objects.filter(pk=drop.shift_id),
+                    'Cancelled via approved drop request',
+                )
+                # Upcoming shifts go to the marketplace instead of being left uncovered
+                if cancelled and drop.shift.date >= timezone.localdate():
+                    open_shift = marketplace.open_from_shift(drop.shift, drop_request=drop)
+                    marketplace.send_offers(open_shift)
+                drop.shift.refresh_from_db()
+
+            send_notifications(notifications)
+
+        return Response({
+            **DropRequestSerializer(drop).data,
+            'cancelled_shifts': cancelled,
+            'open_shift': open_shift.pk if open_shift else None,
+        })
+
+    # --- Bulk approve/reject: /api/roster/drop-requests/bulk_review/ ---
+    @action(detail=False, methods=['post'])
+    def bulk_review(self, request):
+        """
+        Approve or reject many pending drop requests in one transaction.
+        Approved shifts are cancelled in one UPDATE; the upcoming ones become
+        open shifts, ranked and offered together. Requests that are missing
+        or no longer pending come back in ``skipped``.
+        """
+        user = request.user
+        if hasattr(user, 'profile') and user.profile.role == 'LPO':
+            return Response({'error': 'Only managers can review drop requests.'}, status=status.HTTP_403_FORBIDDEN)
+        params = BulkReviewSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        ids, new_status = set(params.validated_data['ids']), params.validated_data['status']
+
+        with transaction.atomic():
+            drops = list(DropRequest.objects.select_for_update(of=('self',)).select_related(
+                'shift', 'shift__branch', 'requested_by',
+            ).filter(pk__in=ids, status='pending').order_by('pk'))
+            now = timezone.now()
+            DropRequest.objects.filter(pk__in=[drop.pk for drop in drops]).update(
+                status=new_status, reviewed_by=user, reviewed_at=now,
+            )
+            for drop in drops:
+                drop.status, drop.reviewed_by, drop.reviewed_at = new_status, user, now
+
+            ntype = 'drop_approved' if new_status == 'approved' else 'drop_rejected'
+            notifications = [
+                n
+                for drop in drops
+                for n in build_notifications(
+                    drop.requested_by_id, ntype,
+                    f'Drop Request {new_status.title()}',
+                    f'Your request to drop the shift on {drop.shift.date} '
+                    f'at {drop.shift.branch.name} has been {new_status}.',
+                    drop.shift_id,
+                )
+            ]
+
+            cancelled, open_shifts = [], []
+            if new_status == 'approved' and drops:
+                note = 'Cancelled via approved drop request'
+                cancelled = _cancel_shifts(RosterShift.objects.filter(pk__in={d.shift_id for d in drops}), note)
+                cancelled_ids = {s['id'] for s in cancelled}
+                # Upcoming shifts go to the marketplace (once, if several drops name the same shift)
+                today, opened = timezone.localdate(), {}
+                for drop in drops:
+                    if drop.shift_id in cancelled_ids and drop.shift.date >= today:
+                        opened.setdefault(drop.shift_id, (drop.shift, drop))
+                open_shifts = marketplace.open_from_shifts(opened.values())
+                marketplace.send_first_offers(open_shifts)
+                for drop in drops:
+                    if drop.shift_id in cancelled_ids:
+                        drop.shift.status, drop.shift.notes = 'cancelled', note
+
+            send_notifications(notifications)
+
+        return Response({
+            'reviewed': DropRequestSerializer(drops, many=True).data,
+            'skipped': sorted(ids - {drop.pk for drop in drops}),
+            'cancelled_shifts': cancelled,
+            'open_shifts': [o.pk for o in open_shifts],
+        })
+
+
+# ===================================================================
+# Open Shift ViewSet
+# ===================================================================
+
+class OpenShiftViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = OpenShiftSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['status', 'branch', 'date']
+    ordering_fields = ['date', 'start_time', 'created_at']
+
+    def _is_lpo(self):
+        user = self.request.user
+        return hasattr(user, 'profile') and user.profile.role == 'LPO'
+
+    def get_queryset(self):
+        qs = OpenShift.objects.select_related('branch', 'filled_by').prefetch_related('offers__user')
+
+        # LPO users only see shifts offered to them
+        if self._is_lpo():
+            qs = qs.filter(offers__user=self.request.user).distinct()
+        return qs
 
-        if new_status == 'approved':
-            drop.shift.status = 'cancelled'
-            drop.shift.notes = 'Cancelled via approved drop request'
-            drop.shift.save()
+    def _managers_only(self):
+        if self._is_lpo():
+            return Response({'error': 'Only managers can do this.'}, status=status.HTTP_403_FORBIDDEN)
+        return None
+
+    # --- Ranked replacements: /api/roster/open-shifts/{id}/candidates/ ---
+    @action(detail=True, methods=['get'])
+    def candidates(self, request, pk=None):
+        denied = self._managers_only()
+        if denied:
+            return denied
+        open_shift = self.get_object()
+        return Response({'candidates': marketplace.rank([open_shift])[open_shift.pk]})
+
+    # --- Offer to the next candidates: /api/roster/open-shifts/{id}/offer/ ---
+    @action(detail=True, methods=['post'])
+    def offer(self, request, pk=None):
+        denied = self._managers_only()
+        if denied:
+            return denied
+        open_shift = self.get_object()
+        try:
+            limit = int(request.data.get('limit', settings.ROSTER_OPEN_SHIFT_OFFERS))
+        except (TypeError, ValueError):
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        offers = marketplace.send_offers(open_shift, limit)
+        return Response({'offered': [o.user_id for o in offers]})
 
-        return Response(DropRequestSerializer(drop).data)
+    # --- Accept an offer (first wins): /api/roster/open-shifts/{id}/accept/ ---
+    @action(detail=True, methods=['post'])
+    def accept(self, request, pk=None):
+        open_shift = self.get_object()
+        try:
+            shift = marketplace.fill(open_shift, request.user, assigned_by=request.user)
+        except ValidationError as exc:
+            return Response({'error': ' '.join(exc.messages)}, status=status.HTTP_409_CONFLICT)
+        return Response(RosterShiftSerializer(shift).data, status=status.HTTP_201_CREATED)
+
+    # --- Decline an offer: /api/roster/open-shifts/{id}/decline/ ---
+    @action(detail=True, methods=['post'])
+    def decline(self, request, pk=None):
+        open_shift = self.get_object()
+        try:
+            marketplace.decline(open_shift, request.user)
+        except ValidationError as exc:
+            return Response({'error': ' '.join(exc.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'status': 'declined'})
+
+    # --- Manager assigns directly: /api/roster/open-shifts/{id}/assign/ ---
+    @action(detail=True, methods=['post'])
+    def assign(self, request, pk=None):
+        denied = self._managers_only()
+        if denied:
+            return denied
+        open_shift = self.get_object()
+        user = User.objects.filter(pk=request.data.get('user')).first()
+        if user is None:
+            return Response({'error': 'user required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            shift = marketplace.fill(open_shift, user, assigned_by=request.user, require_offer=False)
+        except ValidationError as exc:
+            return Response({'error': ' '.join(exc.messages)}, status=status.HTTP_409_CONFLICT)
+        return Response(RosterShiftSerializer(shift).data, status=status.HTTP_201_CREATED)
+
+    # --- Withdraw: /api/roster/open-shifts/{id}/cancel/ ---
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        denied = self._managers_only()
+        if denied:
+            return denied
+        with transaction.atomic():
+            open_shift = OpenShift.objects.select_for_update().get(pk=self.get_object().pk)
+            if open_shift.status != 'open':
+                return Response({'error': f'Shift is already {open_shift.status}.'}, status=status.HTTP_400_BAD_REQUEST)
+            open_shift.status = 'cancelled'
+            open_shift.save(update_fields=['status'])
+            ShiftOffer.objects.filter(open_shift=open_shift, status='pending').update(
+                status='expired', responded_at=timezone.now(),
+            )
+        return Response(OpenShiftSerializer(open_shift, context={'request': request}).data)
 
 
 # ===================================================================
@@ -596,24 +1685,196 @@ class NotificationViewSet(viewsets.ModelViewSet):
     ordering_fields = ['sent_at']
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user)
+        # The inbox shows in-app rows; email/WhatsApp rows are delivery records
+        return Notification.objects.filter(user=self.request.user, channel='in_app')
+
+    # --- Keep the unread counter in step with direct API changes ---
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            notification = serializer.save()
+            if notification.channel == 'in_app' and not notification.is_read:
+                adjust_unread({notification.user_id: 1})
+        publish_unread_counts([notification.user_id])
+
+    def perform_update(self, serializer):
+        was_unread = not serializer.instance.is_read
+        with transaction.atomic():
+            notification = serializer.save()
+            adjust_unread({notification.user_id: int(not notification.is_read) - int(was_unread)})
+        publish_unread_counts([notification.user_id])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            if not instance.is_read:
+                adjust_unread({instance.user_id: -1})
+        publish_unread_counts([instance.user_id])
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read for the current user."""
-        count = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        count = mark_notifications_read(request.user.pk, self.get_queryset())
         return Response({'marked_read': count})
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark a single notification as read."""
         notification = self.get_object()
+        mark_notifications_read(request.user.pk, self.get_queryset().filter(pk=notification.pk))
         notification.is_read = True
-        notification.save()
         return Response(NotificationSerializer(notification).data)
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """Return count of unread notifications."""
-        count = Notification.objects.filter(user=request.user, is_read=False).count()
-        return Response({'count': count})
+        """Return count of unread notifications (from the cached counter)."""
+        return Response({'count': unread_counts([request.user.pk])[request.user.pk]})
+
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """Issue a short-lived ticket for opening the notification stream."""
+        ticket = events.StreamTicket.for_access_token(request.user, request.auth)
+        return Response({'ticket': str(ticket)})
+
+
+# ===================================================================
+# iCalendar feed
+# ===================================================================
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def calendar_feed(request):
+    """The current user's secret ``.ics`` subscription URL; POST issues a new one."""
+    feed = ical.rotate(request.user) if request.method == 'POST' else ical.feed_for(request.user)
+    return Response({'url': request.build_absolute_uri(reverse('roster-ical', args=[feed.token]))})
+
+
+@require_GET
+def roster_ical(request, token):
+    """
+    Shifts as iCalendar for whoever holds *token* (calendar apps can't send
+    a JWT). Answers ``If-None-Match``/``If-Modified-Since`` with a 304 from
+    the feed row alone.
+    """
+    feed = CalendarFeed.objects.filter(token=token).first()
+    if feed is None:
+        return HttpResponse('Unknown calendar feed.', status=404, content_type='text/plain')
+
+    etag, last_modified = ical.validators(feed)
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        response = HttpResponse(ical.render(feed, etag), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="shifts.ics"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ===================================================================
+# Delta sync
+# ===================================================================
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def roster_sync(request):
+    """
+    Shifts, availability and PTO requests changed or deleted since
+    ``?cursor=`` (an ISO timestamp from a previous response; omit it to get
+    a starting cursor). LPOs only get their own rows. Apply ``deleted``,
+    upsert the rest by id, and keep the new ``cursor``; on ``reset``,
+    reload everything. See ``roster.sync``.
+    """
+    now = timezone.now()
+    raw = request.query_params.get('cursor') or request.query_params.get('since')
+    if not raw:
+        return Response({'cursor': now.isoformat(), 'reset': True})
+    try:
+        since = sync.parse_cursor(raw)
+    except ValueError:
+        return Response({'error': 'cursor must be an ISO 8601 timestamp'}, status=status.HTTP_400_BAD_REQUEST)
+
+    user = request.user
+    is_lpo = hasattr(user, 'profile') and user.profile.role == 'LPO'
+    delta = sync.changes(since, user.pk if is_lpo else None)
+    context = {'request': request}
+    return Response({
+        'cursor': delta['cursor'].isoformat(),
+        'reset': delta['reset'],
+        'shifts': RosterShiftSerializer(delta['changed']['shift'], many=True, context=context).data,
+        'availability': AvailabilitySerializer(delta['changed']['availability'], many=True, context=context).data,
+        'pto': PTORequestSerializer(delta['changed']['pto'], many=True, context=context).data,
+        'deleted': {
+            'shifts': delta['deleted']['shift'],
+            'availability': delta['deleted']['availability'],
+            'pto': delta['deleted']['pto'],
+        },
+    })
+
+
+# ===================================================================
+# Notification stream (Server-Sent Events, needs an ASGI server)
+# ===================================================================
+
+def _stream_user(request):
+    """(user, session end) from ``?ticket=<stream ticket>``, or ``(None, None)``."""
+    try:
+        ticket = events.StreamTicket(request.GET.get('ticket', ''))
+        return JWTAuthentication().get_user(ticket), ticket['session_exp']
+    except (TokenError, InvalidToken, AuthenticationFailed, KeyError):
+        return None, None
+
+
+def _stream_backlog(user, last_event_id):
+    """Unread count, plus in-app rows the client missed while reconnecting."""
+    missed = []
+    if last_event_id and last_event_id.isdigit():
+        missed = NotificationSerializer(
+            Notification.objects.filter(
+                user=user, channel='in_app', pk__gt=int(last_event_id),
+            ).order_by('pk')[:100],
+            many=True,
+        ).data
+    return unread_counts([user.pk])[user.pk], missed
+
+
+async def notification_stream(request):
+    """
+    Push new notifications and unread-count changes to the current user.
+
+    Open with ``?ticket=`` from ``notifications/stream_ticket/``. The stream
+    ends with an ``expired`` event when the access token the ticket was
+    issued against expires; fetch a new ticket and reconnect.
+    """
+    user, session_exp = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'error': 'A valid stream ticket is required.'}, status=401)
+
+    count, missed = await sync_to_async(_stream_backlog)(user, request.headers.get('Last-Event-ID'))
+    queue = events.broker.subscribe(user.pk)
+    keepalive = settings.ROSTER_EVENT_KEEPALIVE_SECONDS
+
+    async def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            for n in missed:
+                yield events.format_event('notification', n, n['id'])
+            yield events.format_event('unread_count', {'count': count})
+            while True:
+                remaining = session_exp - time.time()
+                if remaining <= 0:
+                    yield events.format_event('expired', {})
+                    return
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=min(keepalive, remaining))
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                event_id = data['id'] if event == 'notification' else None
+                yield events.format_event(event, data, event_id)
+        finally:
+            events.broker.unsubscribe(user.pk, queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response